@@ -1,5 +1,5 @@
 import sys, json, subprocess, re, os, pathlib
-from typing import Dict
+from typing import Any, Dict, Optional
 
 # Re-use the existing analyser without circular import problems
 tool_root = pathlib.Path(__file__).resolve().parent
@@ -7,14 +7,15 @@ tool_root = pathlib.Path(__file__).resolve().parent
 # from main import DwarfAnalyzer # Changed to relative import
 from .main import DwarfAnalyzer
 
-_symbol_cache = None  # tuple(list_dems, list_mangled)
+# binary -> tuple(list_dems, list_mangled, dict_mangled_to_addr); keyed so a
+# worker process exporting several binaries does not mix their symbols
+_symbol_cache = {}
 
 
 def _load_symbol_tables(binary: str):
-    """Load symbol table once via objdump, returning list of (demangled,mangled)."""
-    global _symbol_cache
-    if _symbol_cache is not None:
-        return _symbol_cache
+    """Load symbol table once via objdump, returning (demangled, mangled, mangled->address)."""
+    if binary in _symbol_cache:
+        return _symbol_cache[binary]
     try:
         raw = subprocess.check_output(["objdump", "-t", binary], text=True)
         # demangle with rustfilt if available
@@ -23,10 +24,11 @@ def _load_symbol_tables(binary: str):
         except Exception:
             dem_raw = raw  # fallback: no demangling
     except Exception:
-        _symbol_cache = ([], [])
-        return _symbol_cache
+        _symbol_cache[binary] = ([], [], {})
+        return _symbol_cache[binary]
     demangled = []
     mangled = []
+    addresses = {}
     raw_lines = raw.splitlines()
     dem_lines = dem_raw.splitlines()
     for raw_line, dem_line in zip(raw_lines, dem_lines):
@@ -42,13 +44,18 @@ def _load_symbol_tables(binary: str):
         d_sym = dem_line[idx:].strip()
         mangled.append(m_sym)
         demangled.append(d_sym)
-    _symbol_cache = (demangled, mangled)
-    return _symbol_cache
+        # Link-time address, first column of `objdump -t`
+        try:
+            addresses[m_sym] = int(parts[0], 16)
+        except ValueError:
+            pass
+    _symbol_cache[binary] = (demangled, mangled, addresses)
+    return _symbol_cache[binary]
 
 
 def find_poll_symbol(binary: str, struct_name: str) -> str:
     """Find the mangled poll symbol for a given struct by scanning demangled names."""
-    demangled_names, mangled_names = _load_symbol_tables(binary)
+    demangled_names, mangled_names, _ = _load_symbol_tables(binary)
 
     # Normalize the struct_name from DWARF to match the demangled format
     # e.g. "MyStruct<...blah...>" -> "MyStruct"
@@ -84,18 +91,38 @@ def find_poll_symbol(binary: str, struct_name: str) -> str:
 
     return ""
 
-def export(binary: str, out_json: str):
-    analyzer = DwarfAnalyzer(binary)
-    analyzer.parse_dwarf()
-    future_map: Dict[str, Dict[str, str]] = {}
+def find_symbol_address(binary: str, mangled_sym: str) -> Optional[int]:
+    """Link-time address of a mangled symbol, or None if it is not in .text."""
+    return _load_symbol_tables(binary)[2].get(mangled_sym)
+
+def export(binary: str, out_json: str, analyzer: Optional[DwarfAnalyzer] = None):
+    """Write the future map; pass an already parsed `analyzer` to skip objdump."""
+    if analyzer is None:
+        analyzer = DwarfAnalyzer(binary)
+        analyzer.parse_dwarf()
+    future_map: Dict[str, Dict[str, Any]] = {}
+    objfile = os.path.basename(binary)
     for s in analyzer.structs.values():
         if not s.state_machine:
             continue
         key = f"0x{s.type_id}" if s.type_id else s.name
-        future_map[key] = {
+        poll_symbol = find_poll_symbol(binary, s.name)
+        entry = {
             "name": s.name,
-            "poll_symbol": find_poll_symbol(binary, s.name)
+            "poll_symbol": poll_symbol
         }
+        if poll_symbol:
+            # Lets the profiler set `*ADDR` breakpoints in bulk instead of
+            # resolving every symbol through GDB's symbol tables.
+            poll_addr = find_symbol_address(binary, poll_symbol)
+            if poll_addr is not None:
+                entry["poll_addr"] = f"0x{poll_addr:x}"
+            entry["objfile"] = objfile
+        if s.is_async_fn and s.discr_offset is not None:
+            # Coroutine state after a poll (1 Returned: Ready, 3.. SuspendN:
+            # Pending) tells the outcome whatever the layout of Poll<Output>
+            entry["discr_offset"] = s.discr_offset
+        future_map[key] = entry
     with open(out_json, "w") as f:
         json.dump(future_map, f, indent=2)
     print(f"[+] exported {len(future_map)} futures to {out_json}")
@@ -0,0 +1,151 @@
+import sys, json, re
+from typing import Dict, List, Optional, Sequence
+
+from .main import DwarfAnalyzer
+
+# Struct member offsets exported for the GDB runtime plugins, which read
+# runtime internals (Tokio workers, run queues, ...) straight from memory.
+#
+# Output format:
+#   {"structs": [{"name": str, "qualified_name": str, "type_id": str, "size": int,
+#                 "members": {field: offset}}, ...]}
+#
+# Names are the bare DW_AT_name (e.g. "Worker", "ArcInner<...>"), so several
+# structs may share one; consumers disambiguate by the fields they need, or
+# match the qualified name (enclosing namespaces included) when generic names
+# like "Shared<...>" are too common for that.
+#
+# For the async task dump (gdb_debugger/task_dump.py) the file also carries:
+#   "futures":    {type_id: {"name", "size", "discr_offset", "states":
+#                  {discr: {"name", "line", "awaitee", "awaitee_type"}}}}
+#   "cells":      {future type_id: offset of the future in its tokio task Cell}
+#   "task_polls": {"0x<link pc>": {"type": future type_id, "symbol": str}}
+#   "type_names": {type_id: qualified name} for awaited non-async types
+
+
+# Members followed from a tokio task Cell down to its Stage<T> enum:
+# Cell.core -> Core.stage -> CoreStage.stage -> UnsafeCell.value
+_CELL_PATH = ("core", "stage", "value")
+
+
+def _futures(analyzer: DwarfAnalyzer) -> Dict[str, dict]:
+    """Coroutine envs with their suspend states (rustc: 0 Unresumed, 1 Returned,
+    2 Panicked, 3.. SuspendN, each holding the `__awaitee` it is parked on)."""
+    futures = {}
+    for s in analyzer.structs.values():
+        if not (s.is_async_fn and s.type_id and s.discr_offset is not None):
+            continue
+        states = {}
+        for v in s.variants:
+            if v["discr"] is None:
+                continue
+            awaitee = v["members"].get("__awaitee")
+            states[str(v["discr"])] = {
+                "name": v["name"], "line": v["line"],
+                "awaitee": awaitee[0] if awaitee else None,
+                "awaitee_type": awaitee[1] if awaitee else None,
+            }
+        futures[s.type_id] = {"name": s.qualified_name, "size": s.size,
+                              "discr_offset": s.discr_offset, "states": states}
+    return futures
+
+
+def _cells(analyzer: DwarfAnalyzer) -> Dict[str, int]:
+    """Offset of the Running future inside each tokio task Cell<T, S>."""
+    by_id = {s.type_id: s for s in analyzer.structs.values() if s.type_id}
+    cells = {}
+    for s in analyzer.structs.values():
+        if not s.name.startswith("Cell<") or not {"header", "core", "trailer"} <= {m.name for m in s.members}:
+            continue
+        offset, current = 0, s
+        for _ in range(8):
+            running = next((v for v in current.variants if v["name"] == "Running"), None)
+            if running is not None:
+                field = running["members"].get("__0")
+                if field:
+                    cells[field[1]] = offset + field[0]
+                break
+            step = next((m for m in current.members if m.name in _CELL_PATH and m.type in by_id), None)
+            if step is None:
+                break
+            offset += step.offset
+            current = by_id[step.type]
+    return cells
+
+
+def export(binary: str, out_json: str, analyzer: Optional[DwarfAnalyzer] = None):
+    if analyzer is None:
+        analyzer = DwarfAnalyzer(binary)
+        analyzer.parse_dwarf()
+    structs = []
+    for s in analyzer.structs.values():
+        name = s.name
+        # DwarfAnalyzer suffixes duplicate names with "<0xTYPEID>"; undo that here
+        if s.type_id and name.endswith(f"<0x{s.type_id}>"):
+            name = name[:-len(f"<0x{s.type_id}>")]
+        members: Dict[str, int] = {}
+        for m in s.members:
+            # Variant parts are flattened into the struct; keep the first field of a name
+            members.setdefault(m.name, m.offset)
+        structs.append({"name": name, "qualified_name": s.qualified_name, "type_id": s.type_id,
+                        "size": s.size, "members": members})
+    futures = _futures(analyzer)
+    type_names = {}
+    for future in futures.values():
+        for state in future["states"].values():
+            awaitee = analyzer.type_id_to_struct.get(state["awaitee_type"])
+            if awaitee and state["awaitee_type"] not in futures:
+                type_names[state["awaitee_type"]] = analyzer.structs[awaitee].qualified_name
+    task_polls = {f"0x{pc:x}": {"type": type_id, "symbol": analyzer.task_poll_symbols[pc]}
+                  for pc, type_id in analyzer.task_poll_types.items()}
+    with open(out_json, "w") as f:
+        json.dump({"structs": structs, "futures": futures, "cells": _cells(analyzer),
+                   "task_polls": task_polls, "type_names": type_names}, f)
+    print(f"[+] exported {len(structs)} struct layouts, {len(futures)} async state machines "
+          f"and {len(task_polls)} task poll fns to {out_json}")
+
+
+class StructLayouts:
+    """Lookup side of the exported layouts, usable without objdump or GDB."""
+
+    def __init__(self, data: dict):
+        self.by_name: Dict[str, List[dict]] = {}
+        for s in data.get("structs", []):
+            self.by_name.setdefault(s["name"], []).append(s)
+        self.futures: Dict[str, dict] = data.get("futures", {})
+        self.cells: Dict[str, int] = data.get("cells", {})
+        self.task_polls: Dict[int, dict] = {int(pc, 16): p for pc, p in data.get("task_polls", {}).items()}
+        self.type_names: Dict[str, str] = data.get("type_names", {})
+
+    @classmethod
+    def load(cls, path) -> "StructLayouts":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def find(self, name_pattern: str, fields: Sequence[str] = (), qualified: bool = False) -> Optional[dict]:
+        """First struct whose name (qualified name if `qualified`) fully matches `name_pattern`
+        and has all `fields`."""
+        if qualified:
+            candidates = [s for group in self.by_name.values() for s in group
+                          if re.fullmatch(name_pattern, s.get("qualified_name") or "")]
+        else:
+            exact = self.by_name.get(name_pattern)
+            candidates = exact if exact is not None else [
+                s for name, group in self.by_name.items() if re.fullmatch(name_pattern, name) for s in group
+            ]
+        for s in candidates:
+            if all(f in s["members"] for f in fields):
+                return s
+        return None
+
+    def offset(self, name_pattern: str, field: str, fields: Sequence[str] = (),
+               qualified: bool = False) -> Optional[int]:
+        s = self.find(name_pattern, tuple(fields) + (field,), qualified)
+        return s["members"][field] if s else None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m dwarf_analyzer.layouts <binary> <out.json>")
+        sys.exit(1)
+    export(sys.argv[1], sys.argv[2])
@@ -28,6 +28,35 @@ class Struct:
     state_machine: bool
     type_id: Optional[str] = None
     locations: List[Dict[str, any]] = field(default_factory=list)
+    # Enclosing namespaces joined with the name, e.g. "crate::f::{async_fn_env#0}"
+    qualified_name: Optional[str] = None
+    # Enums and coroutine envs (DW_TAG_variant_part): offset of the
+    # discriminant member and one entry per variant, see _parse_variants
+    discr_offset: Optional[int] = None
+    variants: List[Dict[str, any]] = field(default_factory=list)
+
+_DIE_HEADER = re.compile(r'\s*<(\d+)><([0-9a-f]+)>: Abbrev Number: \d+ \((DW_TAG_\w+)\)')
+_DIE_ATTR = re.compile(r'\s*<[0-9a-f]+>\s+DW_AT_(\w+)\s*:\s*(?:\(indirect string, offset: 0x[0-9a-f]+\):\s*)?(.*)')
+
+
+def _die_attrs(lines: List[str], i: int) -> Dict[str, str]:
+    """Attributes of the DIE whose header is lines[i]."""
+    attrs = {}
+    for line in lines[i + 1:i + 40]:
+        m = _DIE_ATTR.match(line)
+        if not m:
+            break
+        attrs[m.group(1)] = m.group(2).strip()
+    return attrs
+
+
+def _ref(value: Optional[str]) -> Optional[str]:
+    """'<0x1a7d>' -> '1a7d' (the form type ids take everywhere else)."""
+    if not value:
+        return None
+    m = re.match(r'<0x([0-9a-f]+)>', value)
+    return m.group(1) if m else None
+
 
 class DwarfAnalyzer:
     def __init__(self, binary_path: str):
@@ -38,6 +67,13 @@ class DwarfAnalyzer:
         self.type_id_to_struct: Dict[str, str] = {}
         self.struct_name_to_type_id: Dict[str, str] = {}
         self.file_table: Dict[str, str] = {}
+        self.namespaces: List[tuple] = []  # (depth, name) of the namespaces around the current DIE
+        # tokio::runtime::task::raw::poll<T, S> instances: link address -> type id of T.
+        # A task's vtable points at its poll fn, so this names the future it runs.
+        self.task_poll_types: Dict[int, str] = {}
+        self.task_poll_symbols: Dict[int, str] = {}
+        self._subprograms: Dict[str, Dict[str, any]] = {}
+        self._last_subprogram: Optional[str] = None
 
     def run_objdump(self) -> str:
         """Run objdump and return its output."""
@@ -65,6 +101,10 @@ class DwarfAnalyzer:
                 # Restart parsing from the beginning of this unit for structs
                 i -= len(comp_unit_lines)
 
+            h = _DIE_HEADER.match(line) if 'Abbrev Number' in line else None
+            if h:
+                self._note_die(int(h.group(1)), h.group(2), h.group(3), lines, i)
+
             # Detect the beginning of a structure DIE – rely on depth value instead of spaces
             m = re.match(r'\s*<(\d+)><[0-9a-f]+>: Abbrev Number: .*?\(DW_TAG_structure_type\)', line)
             if m:
@@ -85,6 +125,47 @@ class DwarfAnalyzer:
                 self._parse_struct_block(struct_lines)
                 continue
             i += 1
+        self._resolve_task_polls()
+
+    def _note_die(self, depth: int, die_id: str, tag: str, lines: List[str], i: int):
+        """Track namespaces and tokio task poll fns from DIEs outside struct blocks."""
+        while self.namespaces and self.namespaces[-1][0] >= depth:
+            self.namespaces.pop()
+        if tag not in ('DW_TAG_namespace', 'DW_TAG_subprogram', 'DW_TAG_template_type_param'):
+            return
+        attrs = _die_attrs(lines, i)
+        if tag == 'DW_TAG_namespace':
+            self.namespaces.append((depth, attrs.get('name', '')))
+        elif tag == 'DW_TAG_subprogram':
+            self._subprograms[die_id] = {
+                'depth': depth,
+                'low_pc': attrs.get('low_pc'),
+                'name': attrs.get('name'),
+                'linkage_name': attrs.get('linkage_name'),
+                'specification': _ref(attrs.get('specification')),
+                'params': [],
+            }
+            self._last_subprogram = die_id
+        else:
+            sp = self._subprograms.get(self._last_subprogram)
+            if sp is not None and depth == sp['depth'] + 1:
+                sp['params'].append(_ref(attrs.get('type')))
+
+    def _resolve_task_polls(self):
+        for sp in self._subprograms.values():
+            if not sp['low_pc']:
+                continue
+            decl = self._subprograms.get(sp['specification'], {})
+            linkage = sp['linkage_name'] or decl.get('linkage_name') or ''
+            # Both legacy and v0 mangling spell the path as <len><ident>
+            if '4task3raw4poll' not in linkage:
+                continue
+            params = sp['params'] or decl.get('params') or []
+            if params and params[0]:
+                low_pc = int(sp['low_pc'], 16)
+                self.task_poll_types[low_pc] = params[0]
+                self.task_poll_symbols[low_pc] = linkage
+        self._subprograms.clear()
 
     def _parse_file_table(self, comp_unit_lines):
         """
@@ -167,6 +248,7 @@ class DwarfAnalyzer:
             member = self._parse_member_block(member_block)
             if member:
                 members.append(member)
+        discr_offset, variants = self._parse_variants(struct_lines)
         # Register struct – ensure unique key per type_id
         if name:
             unique_name = name
@@ -179,13 +261,71 @@ class DwarfAnalyzer:
                 members=members,
                 is_async_fn=is_async_fn,
                 state_machine=state_machine,
-                type_id=type_id
+                type_id=type_id,
+                qualified_name="::".join([ns for _, ns in self.namespaces] + [name]),
+                discr_offset=discr_offset,
+                variants=variants,
             )
             self.structs[unique_name] = struct
             if type_id:
                 self.type_id_to_struct[type_id] = unique_name
                 self.struct_name_to_type_id[unique_name] = type_id
 
+    def _parse_variants(self, struct_lines):
+        """
+        Variants of an enum / coroutine env. rustc nests them as
+        variant_part -> variant (DW_AT_discr_value) -> member typed with a
+        struct defined inside the enum, e.g. `Suspend0` with its saved locals
+        and `__awaitee`. Returns (discr_offset, [{"discr", "name", "line",
+        "members": {name: [offset, type_id]}}, ...]); "line" is the
+        DW_AT_decl_line of the variant, i.e. the suspend point of a coroutine.
+        """
+        if not any('DW_TAG_variant_part' in line for line in struct_lines):
+            return None, []
+        dies = []
+        for line in struct_lines:
+            h = _DIE_HEADER.match(line) if 'Abbrev Number' in line else None
+            if h:
+                dies.append({'depth': int(h.group(1)), 'id': h.group(2), 'tag': h.group(3), 'attrs': {}})
+                continue
+            m = _DIE_ATTR.match(line)
+            if m and dies:
+                dies[-1]['attrs'][m.group(1)] = m.group(2).strip()
+        base = dies[0]['depth']
+        discr_id = discr_offset = None
+        variants, nested = [], {}
+        current_variant = None
+        current_struct = None
+        for die in dies[1:]:
+            tag, attrs, depth = die['tag'], die['attrs'], die['depth']
+            if tag == 'DW_TAG_variant_part':
+                discr_id = _ref(attrs.get('discr'))
+            elif tag == 'DW_TAG_variant':
+                value = attrs.get('discr_value')
+                current_variant = {'discr': int(value, 0) if value and value.lstrip('-').isdigit() else None,
+                                   'type': None, 'line': None}
+                variants.append(current_variant)
+            elif tag == 'DW_TAG_structure_type' and depth == base + 1:
+                current_struct = nested[die['id']] = {'name': attrs.get('name'), 'members': {}}
+            elif tag == 'DW_TAG_member':
+                offset = re.match(r'\d+', attrs.get('data_member_location', ''))
+                offset = int(offset.group(0)) if offset else 0
+                if die['id'] == discr_id:
+                    discr_offset = offset
+                elif current_struct is not None and depth == base + 2:
+                    current_struct['members'][attrs.get('name')] = [offset, _ref(attrs.get('type'))]
+                elif current_variant is not None and current_variant['type'] is None:
+                    current_variant['type'] = _ref(attrs.get('type'))
+                    line = attrs.get('decl_line')
+                    current_variant['line'] = int(line) if line and line.isdigit() else None
+        result = []
+        for v in variants:
+            inner = nested.get(v.pop('type'), {'name': None, 'members': {}})
+            v['name'] = inner['name']
+            v['members'] = inner['members']
+            result.append(v)
+        return discr_offset, result
+
     def _parse_member_block(self, member_lines):
         name = None
         type_str = 'unknown'
@@ -0,0 +1,21 @@
+import mmap
+from typing import Iterable, Set
+
+# Cheap "which crates are linked into this binary?" check used to pick a
+# runtime plugin automatically. Both legacy (`_ZN5tokio7runtime...`) and v0
+# (`_RNv...Cs1a2b_5tokio...`) Rust mangling encode every path component as
+# `<len><ident>`, so a crate shows up as e.g. `5tokio` or `14async_executor`
+# in the symbol string table. Scanning the mapped file for those markers is
+# a single memchr-speed pass and needs neither objdump nor GDB.
+
+
+def linked_crates(binary: str, crates: Iterable[str]) -> Set[str]:
+    found: Set[str] = set()
+    try:
+        with open(binary, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for crate in crates:
+                if data.find(f"{len(crate)}{crate}".encode()) != -1:
+                    found.add(crate)
+    except (OSError, ValueError):
+        pass
+    return found
@@ -0,0 +1,145 @@
+import gdb
+
+# Target reads are the expensive part of a breakpoint handler, especially on
+# gdbserver / QEMU targets where each one is a protocol round-trip. A
+# StopSnapshot is created once per stop and handed to every tracer and
+# plugin hook running at that stop: registers, evaluated expressions and
+# memory (fetched in whole pages) are cached until the target resumes.
+# Snapshots are per thread: under non-stop mode several threads can be
+# stopped at once and each one resumes on its own.
+
+PAGE_SIZE = 4096
+
+
+class StopSnapshot:
+    """Cached view of one thread's state for the duration of a single stop.
+
+    `read_memory` mirrors `gdb.Inferior.read_memory` (it returns a
+    memoryview), so code written against the inferior can take a snapshot
+    instead.
+    """
+
+    # Set by finish breakpoints for the tracers they run (see ReturnValueTracer)
+    return_value = None
+
+    def __init__(self, thread: gdb.Thread = None):
+        self.thread = thread or gdb.selected_thread()
+        self.valid = True
+        self.target_reads = 0  # read_memory round-trips actually sent to the target
+        self._frame = None
+        self._registers = {}
+        self._values = {}
+        self._pages = {}       # page address -> bytes, or None if unreadable
+
+    def frame(self) -> gdb.Frame:
+        """Newest frame of the snapshot's thread, switching to it once."""
+        if self._frame is None:
+            if gdb.selected_thread() != self.thread:
+                self.thread.switch()
+            self._frame = gdb.newest_frame()
+        return self._frame
+
+    def register(self, name: str) -> int:
+        value = self._registers.get(name)
+        if value is None:
+            value = self._registers[name] = int(self.frame().read_register(name))
+        return value
+
+    def parse_and_eval(self, expression: str) -> gdb.Value:
+        """gdb.parse_and_eval in the snapshot's frame, cached per expression."""
+        value = self._values.get(expression)
+        if value is None:
+            self.frame().select()
+            value = self._values[expression] = gdb.parse_and_eval(expression)
+        return value
+
+    def _fetch(self, first: int, count: int):
+        """Load `count` pages starting at `first`, one target read if possible."""
+        inferior = self.thread.inferior
+        self.target_reads += 1
+        try:
+            data = inferior.read_memory(first, count * PAGE_SIZE).tobytes()
+        except gdb.MemoryError:
+            data = None
+        if data is not None:
+            for i in range(count):
+                self._pages[first + i * PAGE_SIZE] = data[i * PAGE_SIZE:(i + 1) * PAGE_SIZE]
+            return
+        # Part of the range is unmapped: find out which pages are readable
+        for i in range(count):
+            page = first + i * PAGE_SIZE
+            self.target_reads += 1
+            try:
+                self._pages[page] = inferior.read_memory(page, PAGE_SIZE).tobytes()
+            except gdb.MemoryError:
+                self._pages[page] = None
+
+    def read_memory(self, address: int, length: int) -> memoryview:
+        address = int(address)
+        first = address & ~(PAGE_SIZE - 1)
+        last = (address + max(length, 1) - 1) & ~(PAGE_SIZE - 1)
+        pages = range(first, last + PAGE_SIZE, PAGE_SIZE)
+        run_start = None
+        for page in list(pages) + [None]:
+            if page is not None and page not in self._pages:
+                if run_start is None:
+                    run_start = page
+            elif run_start is not None:
+                end = page if page is not None else last + PAGE_SIZE
+                self._fetch(run_start, (end - run_start) // PAGE_SIZE)
+                run_start = None
+        chunks = [self._pages[page] for page in pages]
+        if any(chunk is None for chunk in chunks):
+            raise gdb.MemoryError(f"Cannot access memory at address 0x{address:x}")
+        start = address - first
+        return memoryview(b"".join(chunks)[start:start + length])
+
+    def read_int(self, address: int, size: int):
+        """Little-endian unsigned integer at `address`, None if unreadable."""
+        try:
+            return int.from_bytes(self.read_memory(address, size).tobytes(), "little")
+        except gdb.MemoryError:
+            return None
+
+    def invalidate(self):
+        self.valid = False
+        self.return_value = None
+        self._frame = None
+        self._registers.clear()
+        self._values.clear()
+        self._pages.clear()
+
+
+_current = {}  # thread ptid -> StopSnapshot of its ongoing stop
+
+
+def current(thread: gdb.Thread = None) -> StopSnapshot:
+    """The snapshot for the ongoing stop of `thread` (default: selected thread)."""
+    thread = thread or gdb.selected_thread()
+    snap = _current.get(thread.ptid)
+    if snap is None or snap.thread != thread:
+        snap = _current[thread.ptid] = StopSnapshot(thread)
+    return snap
+
+
+def invalidate(event=None):
+    """Drop snapshots of resumed threads; connected to gdb.events.cont so any
+    resume, including the one GDB does after a `stop()` returning False or an
+    inferior function call, discards state the inferior may now change.
+    In all-stop mode every thread resumes (inferior_thread is None); in
+    non-stop mode only the event's thread does, and other stopped threads
+    keep theirs. Memory is shared, though, so any resume drops cached pages."""
+    thread = getattr(event, "inferior_thread", None)
+    if thread is None:
+        for snap in _current.values():
+            snap.invalidate()
+        _current.clear()
+        return
+    snap = _current.pop(thread.ptid, None)
+    if snap is not None:
+        snap.invalidate()
+    for other in _current.values():
+        other._pages.clear()
+
+
+gdb.events.cont.connect(invalidate)
@@ -0,0 +1,209 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+from dwarf_analyzer.layouts import StructLayouts
+from gdb_debugger.task_dump import TaskDecoder, format_tasks
+
+# Post-mortem `async-tasks` on an ELF core file, without GDB:
+#
+#   python -m gdb_debugger.core_dump <core> <binary> <layouts.json>
+#
+# The core and the binary are mmapped and their PT_LOAD segments form a
+# virtual address -> file offset lookup, so reads are memoryview slices of
+# the mapping. Memory the kernel did not dump (read-only file mappings) is
+# read from the binary itself, shifted by the load bias found in the core's
+# NT_FILE note. Task headers are located by scanning for pointers to task
+# vtables, which are themselves found by their poll fn, rather than by
+# walking OwnedTasks as the live command does; the decoding is
+# gdb_debugger.task_dump. The layouts JSON must be exported beforehand with
+# `python -m dwarf_analyzer.layouts`, which needs objdump.
+
+PT_LOAD = 1
+PT_NOTE = 4
+NT_FILE = 0x46494C45
+# tokio::runtime::task::state: the reference count lives above 6 flag bits;
+# a header whose count dropped to 0 has been freed
+REF_COUNT_SHIFT = 6
+
+
+class ElfImage:
+    """PT_LOAD segments of an ELF64 little-endian file, mmapped read-only."""
+
+    def __init__(self, path: str, bias: int = 0):
+        self.path = path
+        self.bias = bias
+        self._fp = open(path, "rb")
+        self.data = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:4] != b"\x7fELF" or self.data[4] != 2 or self.data[5] != 1:
+            raise ValueError(f"{path}: not a little-endian ELF64 file")
+        phoff, = struct.unpack_from("<Q", self.data, 0x20)
+        phentsize, phnum = struct.unpack_from("<HH", self.data, 0x36)
+        self.segments = []  # (vaddr, filesz, offset, flags)
+        self.notes = []     # (offset, size)
+        for i in range(phnum):
+            p_type, p_flags, p_offset, p_vaddr, _, p_filesz, _, _ = \
+                struct.unpack_from("<IIQQQQQQ", self.data, phoff + i * phentsize)
+            if p_type == PT_LOAD and p_filesz:
+                self.segments.append((p_vaddr, p_filesz, p_offset, p_flags))
+            elif p_type == PT_NOTE:
+                self.notes.append((p_offset, p_filesz))
+        self.segments.sort()
+        self._starts = [s[0] for s in self.segments]
+
+    @property
+    def link_base(self) -> int:
+        return min(vaddr - offset for vaddr, _, offset, _ in self.segments) if self.segments else 0
+
+    def _segment(self, address: int):
+        i = bisect.bisect_right(self._starts, address - self.bias) - 1
+        if i >= 0:
+            vaddr, filesz, offset, _ = self.segments[i]
+            if address - self.bias < vaddr + filesz:
+                return vaddr + self.bias, filesz, offset
+        return None
+
+    def read_memory(self, address: int, length: int):
+        """Zero-copy view of `length` bytes at `address`, None if not mapped."""
+        segment = self._segment(address)
+        if segment is None:
+            return None
+        vaddr, filesz, offset = segment
+        start = offset + address - vaddr
+        if address + length <= vaddr + filesz:
+            return memoryview(self.data)[start:start + length]
+        head = bytes(self.data[start:offset + filesz])
+        rest = self.read_memory(vaddr + filesz, length - len(head))
+        return None if rest is None else memoryview(head + bytes(rest))
+
+    def file_mappings(self):
+        """NT_FILE note of a core: [(start, end, file offset, path), ...]."""
+        mappings = []
+        for note_offset, note_size in self.notes:
+            pos, end = note_offset, note_offset + note_size
+            while pos + 12 <= end:
+                namesz, descsz, note_type = struct.unpack_from("<III", self.data, pos)
+                desc = pos + 12 + (namesz + 3 & ~3)
+                if note_type == NT_FILE:
+                    count, page_size = struct.unpack_from("<QQ", self.data, desc)
+                    entries = [struct.unpack_from("<QQQ", self.data, desc + 16 + 24 * i) for i in range(count)]
+                    names = bytes(self.data[desc + 16 + 24 * count:desc + descsz]).split(b"\0")
+                    for (start, stop, page), name in zip(entries, names):
+                        mappings.append((start, stop, page * page_size, name.decode(errors="replace")))
+                pos = desc + (descsz + 3 & ~3)
+        return mappings
+
+    def close(self):
+        self.data.close()
+        self._fp.close()
+
+
+class CoreMemory:
+    """read_int over a core, falling back to the binary for undumped pages."""
+
+    def __init__(self, core: ElfImage, binary: ElfImage):
+        self.images = (core, binary)
+
+    def read_memory(self, address: int, length: int):
+        for image in self.images:
+            view = image.read_memory(address, length)
+            if view is not None:
+                return view
+        return None
+
+    def read_int(self, address: int, size: int):
+        view = self.read_memory(address, size)
+        return None if view is None else int.from_bytes(view, "little")
+
+
+def load_bias(core: ElfImage, binary: ElfImage) -> int:
+    name = os.path.basename(os.path.realpath(binary.path))
+    starts = [start - offset for start, _, offset, path in core.file_mappings()
+              if os.path.basename(path) == name]
+    return min(starts) - binary.link_base if starts else 0
+
+
+def scan_pointers(image: ElfImage, targets: set, writable_only: bool = True):
+    """
+    Addresses of 8-byte aligned words in `image` whose value is in `targets`.
+    The targets share their high bytes (they point into one binary), so the
+    scan is a bytes.find of that common suffix and only hits are decoded.
+    """
+    if not targets:
+        return
+    low, high = min(targets), max(targets)
+    shift = 0
+    while (low >> shift) != (high >> shift):
+        shift += 8
+    skip = shift // 8
+    needle = (low >> shift).to_bytes(8 - skip, "little")
+    for vaddr, filesz, offset, flags in image.segments:
+        if writable_only and not flags & 2:
+            continue
+        data = image.data
+        pos = data.find(needle, offset + skip, offset + filesz)
+        while pos != -1:
+            word = pos - skip
+            if (word - offset) % 8 == 0:
+                value = int.from_bytes(data[word:word + 8], "little")
+                if value in targets:
+                    yield vaddr + image.bias + word - offset
+            pos = data.find(needle, pos + 1, offset + filesz)
+
+
+def find_tasks(decoder: TaskDecoder, core: ElfImage, memory: CoreMemory) -> list:
+    """Headers of all live tasks: vtables by their poll fn, headers by their vtable."""
+    polls = {pc + decoder.bias for pc in decoder.layouts.task_polls}
+    candidates = list(scan_pointers(core, polls, writable_only=False))
+    if not candidates and not decoder.bias:
+        # Non-PIE .data.rel.ro not dumped: the binary holds the final values
+        binary = memory.images[1]
+        candidates = list(scan_pointers(binary, polls, writable_only=False))
+    vtables = set()
+    for address in candidates:
+        vtable = address - decoder.vtable_poll
+        trailer = memory.read_int(vtable + decoder.vtable_trailer, 8)
+        if trailer is not None and 0 < trailer < 1 << 20 and trailer % 8 == 0:
+            vtables.add(vtable)
+    state = decoder.layouts.offset("Header", "state", ("vtable", "queue_next"))
+    headers = []
+    for address in scan_pointers(core, vtables):
+        header = address - decoder.header_vtable
+        if state is None or (memory.read_int(header + state, 8) or 0) >> REF_COUNT_SHIFT:
+            headers.append(header)
+    return headers
+
+
+def main(argv):
+    if len(argv) < 4:
+        print("Usage: python -m gdb_debugger.core_dump <core> <binary> <layouts.json>")
+        print("  Tasks are found by scanning the core for pointers to task vtables,")
+        print("  not by walking the runtime's OwnedTasks lists.")
+        return 1
+    core_path, binary_path, layout_path = argv[1], argv[2], argv[3]
+    if not os.path.exists(layout_path):
+        print(f"[core_dump] No layouts file {layout_path}; export it first with")
+        print(f"  python -m dwarf_analyzer.layouts {binary_path} {layout_path}")
+        return 1
+    decoder = TaskDecoder(StructLayouts.load(layout_path), None)
+    if decoder.missing():
+        print(f"[core_dump] Layouts lack {', '.join(decoder.missing())}; is this a tokio binary with debug info?")
+        return 1
+    core = ElfImage(core_path)
+    binary = ElfImage(binary_path)
+    binary.bias = decoder.bias = load_bias(core, binary)
+    decoder.memory = CoreMemory(core, binary)
+    headers = find_tasks(decoder, core, decoder.memory)
+    tasks = decoder.dump(headers)
+    print(f"[core_dump] {len(tasks)} tasks (load bias 0x{decoder.bias:x})")
+    for line in format_tasks(tasks):
+        print(line)
+    core.close()
+    binary.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
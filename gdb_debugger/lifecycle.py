@@ -0,0 +1,139 @@
+import json
+import os
+
+# Post-processing of gdb_debugger recordings into per-task lifecycles:
+# spawn (id, spawn stack, task pointer) -> polls -> shutdown -> dealloc,
+# joined on the task pointer. Pointers are reused once a task is freed, so a
+# pointer maps to the most recent live task until its dealloc is seen.
+# Pure Python, so it runs on loaded recordings as well as live data.
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class TaskLifecycle:
+    __slots__ = ("task_id", "ptr", "stack", "tid", "spawn_ts", "polls",
+                 "first_poll_ts", "last_poll_ts", "shutdown_ts", "dealloc_ts")
+
+    def __init__(self, task_id, ptr, stack, tid, spawn_ts):
+        self.task_id = task_id
+        self.ptr = ptr
+        self.stack = stack
+        self.tid = tid
+        self.spawn_ts = spawn_ts
+        self.polls = []            # (ts, lwp) of every poll
+        self.first_poll_ts = None
+        self.last_poll_ts = None
+        self.shutdown_ts = None
+        self.dealloc_ts = None
+
+    @property
+    def lifetime_ns(self):
+        return None if self.dealloc_ts is None else self.dealloc_ts - self.spawn_ts
+
+
+def _events(traced_data, symbols):
+    """(timestamp, kind, invocation) for the given {kind: symbol}, in time order."""
+    events = []
+    for kind, symbol in symbols.items():
+        for invocation in traced_data.get(symbol, []):
+            events.append((invocation.get("timestamp", 0), kind, invocation))
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def build_lifecycles(traced_data, symbols, id_key, ptr_key, stack_key, spawn_ptr_key):
+    """
+    Join spawn / poll / shutdown / dealloc invocations into TaskLifecycles.
+
+    `symbols` maps "new", "poll", "shutdown", "dealloc" to instrumented
+    symbols; the *_key arguments name the tracer values holding the task id,
+    the task pointer (entry of poll/shutdown/dealloc), the spawn stack and the
+    task pointer returned by the spawn function (exit of "new").
+    Returns (tasks, orphans): orphans counts events whose task was never seen
+    spawning, e.g. tasks created before tracing started.
+    """
+    tasks, live, orphans = [], {}, 0
+    for ts, kind, invocation in _events(traced_data, symbols):
+        entry, exit_ = invocation["entry_tracers"], invocation["exit_tracers"]
+        if kind == "new":
+            ptr = exit_.get(spawn_ptr_key)
+            task = TaskLifecycle(entry.get(id_key), ptr if isinstance(ptr, int) else None,
+                                 entry.get(stack_key), invocation["thread_id"], ts)
+            tasks.append(task)
+            if task.ptr is not None:
+                live[task.ptr] = task
+            continue
+        task = live.get(entry.get(ptr_key))
+        if task is None:
+            orphans += 1
+            continue
+        if kind == "poll":
+            task.polls.append((ts, invocation["thread_id"][1]))
+            if task.first_poll_ts is None:
+                task.first_poll_ts = ts
+            task.last_poll_ts = ts
+        elif kind == "shutdown":
+            task.shutdown_ts = ts
+        elif kind == "dealloc":
+            task.dealloc_ts = ts
+            del live[task.ptr]
+    return tasks, orphans
+
+
+def export_chrome(tasks, path):
+    """One async span per task from spawn to dealloc (or last event), polls as instants."""
+    events = []
+    for task in tasks:
+        span_id = f"task{task.task_id if task.task_id is not None else id(task)}"
+        name = f"task {task.task_id}"
+        end = task.dealloc_ts or task.last_poll_ts or task.spawn_ts
+        base = {"pid": 1, "tid": str(task.tid[1]), "cat": "task", "id": span_id}
+        events.append({**base, "ph": "b", "ts": task.spawn_ts / 1000, "name": name,
+                       "args": {"ptr": f"0x{task.ptr:x}" if task.ptr is not None else None,
+                                "stack": task.stack}})
+        for ts, lwp in task.polls:
+            events.append({**base, "ph": "n", "ts": ts / 1000, "name": "poll", "args": {"thread": lwp}})
+        if task.shutdown_ts is not None:
+            events.append({**base, "ph": "n", "ts": task.shutdown_ts / 1000, "name": "shutdown"})
+        events.append({**base, "ph": "e", "ts": end / 1000, "name": name,
+                       "args": {"polls": len(task.polls), "deallocated": task.dealloc_ts is not None}})
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fp:
+        json.dump({"traceEvents": events}, fp)
+
+
+def spawn_site_stats(tasks, site_of):
+    """Per spawn site (`site_of(stack)` -> name) aggregates, most tasks first."""
+    by_site = {}
+    for task in tasks:
+        by_site.setdefault(site_of(task.stack), []).append(task)
+    rows = []
+    for site, group in by_site.items():
+        polls = sorted(len(t.polls) for t in group)
+        lifetimes = sorted(t.lifetime_ns for t in group if t.lifetime_ns is not None)
+        rows.append({
+            "site": site,
+            "tasks": len(group),
+            "polls_mean": sum(polls) / len(polls),
+            "polls_max": polls[-1],
+            "never_polled": sum(1 for p in polls if p == 0),
+            "lifetime_us_p50": percentile(lifetimes, 50) / 1e3,
+            "lifetime_us_p99": percentile(lifetimes, 99) / 1e3,
+            "not_deallocated": len(group) - len(lifetimes),
+        })
+    rows.sort(key=lambda r: r["tasks"], reverse=True)
+    return rows
+
+
+def report(rows, top=20):
+    lines = [f"{'tasks':>7} {'leaked':>7} {'unpolled':>8} {'polls/avg':>9} {'max':>6} "
+             f"{'life p50 us':>12} {'life p99 us':>12}  spawn site"]
+    for r in rows[:top]:
+        lines.append(f"{r['tasks']:>7} {r['not_deallocated']:>7} {r['never_polled']:>8} {r['polls_mean']:>9.1f} "
+                     f"{r['polls_max']:>6} {r['lifetime_us_p50']:>12.1f} {r['lifetime_us_p99']:>12.1f}  {r['site']}")
+    return lines
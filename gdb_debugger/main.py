@@ -2,6 +2,8 @@ import gdb
 import os
 import sys
 import importlib
+import glob
+import time
 
 # --- Setup ---
 
@@ -11,64 +13,104 @@ PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
-# Determine which runtime plugin to use from environment variable or default
-PLUGIN_NAME = os.getenv("GDB_DEBUGGER_PLUGIN", "tokio")
+from gdb_common import snapshot
+from gdb_debugger.store import TraceStore, load
+from gdb_debugger.tracers.backtrace import stacks
+
+# Runtime plugin override; by default the plugin is picked from the crates
+# linked into the loaded binary (tokio when no binary is loaded yet)
+PLUGIN_NAME = os.getenv("GDB_DEBUGGER_PLUGIN")
+
+# GDB_DEBUGGER_NON_STOP=1: breakpoint hits stop only their own thread
+NON_STOP = os.getenv("GDB_DEBUGGER_NON_STOP") == "1"
+if NON_STOP:
+    gdb.execute("set non-stop on")
 
 
 # --- Global Data Store ---
 
-# A dictionary to hold all data collected by tracers.
-# Structure: {
-#   "symbol_name": [
-#     {
-#       "thread_id": gdb.Thread.ptid,
-#       "entry_tracers": { "TracerClassName": data, ... },
-#       "exit_tracers": { "TracerClassName": data, ... }
-#     },
-#     ...
-#   ],
-#   ...
-# }
-traced_data = {}
-
-# This list holds temporary commands for breakpoints.
-bp_commands = []
+# Tracer results are streamed to an NDJSON recording (see gdb_debugger/store.py)
+# instead of being kept in memory; `dump-async-data` reads it back into
+#   { "symbol_name": [ {"thread_id", "timestamp", "entry_tracers", "exit_tracers"}, ... ] }
+# for the plugin. The file is opened by `start-async-debug`, so sourcing this
+# script just to process an old recording does not truncate it.
+OUTPUT_FILE = os.getenv("GDB_DEBUGGER_OUTPUT", os.path.join(PROJECT_ROOT, "results", "traced_data.ndjson"))
+# Struct layouts for `async-tasks`, shared with gdb_profiler (see dwarf_analyzer/layouts.py)
+LAYOUT_FILE = os.getenv("ASYNC_FLAME_LAYOUTS", os.path.join(PROJECT_ROOT, "results", "type_layouts.json"))
+store = None
+
+def on_new_stack(stack_id, pcs):
+    if store is not None:
+        store.define("stack", id=stack_id, pcs=list(pcs))
+
+stacks.on_new_stack = on_new_stack
+
+def on_exited(event):
+    if store is not None:
+        store.flush()
+
+gdb.events.exited.connect(on_exited)
+
+def close_store():
+    """Symbolize the stacks seen so far and write everything out."""
+    global store
+    if store is None:
+        return
+    for pc, name in stacks.symbolize_all().items():
+        store.define("pc", pc=pc, name=name)
+    store.close()
+    print(f"[gdb_debugger] {store.rows} events written to {store.path}")
+    store = None
 
 def run_tracers(symbol_name, entry_tracers, exit_tracers):
     """
-    Called by the temporary breakpoint's command to run tracers
-    after the function prolog has safely completed.
+    Called from EntryBreakpoint.stop to run tracers once the function
+    prolog has completed.
     """
+    if store is None:
+        return
+    # The stopping thread, selected by GDB for stop(); nothing below depends
+    # on the selection again, so other threads may stop meanwhile (non-stop)
     thread = gdb.selected_thread()
-    if symbol_name not in traced_data:
-        traced_data[symbol_name] = []
-    
-    invocation_data = {
-        "thread_id": thread.ptid,
-        "entry_tracers": {},
-        "exit_tracers": {},
-    }
-    traced_data[symbol_name].append(invocation_data)
+    snap = snapshot.current(thread)
+    inv = store.new_invocation()
 
+    values = {}
     for tracer_factory in entry_tracers:
         tracer = tracer_factory()
-        tracer.start(thread)
-        invocation_data["entry_tracers"][str(tracer)] = tracer.read_data()
+        tracer.start(thread, snap)
+        values[str(tracer)] = tracer.read_data()
+    store.record(symbol_name, inv, "entry", thread.ptid, time.perf_counter_ns(), values)
 
     if exit_tracers:
-        FinishBreakpoint(gdb.newest_frame(), symbol_name, invocation_data, exit_tracers)
+        FinishBreakpoint(snap.frame(), thread, symbol_name, inv, exit_tracers)
 
 
 # --- Load Plugin ---
 
+def detect_plugin_name(binary):
+    """Highest-priority plugin whose crates are all linked into `binary`."""
+    from dwarf_analyzer.symbols import linked_crates
+    candidates = []
+    for path in sorted(glob.glob(os.path.join(SCRIPT_DIR, "runtime_plugins", "*.py"))):
+        mod_name = os.path.splitext(os.path.basename(path))[0]
+        if mod_name in ("__init__", "base"):
+            continue
+        try:
+            mod = importlib.import_module(f"gdb_debugger.runtime_plugins.{mod_name}")
+        except ImportError:
+            continue
+        cand = getattr(mod, "plugin", None)
+        if cand is not None and cand.crates:
+            candidates.append((mod_name, cand))
+    present = linked_crates(binary, {c for _, cand in candidates for c in cand.crates})
+    matches = [(cand.priority, mod_name) for mod_name, cand in candidates if set(cand.crates) <= present]
+    return max(matches)[1] if matches else None
+
 try:
-    # Use absolute path for robustness
-    SCRIPT_DIR = os.path.dirname(os.path.realpath(__file__))
-    PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
-    if PROJECT_ROOT not in sys.path:
-        sys.path.insert(0, PROJECT_ROOT)
-    
-    PLUGIN_NAME = os.getenv("GDB_DEBUGGER_PLUGIN", "tokio")
+    if not PLUGIN_NAME:
+        binary = gdb.current_progspace().filename
+        PLUGIN_NAME = (detect_plugin_name(binary) if binary else None) or "tokio"
     plugin_mod = importlib.import_module(f"gdb_debugger.runtime_plugins.{PLUGIN_NAME}")
     plugin = plugin_mod.plugin
     print(f"[gdb_debugger] Loaded runtime plugin: {plugin.name}")
@@ -83,30 +125,44 @@ class FinishBreakpoint(gdb.FinishBreakpoint):
     """
     A finish breakpoint that runs tracers when a function call completes.
     """
-    def __init__(self, frame: gdb.Frame, symbol_name: str, invocation_data: dict, exit_tracers: list):
+    def __init__(self, frame: gdb.Frame, thread: gdb.Thread, symbol_name: str, invocation: int, exit_tracers: list):
+        # Specific to the thread of `frame`: entry and exit of an invocation
+        # are paired by `invocation`, so interleaved threads can't mix them up
         super().__init__(frame, internal=True)
         self.symbol_name = symbol_name
-        self.invocation_data = invocation_data
+        self.invocation = invocation
         self.exit_tracers = exit_tracers
+        self.thread_id = thread.ptid
 
     def stop(self):
         """Called when the frame is about to return."""
+        if store is None:
+            return False
         thread = gdb.selected_thread()
+        snap = snapshot.current(thread)
+        snap.return_value = self.return_value
+        values = {}
         for tracer_factory in self.exit_tracers:
             tracer = tracer_factory()
-            tracer.start(thread)
-            self.invocation_data["exit_tracers"][str(tracer)] = tracer.read_data()
+            tracer.start(thread, snap)
+            values[str(tracer)] = tracer.read_data()
+        store.record(self.symbol_name, self.invocation, "exit", thread.ptid, time.perf_counter_ns(), values)
         return False  # Always continue execution
 
     def out_of_scope(self):
         """Called when the frame is unwound, e.g., by an exception."""
-        self.invocation_data["exit_tracers"]["error"] = "out_of_scope (e.g. exception)"
+        if store is not None:
+            store.record(self.symbol_name, self.invocation, "exit", self.thread_id, time.perf_counter_ns(),
+                         {"error": "out_of_scope (e.g. exception)"})
 
 
 class EntryBreakpoint(gdb.Breakpoint):
     """
-    A two-stage breakpoint to reliably trace function arguments by
-    stepping over the function's prolog code.
+    Traces function arguments in a single stop. The breakpoint is set on
+    the function's name, so GDB places each location after the prolog
+    (from the line table, or prologue analysis without one) once, when
+    the breakpoint is installed or its objfile is (re)loaded; arguments
+    are already in their DWARF locations when it hits.
     """
     def __init__(self, symbol: str, entry_tracers: list, exit_tracers: list):
         super().__init__(symbol, internal=True)
@@ -115,23 +171,8 @@ class EntryBreakpoint(gdb.Breakpoint):
         self.exit_tracers = exit_tracers
 
     def stop(self):
-        # This breakpoint hits at the raw function entry. We now set a
-        # temporary breakpoint at the same spot to run our tracers.
-        pc = gdb.selected_frame().pc()
-        t_break = gdb.Breakpoint(f"*{pc}", gdb.BP_BREAKPOINT, internal=True, temporary=True)
-        
-        # We store the Python function to call in a global list and use its
-        # index to call it from the breakpoint's command string.
-        cmd_index = len(bp_commands)
-        bp_commands.append(lambda: run_tracers(self.symbol_name, self.entry_tracers, self.exit_tracers))
-        
-        # The command string for the temporary breakpoint. It calls our Python
-        # function, then tells GDB to continue automatically.
-        t_break.commands = f"""
-python bp_commands[{cmd_index}]()
-continue
-"""
-        return False # Immediately continue to hit the temporary breakpoint.
+        run_tracers(self.symbol_name, self.entry_tracers, self.exit_tracers)
+        return False  # Always continue execution
 
 
 # --- GDB Commands ---
@@ -146,6 +187,12 @@ class StartAsyncDebugger(gdb.Command):
             print("[gdb_debugger] No plugin loaded. Cannot start.")
             return
 
+        global store
+        if store is None:
+            store = TraceStore(OUTPUT_FILE)
+            stacks.clear()
+            print(f"[gdb_debugger] Recording to {OUTPUT_FILE}")
+
         print("[gdb_debugger] Setting instrumentation points...")
         for point in plugin.instrument_points():
             try:
@@ -157,8 +204,27 @@ class StartAsyncDebugger(gdb.Command):
         print("\n[gdb_debugger] Instrumentation complete. Run your program.")
         print("Use 'dump-async-data' after execution to see the report.")
 
+def load_recording(path):
+    """Read a recording back for process_data, restoring its stack table."""
+    traced_data, recorded_stacks, pc_names = load(path)
+    stacks.restore(recorded_stacks, pc_names)
+    for invocations in traced_data.values():
+        for invocation in invocations:
+            for values in (invocation["entry_tracers"], invocation["exit_tracers"]):
+                stack_id = values.get("BacktraceTracer")
+                if isinstance(stack_id, int) and stack_id < len(stacks.counts):
+                    stacks.counts[stack_id] += 1
+    return traced_data
+
+
 class DumpAsyncData(gdb.Command):
-    """GDB command to process and dump the collected trace data."""
+    """GDB command to process and dump the collected trace data.
+
+    Usage: dump-async-data [FILE]
+    Without FILE the current recording is closed and processed. With FILE
+    an earlier recording is processed offline, no inferior needed, e.g.
+    gdb -batch -x gdb_debugger/main.py -ex 'dump-async-data results/traced_data.ndjson'
+    """
     def __init__(self):
         super().__init__("dump-async-data", gdb.COMMAND_USER)
 
@@ -166,9 +232,127 @@ class DumpAsyncData(gdb.Command):
         if not plugin:
             print("[gdb_debugger] No plugin loaded.")
             return
-        
-        print("[gdb_debugger] Processing collected data...")
-        plugin.process_data(traced_data)
+
+        path = arg.strip()
+        if not path:
+            path = store.path if store is not None else OUTPUT_FILE
+            close_store()
+        if not os.path.exists(path):
+            print(f"[gdb_debugger] No recording at {path}.")
+            return
+        print(f"[gdb_debugger] Processing collected data from {path}...")
+        plugin.process_data(load_recording(path))
+
+
+# Where tokio keeps its OwnedTasks lists: the runtime handle is reachable from
+# the thread-local scheduler context of any thread inside the runtime
+CONTEXT_VARIABLES = "tokio::runtime::context::CONTEXT"
+MAX_SEARCH_DEPTH = 12
+
+
+def find_task_lists(value, snap, heads, seen, depth=0):
+    """
+    Collect the `head` of every LinkedList of task Headers reachable from
+    `value`: pointers (Arc, Box, NonNull) are followed and slices
+    (ShardedList's Box<[Mutex<LinkedList>]>) iterated, to a bounded depth.
+    """
+    if depth > MAX_SEARCH_DEPTH:
+        return
+    try:
+        t = value.type.strip_typedefs()
+        if t.code == gdb.TYPE_CODE_PTR:
+            address = int(value)
+            target = t.target().strip_typedefs()
+            if address and address not in seen and target.code in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION):
+                seen.add(address)
+                find_task_lists(value.dereference(), snap, heads, seen, depth + 1)
+            return
+        if t.code not in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION):
+            return
+        names = [f.name for f in t.fields()]
+        if "data_ptr" in names and "length" in names:
+            for i in range(min(int(value["length"]), 4096)):
+                find_task_lists(value["data_ptr"][i], snap, heads, seen, depth + 1)
+            return
+        if str(t).startswith("tokio::util::linked_list::LinkedList") and "head" in names:
+            head = snap.read_int(int(value["head"].address), 8)
+            if head:
+                heads.add(head)
+            return
+        for name in names:
+            if name:
+                find_task_lists(value[name], snap, heads, seen, depth + 1)
+    except (gdb.error, gdb.MemoryError, RuntimeError):
+        pass
+
+
+def link_bias(layouts):
+    """Runtime minus link address of the binary, from any known task poll fn."""
+    for pc, entry in layouts.task_polls.items():
+        try:
+            return int(gdb.parse_and_eval(f"(unsigned long)&'{entry['symbol']}'")) - pc
+        except gdb.error:
+            continue
+    return 0
+
+
+class AsyncTasks(gdb.Command):
+    """List every tokio task with the await chain it is suspended in.
+
+    Usage: async-tasks [EXPR]
+    EXPR is any value leading to the runtime (e.g. a Runtime or Handle
+    variable); by default the runtime is found from each thread's tokio
+    context. Needs the layouts of the binary:
+    python -m dwarf_analyzer.layouts <binary> results/type_layouts.json
+    """
+    def __init__(self):
+        super().__init__("async-tasks", gdb.COMMAND_USER)
+
+    def invoke(self, arg, from_tty):
+        from dwarf_analyzer.layouts import StructLayouts
+        from gdb_debugger.task_dump import TaskDecoder, format_tasks
+        if not os.path.exists(LAYOUT_FILE):
+            print(f"[gdb_debugger] No layouts at {LAYOUT_FILE}; generate them with dwarf_analyzer.layouts.")
+            return
+        decoder = TaskDecoder(StructLayouts.load(LAYOUT_FILE), None)
+        if decoder.missing():
+            print(f"[gdb_debugger] Layouts lack {', '.join(decoder.missing())}; is this a tokio binary with debug info?")
+            return
+        decoder.bias = link_bias(decoder.layouts)
+
+        heads, seen = set(), set()
+        selected = gdb.selected_thread()
+        try:
+            for thread in gdb.selected_inferior().threads():
+                snap = snapshot.current(thread)
+                decoder.memory = snap
+                roots = [arg] if arg.strip() else self.context_variables()
+                for expr in roots:
+                    try:
+                        find_task_lists(snap.parse_and_eval(expr), snap, heads, seen)
+                    except gdb.error:
+                        continue
+                if arg.strip():
+                    break
+        finally:
+            selected.switch()
+        if not heads:
+            print("[gdb_debugger] No tokio task list found; pass a Runtime or Handle expression.")
+            return
+        tasks = decoder.dump(sorted(heads))
+        print(f"[gdb_debugger] {len(tasks)} tasks")
+        for line in format_tasks(tasks):
+            print(line)
+
+    @staticmethod
+    def context_variables():
+        out = gdb.execute(f"info variables -q {CONTEXT_VARIABLES}", to_string=True)
+        names = []
+        for line in out.splitlines():
+            line = line.strip().rstrip(";")
+            if CONTEXT_VARIABLES in line:
+                names.append(line.split()[-1] if " " in line else line)
+        return [f"'{name}'" if "::" in name else name for name in dict.fromkeys(names)]
 
 
 # --- Register GDB Commands ---
@@ -177,4 +361,6 @@ if plugin:
     StartAsyncDebugger()
     DumpAsyncData()
 else:
-    print("[gdb_debugger] Commands not registered due to plugin load failure.") 
\ No newline at end of file
+    print("[gdb_debugger] Commands not registered due to plugin load failure.")
+# Independent of the tracing plugin
+AsyncTasks()
@@ -0,0 +1,17 @@
+from gdb_debugger.runtime_plugins.async_task import AsyncTaskPlugin
+
+class AsyncStdPlugin(AsyncTaskPlugin):
+    """A plugin to instrument async-std (async-global-executor underneath)."""
+    crates = ("async_std",)
+    priority = 20
+    spawn_symbols = (
+        "async_std::task::builder::Builder::spawn",
+        "async_std::task::builder::Builder::local",
+    )
+
+    @property
+    def name(self):
+        return "async-std"
+
+# A single instance of the plugin to be loaded by the main script.
+plugin = AsyncStdPlugin()
@@ -0,0 +1,101 @@
+from gdb_debugger.runtime_plugins.base import RuntimePlugin
+from gdb_debugger.tracers.variable import VariableTracer
+from gdb_debugger.tracers.backtrace import BacktraceTracer
+
+# --- Tracer Factory Functions ---
+
+def task_ptr_tracer():
+    """Tracer for the raw task pointer every async_task::raw::RawTask fn takes."""
+    return VariableTracer("ptr", scope='local')
+
+def spawn_backtrace_tracer():
+    """Backtrace tracer for the executor's spawn entry point."""
+    return BacktraceTracer()
+
+def queue_head_tracer():
+    """concurrent_queue::unbounded::Unbounded head index."""
+    return VariableTracer("self.head.value.index.v.value", scope='local')
+
+def queue_tail_tracer():
+    """concurrent_queue::unbounded::Unbounded tail index."""
+    return VariableTracer("self.tail.value.index.v.value", scope='local')
+
+
+RAW_SCHEDULE = "async_task::raw::RawTask::schedule"
+RAW_RUN = "async_task::raw::RawTask::run"
+RAW_WAKE = "async_task::raw::RawTask::wake"
+QUEUE_PUSH = "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable<()>>::push"
+QUEUE_POP = "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable<()>>::pop"
+
+# concurrent_queue::unbounded index encoding
+SHIFT = 1
+LAP = 32
+
+
+def unbounded_len(head, tail):
+    """Port of concurrent_queue::unbounded::Unbounded::len()."""
+    tail &= ~((1 << SHIFT) - 1)
+    head &= ~((1 << SHIFT) - 1)
+    if (tail >> SHIFT) & (LAP - 1) == LAP - 1:
+        tail += 1 << SHIFT
+    if (head >> SHIFT) & (LAP - 1) == LAP - 1:
+        head += 1 << SHIFT
+    lap = (head >> SHIFT) // LAP
+    tail -= (lap * LAP) << SHIFT
+    head -= (lap * LAP) << SHIFT
+    tail >>= SHIFT
+    head >>= SHIFT
+    return tail - head - tail // LAP
+
+
+# --- Plugin Implementation ---
+
+class AsyncTaskPlugin(RuntimePlugin):
+    """
+    Shared instrumentation for executors built on async-task and
+    async-executor (async-std, smol). Subclasses name the spawn functions.
+    """
+    spawn_symbols = ()
+
+    def instrument_points(self):
+        points = [
+            {"symbol": sym, "entry_tracers": [spawn_backtrace_tracer], "exit_tracers": []}
+            for sym in self.spawn_symbols
+        ]
+        points += [
+            {"symbol": RAW_SCHEDULE, "entry_tracers": [task_ptr_tracer], "exit_tracers": []},
+            {"symbol": RAW_RUN, "entry_tracers": [task_ptr_tracer], "exit_tracers": []},
+            {"symbol": RAW_WAKE, "entry_tracers": [task_ptr_tracer], "exit_tracers": []},
+            {"symbol": QUEUE_PUSH, "entry_tracers": [queue_head_tracer, queue_tail_tracer], "exit_tracers": []},
+            {"symbol": QUEUE_POP, "entry_tracers": [queue_head_tracer, queue_tail_tracer], "exit_tracers": []},
+        ]
+        return points
+
+    def process_data(self, all_traced_data: dict):
+        """
+        Prints per-symbol call counts, distinct tasks, the runnable backlog
+        (schedules not yet run) and the executor queue lengths seen at push/pop.
+        """
+        print(f"\n[gdb_debugger] ----- {self.name} Runtime Data Report -----")
+        for symbol, invocations in all_traced_data.items():
+            print(f"\n  Symbol: {symbol} ({len(invocations)} calls)")
+
+        def task_ptrs(symbol):
+            return [inv["entry_tracers"].get(str(task_ptr_tracer())) for inv in all_traced_data.get(symbol, [])]
+
+        scheduled, ran = task_ptrs(RAW_SCHEDULE), task_ptrs(RAW_RUN)
+        tasks = {p for p in scheduled + ran if isinstance(p, int)}
+        print(f"\n  Distinct tasks: {len(tasks)}")
+        print(f"  Runnable backlog at end (schedules - runs): {max(0, len(scheduled) - len(ran))}")
+
+        lengths = []
+        for symbol in (QUEUE_PUSH, QUEUE_POP):
+            for inv in all_traced_data.get(symbol, []):
+                head = inv["entry_tracers"].get(str(queue_head_tracer()))
+                tail = inv["entry_tracers"].get(str(queue_tail_tracer()))
+                if isinstance(head, int) and isinstance(tail, int):
+                    lengths.append(unbounded_len(head, tail))
+        if lengths:
+            print(f"  Run queue length: max {max(lengths)}, mean {sum(lengths) / len(lengths):.1f} "
+                  f"over {len(lengths)} samples")
+        print("\n[gdb_debugger] -------------------------------------\n")
@@ -3,6 +3,12 @@ class RuntimePlugin:
     Base class for runtime-specific plugins. A plugin defines what to trace
     and how to process the collected data.
     """
+    # Crates whose symbols identify this runtime in a binary; when several
+    # plugins match, the highest `priority` wins (async-std also links
+    # async-executor, which alone means smol).
+    crates = ()
+    priority = 0
+
     @property
     def name(self):
         """Returns the name of the runtime (e.g., 'tokio')."""
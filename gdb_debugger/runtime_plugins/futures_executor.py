@@ -0,0 +1,80 @@
+from gdb_debugger.runtime_plugins.base import RuntimePlugin
+from gdb_debugger.tracers.variable import VariableTracer
+from gdb_debugger.tracers.backtrace import BacktraceTracer
+
+# --- Tracer Factory Functions ---
+
+def pool_tracer():
+    """Address of the LocalPool being run."""
+    return VariableTracer("self", scope='local')
+
+def pool_len_tracer():
+    """Tasks already in the pool: len_all of the FuturesUnordered head task."""
+    return VariableTracer("(*self.pool.head_all.p.value).len_all.value", scope='local')
+
+def incoming_len_tracer():
+    """Spawned tasks not yet moved into the pool: Rc<RefCell<Vec<_>>>::len."""
+    return VariableTracer("(*self.incoming.ptr.pointer).value.value.value.len", scope='local')
+
+def spawn_backtrace_tracer():
+    return BacktraceTracer()
+
+
+POOL_RUNS = (
+    "futures_executor::local_pool::LocalPool::run",
+    "futures_executor::local_pool::LocalPool::run_until",
+    "futures_executor::local_pool::LocalPool::run_until_stalled",
+    "futures_executor::local_pool::LocalPool::try_run_one",
+)
+
+
+# --- Plugin Implementation ---
+
+class FuturesExecutorPlugin(RuntimePlugin):
+    """A plugin to instrument futures::executor (block_on and LocalPool)."""
+    crates = ("futures_executor",)
+    priority = 1
+
+    @property
+    def name(self):
+        return "futures-executor"
+
+    def instrument_points(self):
+        points = [
+            {"symbol": "futures_executor::local_pool::block_on",
+             "entry_tracers": [spawn_backtrace_tracer], "exit_tracers": []},
+            {"symbol": "<futures_executor::local_pool::LocalSpawner as futures_task::spawn::LocalSpawn>::spawn_local_obj",
+             "entry_tracers": [spawn_backtrace_tracer], "exit_tracers": []},
+            {"symbol": "<futures_executor::local_pool::ThreadNotify as futures_task::arc_wake::ArcWake>::wake_by_ref",
+             "entry_tracers": [], "exit_tracers": []},
+        ]
+        points += [
+            {"symbol": sym, "entry_tracers": [pool_tracer, pool_len_tracer, incoming_len_tracer], "exit_tracers": []}
+            for sym in POOL_RUNS
+        ]
+        return points
+
+    def process_data(self, all_traced_data: dict):
+        """
+        Prints call counts and the LocalPool backlog (pool + incoming) seen
+        each time the pool was run.
+        """
+        print("\n[gdb_debugger] ----- futures-executor Runtime Data Report -----")
+        for symbol, invocations in all_traced_data.items():
+            print(f"\n  Symbol: {symbol} ({len(invocations)} calls)")
+        for symbol in POOL_RUNS:
+            for i, inv in enumerate(all_traced_data.get(symbol, [])):
+                entry = inv["entry_tracers"]
+                pool = entry.get(str(pool_tracer()))
+                in_pool = entry.get(str(pool_len_tracer()))
+                incoming = entry.get(str(incoming_len_tracer()))
+                # An empty pool has a null head task, which shows up as a read error
+                in_pool = in_pool if isinstance(in_pool, int) else 0
+                incoming = incoming if isinstance(incoming, int) else 0
+                pool = f"0x{pool:x}" if isinstance(pool, int) else "?"
+                print(f"    {symbol.rsplit('::', 1)[-1]} #{i + 1}: pool={pool} "
+                      f"backlog={in_pool + incoming} (pool {in_pool}, incoming {incoming})")
+        print("\n[gdb_debugger] -------------------------------------\n")
+
+# A single instance of the plugin to be loaded by the main script.
+plugin = FuturesExecutorPlugin()
@@ -0,0 +1,17 @@
+from gdb_debugger.runtime_plugins.async_task import AsyncTaskPlugin
+
+class SmolPlugin(AsyncTaskPlugin):
+    """A plugin to instrument smol / async-executor."""
+    crates = ("async_executor",)
+    priority = 5
+    spawn_symbols = (
+        "async_executor::Executor::spawn",
+        "async_executor::LocalExecutor::spawn",
+    )
+
+    @property
+    def name(self):
+        return "smol"
+
+# A single instance of the plugin to be loaded by the main script.
+plugin = SmolPlugin()
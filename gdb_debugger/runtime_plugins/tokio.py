@@ -1,6 +1,21 @@
+import os
 from gdb_debugger.runtime_plugins.base import RuntimePlugin
 from gdb_debugger.tracers.variable import VariableTracer
-from gdb_debugger.tracers.backtrace import BacktraceTracer
+from gdb_debugger.tracers.backtrace import BacktraceTracer, stacks
+from gdb_debugger.tracers.return_value import ReturnValueTracer
+from gdb_debugger import lifecycle
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+TASK_TRACE = os.getenv("GDB_DEBUGGER_TASK_TRACE", os.path.join(PROJECT_ROOT, "results", "task_lifecycles.json"))
+
+RAW_NEW = "tokio::runtime::task::raw::RawTask::new"
+RAW_POLL = "tokio::runtime::task::raw::RawTask::poll"
+RAW_SHUTDOWN = "tokio::runtime::task::raw::RawTask::shutdown"
+RAW_DEALLOC = "tokio::runtime::task::raw::RawTask::dealloc"
+
+# Frames skipped when naming a spawn site: the first frame outside these is
+# the user code that called tokio::spawn (or the runtime itself, for its own tasks)
+RUNTIME_PREFIXES = ("tokio::", "core::", "alloc::", "std::")
 
 # --- Tracer Factory Functions ---
 
@@ -16,15 +31,45 @@ def new_task_backtrace_tracer():
     """Backtrace tracer for RawTask::new to find the spawn location."""
     return BacktraceTracer()
 
+def new_task_ptr_tracer():
+    """The RawTask returned by RawTask::new, i.e. the task pointer polls refer to."""
+    return ReturnValueTracer()
+
 def context_tracer():
     """Tracer for the static CONTEXT variable in Tokio."""
     return VariableTracer("CONTEXT", scope='static')
 
 
+def format_stack(stack_id):
+    return " <- ".join(f["name"] or f"0x{f['pc']:x}" for f in stacks.resolve(stack_id))
+
+def spawn_site(stack_id):
+    if not isinstance(stack_id, int) or stack_id >= len(stacks.stacks):
+        return "(no stack)"
+    frames = stacks.resolve(stack_id)
+    for f in frames:
+        if f["name"] and not f["name"].startswith(RUNTIME_PREFIXES):
+            return f["name"]
+    if not frames:
+        return "(empty stack)"
+    return frames[-1]["name"] or f"0x{frames[-1]['pc']:x}"
+
+def format_trace(tracer, data):
+    # Backtraces are stored as interned stack ids, symbolized only here
+    if tracer == "BacktraceTracer" and isinstance(data, int):
+        return f"stack #{data}: {format_stack(data)}"
+    # Pretty print gdb.Value
+    if "gdb.Value" in str(type(data)):
+        return str(data.lazy_string())
+    return str(data)
+
+
 # --- Plugin Implementation ---
 
 class TokioPlugin(RuntimePlugin):
     """A plugin to instrument the Tokio runtime."""
+    crates = ("tokio",)
+    priority = 10
 
     @property
     def name(self):
@@ -36,22 +81,22 @@ class TokioPlugin(RuntimePlugin):
         """
         return [
             {
-                "symbol": "tokio::runtime::task::raw::RawTask::new",
+                "symbol": RAW_NEW,
                 "entry_tracers": [new_task_id_tracer, new_task_backtrace_tracer],
-                "exit_tracers": [],
+                "exit_tracers": [new_task_ptr_tracer],
             },
             {
-                "symbol": "tokio::runtime::task::raw::RawTask::poll",
+                "symbol": RAW_POLL,
                 "entry_tracers": [self_tracer],
                 "exit_tracers": [],
             },
             {
-                "symbol": "tokio::runtime::task::raw::RawTask::shutdown",
+                "symbol": RAW_SHUTDOWN,
                 "entry_tracers": [self_tracer],
                 "exit_tracers": [],
             },
             {
-                "symbol": "tokio::runtime::task::raw::RawTask::dealloc",
+                "symbol": RAW_DEALLOC,
                 "entry_tracers": [self_tracer],
                 "exit_tracers": [],
             },
@@ -71,22 +116,32 @@ class TokioPlugin(RuntimePlugin):
                 if entry_data:
                     print("      Entry Traces:")
                     for tracer, data in entry_data.items():
-                        # Pretty print gdb.Value
-                        if "gdb.Value" in str(type(data)):
-                             data_str = str(data.lazy_string())
-                        else:
-                            data_str = str(data)
-                        print(f"        - {tracer}: {data_str[:200]}")
+                        print(f"        - {tracer}: {format_trace(tracer, data)[:200]}")
 
                 exit_data = invocation.get('exit_tracers', {})
                 if exit_data:
                     print("      Exit Traces:")
                     for tracer, data in exit_data.items():
-                        if "gdb.Value" in str(type(data)):
-                             data_str = str(data.lazy_string())
-                        else:
-                            data_str = str(data)
-                        print(f"        - {tracer}: {data_str[:200]}")
+                        print(f"        - {tracer}: {format_trace(tracer, data)[:200]}")
+
+        if stacks.stacks:
+            print(f"\n  Distinct stacks: {len(stacks.stacks)}")
+            for stack_id, hits in stacks.most_common(10):
+                print(f"    #{stack_id} x{hits}: {format_stack(stack_id)[:200]}")
+
+        tasks, orphans = lifecycle.build_lifecycles(
+            all_traced_data,
+            {"new": RAW_NEW, "poll": RAW_POLL, "shutdown": RAW_SHUTDOWN, "dealloc": RAW_DEALLOC},
+            id_key=str(new_task_id_tracer()), ptr_key=str(self_tracer()),
+            stack_key=str(new_task_backtrace_tracer()), spawn_ptr_key=str(new_task_ptr_tracer()))
+        if tasks:
+            print(f"\n  Task lifecycles: {len(tasks)} spawned, "
+                  f"{sum(1 for t in tasks if t.dealloc_ts is None)} never deallocated, "
+                  f"{orphans} events of tasks spawned before tracing")
+            for line in lifecycle.report(lifecycle.spawn_site_stats(tasks, spawn_site)):
+                print(f"    {line}")
+            lifecycle.export_chrome(tasks, TASK_TRACE)
+            print(f"  Task timeline written to {TASK_TRACE}")
 
         print("\n[gdb_debugger] -------------------------------------\n")
 
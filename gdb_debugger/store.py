@@ -0,0 +1,135 @@
+import json
+import os
+
+# On-disk format of gdb_debugger recordings: NDJSON, one object per line.
+#
+#   {"t": "sym", "id": 0, "name": "tokio::runtime::task::raw::RawTask::new"}
+#   {"t": "ev", "sym": 0, "inv": 7, "ph": "entry", "tid": [pid, lwp, 0],
+#    "ts": 123456789, "v": {"VariableTracer(id.__0)": 42, ...}}
+#   {"t": "stack", "id": 3, "pcs": [...]}       # BacktraceTracer stack ids
+#   {"t": "pc", "pc": 94..., "name": "main"}    # symbolized when the file is closed
+#
+# "ph" is "entry" or "exit"; an exit row carries the `inv` of its entry.
+# Tracer values are plain JSON at capture time: ints, strings (errors) and
+# {"bytes": "<hex>"} for raw memory.
+
+CHUNK_ROWS = 4096
+COLUMNS = ("sym", "inv", "ph", "tid", "ts", "v")
+
+
+def plain(value):
+    """A tracer value as plain JSON data, so no gdb.Value outlives its stop."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"bytes": bytes(value).hex()}
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): plain(v) for k, v in value.items()}
+    try:
+        return int(value)
+    except Exception:
+        return str(value)
+
+
+class TraceStore:
+    """
+    Columnar buffer of tracer events. Rows are appended column by column
+    and written out every CHUNK_ROWS rows, so memory stays bounded however
+    long the recording runs.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.symbols = {}        # name -> id
+        self.invocations = 0
+        self.rows = 0
+        self.columns = {c: [] for c in COLUMNS}
+        self._pending = []       # definition rows (symbols, stacks) not yet written
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fp = open(path, "w")
+
+    def symbol_id(self, name: str) -> int:
+        sym = self.symbols.get(name)
+        if sym is None:
+            sym = self.symbols[name] = len(self.symbols)
+            self._pending.append({"t": "sym", "id": sym, "name": name})
+        return sym
+
+    def new_invocation(self) -> int:
+        self.invocations += 1
+        return self.invocations
+
+    def record(self, symbol: str, inv: int, phase: str, tid, ts: int, values: dict):
+        cols = self.columns
+        cols["sym"].append(self.symbol_id(symbol))
+        cols["inv"].append(inv)
+        cols["ph"].append(phase)
+        cols["tid"].append(list(tid))
+        cols["ts"].append(ts)
+        cols["v"].append({k: plain(v) for k, v in values.items()})
+        if len(cols["sym"]) >= CHUNK_ROWS:
+            self.flush()
+
+    def define(self, kind: str, **fields):
+        """Add a non-event row, e.g. a stack or a symbolized pc."""
+        self._pending.append({"t": kind, **fields})
+
+    def flush(self):
+        if self._fp is None:
+            return
+        lines = [json.dumps(row) for row in self._pending]
+        cols = self.columns
+        for row in zip(*(cols[c] for c in COLUMNS)):
+            lines.append(json.dumps({"t": "ev", **dict(zip(COLUMNS, row))}))
+        self.rows += len(cols["sym"])
+        if lines:
+            self._fp.write("\n".join(lines) + "\n")
+            self._fp.flush()
+        self._pending.clear()
+        for col in cols.values():
+            col.clear()
+
+    def close(self):
+        self.flush()
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+def load(path: str):
+    """
+    Read a recording back as (traced_data, stacks, pc_names).
+
+    traced_data has the shape plugins' process_data expects:
+    {symbol: [{"thread_id", "timestamp", "entry_tracers", "exit_tracers"}, ...]}
+    """
+    names, by_inv = {}, {}
+    traced_data, stacks, pc_names = {}, {}, {}
+    with open(path) as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            kind = row["t"]
+            if kind == "sym":
+                names[row["id"]] = row["name"]
+            elif kind == "stack":
+                stacks[row["id"]] = tuple(row["pcs"])
+            elif kind == "pc":
+                pc_names[row["pc"]] = row["name"]
+            elif kind == "ev" and row["ph"] == "entry":
+                invocation = {
+                    "thread_id": tuple(row["tid"]),
+                    "timestamp": row["ts"],
+                    "entry_tracers": row["v"],
+                    "exit_tracers": {},
+                }
+                by_inv[row["inv"]] = invocation
+                traced_data.setdefault(names[row["sym"]], []).append(invocation)
+            elif kind == "ev":
+                invocation = by_inv.get(row["inv"])
+                if invocation is not None:
+                    invocation["exit_tracers"].update(row["v"])
+                    invocation["exit_timestamp"] = row["ts"]
+    return traced_data, stacks, pc_names
@@ -0,0 +1,119 @@
+from dwarf_analyzer.layouts import StructLayouts
+
+# Where is every tokio task suspended right now. Walks the runtime's
+# OwnedTasks list (header -> vtable.trailer_offset -> trailer.owned.next) and
+# decodes each task's future from DWARF layouts (dwarf_analyzer.layouts):
+# the vtable's poll fn names the future type T (tokio::runtime::task::raw::poll<T, S>),
+# the task Cell places T at a fixed offset, and the coroutine's `__state`
+# byte picks the suspend point whose `__awaitee` is decoded the same way.
+#
+# Pure Python: `memory` is anything with read_int(address, size) returning
+# None when unreadable, e.g. a gdb_common.snapshot.StopSnapshot.
+
+MAX_TASKS = 100000
+MAX_AWAIT_DEPTH = 32
+# rustc stores coroutine state in a u8 unless there are more than 256 states
+STATE_SIZE = 1
+
+
+class TaskDecoder:
+    def __init__(self, layouts: StructLayouts, memory, bias: int = 0, ptr_size: int = 8):
+        self.layouts = layouts
+        self.memory = memory
+        self.bias = bias   # runtime address - link address (PIE)
+        self.ptr_size = ptr_size
+        self.header_vtable = layouts.offset("Header", "vtable", ("state", "queue_next"))
+        self.vtable_poll = layouts.offset("Vtable", "poll", ("trailer_offset",))
+        self.vtable_trailer = layouts.offset("Vtable", "trailer_offset", ("poll",))
+        self.vtable_id = layouts.offset("Vtable", "id_offset", ("poll",))
+        owned = layouts.offset("Trailer", "owned")
+        inner = layouts.offset(r"Pointers<.*>", "inner")
+        nxt = layouts.offset(r"PointersInner<.*>", "next", ("prev",))
+        # Pointers.inner is an UnsafeCell, whose value is at offset 0
+        self.trailer_next = None if None in (owned, inner, nxt) else owned + inner + nxt
+
+    def missing(self) -> list:
+        """Layout pieces the binary does not provide (tokio version / debug info)."""
+        needed = {"Header.vtable": self.header_vtable, "Vtable.poll": self.vtable_poll,
+                  "Vtable.trailer_offset": self.vtable_trailer, "Trailer.owned.next": self.trailer_next}
+        return [name for name, offset in needed.items() if offset is None]
+
+    def _ptr(self, address):
+        return self.memory.read_int(address, self.ptr_size) if address else None
+
+    def next_task(self, header: int):
+        vtable = self._ptr(header + self.header_vtable)
+        trailer = self._ptr(vtable + self.vtable_trailer) if vtable else None
+        return None if trailer is None else self._ptr(header + trailer + self.trailer_next)
+
+    def walk(self, head: int):
+        """Task headers from `head`, stopping on a null, unreadable or repeated link."""
+        seen = set()
+        node = head
+        while node and node not in seen and len(seen) < MAX_TASKS:
+            seen.add(node)
+            yield node
+            node = self.next_task(node)
+
+    def await_chain(self, address: int, type_id: str) -> list:
+        """Follow `__awaitee` from the future at `address` down to the innermost leaf."""
+        chain = []
+        futures = self.layouts.futures
+        while type_id and len(chain) < MAX_AWAIT_DEPTH:
+            future = futures.get(type_id)
+            if future is None:
+                name = self.layouts.type_names.get(type_id, f"<type 0x{type_id}>")
+                chain.append({"future": name, "address": address, "state": None, "line": None})
+                break
+            discr = self.memory.read_int(address + future["discr_offset"], STATE_SIZE)
+            state = future["states"].get(str(discr))
+            chain.append({"future": future["name"], "address": address,
+                          "state": state["name"] if state else f"state {discr}",
+                          "line": state["line"] if state else None})
+            if state is None or state["awaitee"] is None:
+                break
+            address, type_id = address + state["awaitee"], state["awaitee_type"]
+        return chain
+
+    def decode(self, header: int) -> dict:
+        task = {"header": header, "id": None, "future": None, "chain": []}
+        vtable = self._ptr(header + self.header_vtable)
+        if not vtable:
+            return task
+        if self.vtable_id is not None:
+            id_offset = self._ptr(vtable + self.vtable_id)
+            if id_offset is not None:
+                task["id"] = self.memory.read_int(header + id_offset, 8)
+        poll = self._ptr(vtable + self.vtable_poll)
+        entry = self.layouts.task_polls.get(poll - self.bias) if poll is not None else None
+        if entry is None:
+            return task
+        type_id = entry["type"]
+        future = self.layouts.futures.get(type_id)
+        task["future"] = future["name"] if future else self.layouts.type_names.get(type_id, entry["symbol"])
+        offset = self.layouts.cells.get(type_id)
+        if offset is not None:
+            task["chain"] = self.await_chain(header + offset, type_id)
+        return task
+
+    def dump(self, heads) -> list:
+        tasks, seen = [], set()
+        for head in heads:
+            for header in self.walk(head):
+                if header not in seen:
+                    seen.add(header)
+                    tasks.append(self.decode(header))
+        return tasks
+
+
+def format_tasks(tasks: list) -> list:
+    lines = []
+    for task in tasks:
+        task_id = task["id"] if task["id"] is not None else "?"
+        lines.append(f"task {task_id} (header 0x{task['header']:x}): {task['future'] or '<unknown future>'}")
+        for depth, frame in enumerate(task["chain"]):
+            where = frame["state"] or "leaf"
+            if frame["line"] is not None:
+                where += f" at line {frame['line']}"
+            lines.append(f"  {'  ' * depth}{frame['future']} [{where}] @0x{frame['address']:x}")
+    return lines
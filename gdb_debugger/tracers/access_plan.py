@@ -0,0 +1,96 @@
+import gdb
+from gdb_debugger.tracers.locations import SIMPLE_EXPR, parse_location
+
+# An access plan is a variable expression (`id.__0`, `self.ptr.pointer`)
+# resolved once per breakpoint location into "register R (+ offset), then
+# deref / add field offsets, read W bytes". Evaluating it on later hits costs
+# one register read and a few fixed-size memory reads through the stop
+# snapshot, instead of a symbol lookup and expression parse in GDB.
+#
+# The root variable's location comes from GDB's description of its DWARF
+# location (`info address`); the field offsets and derefs from its type.
+# Anything else (location lists, optimized-out values, computed locations,
+# thread-locals, indexing, ...) has no plan and keeps using parse_and_eval.
+
+DEREF = None  # step marker: load a pointer from the current address
+
+_POINTER_CODES = (gdb.TYPE_CODE_PTR, gdb.TYPE_CODE_REF, gdb.TYPE_CODE_RVALUE_REF)
+
+
+class AccessPlan:
+    __slots__ = ("register", "offset", "in_register", "steps", "width", "ptr_size")
+
+    def __init__(self, register, offset, in_register, steps, width, ptr_size):
+        self.register = register      # None for statics (offset is then the address)
+        self.offset = offset
+        self.in_register = in_register  # the root value itself lives in `register`
+        self.steps = steps            # field offsets and DEREF markers
+        self.width = width
+        self.ptr_size = ptr_size
+
+    def run(self, snap):
+        """The value at this stop, None if some memory on the way is unreadable."""
+        steps = self.steps
+        if self.register is None:
+            addr = self.offset
+        elif self.in_register:
+            value = snap.register(self.register)
+            if not steps:
+                return value & ((1 << (8 * self.width)) - 1)
+            addr, steps = value, steps[1:]  # compile() guarantees steps[0] is DEREF
+        else:
+            addr = snap.register(self.register) + self.offset
+        for step in steps:
+            if step is DEREF:
+                addr = snap.read_int(addr, self.ptr_size)
+                if not addr:
+                    return None
+            else:
+                addr += step
+        return snap.read_int(addr, self.width)
+
+
+def _root_location(root, snap):
+    """(register, offset, in_register) of `root` at this stop, or None."""
+    snap.frame().select()
+    try:
+        desc = gdb.execute(f"info address {root}", to_string=True)
+    except gdb.error:
+        return None
+    return parse_location(desc)
+
+
+def compile_plan(expression: str, snap):
+    """AccessPlan for a dotted field path at the snapshot's location, or None."""
+    if not SIMPLE_EXPR.fullmatch(expression):
+        return None
+    root, *path = expression.split(".")
+    location = _root_location(root, snap)
+    if location is None:
+        return None
+    register, offset, in_register = location
+    try:
+        vtype = snap.parse_and_eval(root).type.strip_typedefs()
+    except gdb.error:
+        return None
+    ptr_size = None
+    steps = []
+    for name in path:
+        # Field access through references and pointers derefs them first
+        while vtype.code in _POINTER_CODES:
+            ptr_size = vtype.sizeof
+            steps.append(DEREF)
+            vtype = vtype.target().strip_typedefs()
+        if vtype.code not in (gdb.TYPE_CODE_STRUCT, gdb.TYPE_CODE_UNION):
+            return None
+        field = next((f for f in vtype.fields() if f.name == name), None)
+        if field is None or not hasattr(field, "bitpos") or field.bitpos % 8:
+            return None
+        if field.bitpos:
+            steps.append(field.bitpos // 8)
+        vtype = field.type.strip_typedefs()
+    if in_register and steps and steps[0] is not DEREF:
+        return None  # fields of a struct held in registers
+    if vtype.sizeof not in (1, 2, 4, 8):
+        return None
+    return AccessPlan(register, offset, in_register, steps, vtype.sizeof, ptr_size or 8)
@@ -1,30 +1,44 @@
 from gdb_debugger.tracers.base import Tracer
 import gdb
+import os
+from gdb_common.snapshot import StopSnapshot
+from gdb_debugger.tracers.stack_table import StackTable, collect_pcs
+
+# Frames captured per backtrace unless a tracer asks for another depth
+DEFAULT_MAX_DEPTH = int(os.getenv("GDB_DEBUGGER_STACK_DEPTH", "16"))
+
+
+def function_name(pc: int):
+    """Name of the function containing `pc`, or None without debug info."""
+    try:
+        block = gdb.block_for_pc(pc)
+        while block is not None and block.function is None:
+            block = block.superblock
+        if block is not None:
+            return block.function.print_name
+    except RuntimeError:
+        pass
+    return None
+
+
+# Shared by every BacktraceTracer; its data is an id into this table
+stacks = StackTable(function_name)
+
 
 class BacktraceTracer(Tracer):
     """A tracer that captures the call stack of a thread."""
-    def __init__(self):
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH):
         super().__init__()
+        self.max_depth = max_depth
 
-    def start(self, inferior_thread: gdb.Thread):
+    def start(self, inferior_thread: gdb.Thread, snapshot: StopSnapshot = None):
         """
-        Captures the backtrace when started.
+        Captures the innermost `max_depth` frame PCs when started and stores
+        the interned stack id (see `stacks.resolve`).
         """
-        frames = []
         try:
-            inferior_thread.switch()
-            frame = gdb.selected_frame()
-            while frame:
-                frame_info = {
-                    "pc": frame.pc(),
-                    "name": None,
-                }
-                sal = frame.find_sal()
-                if sal and sal.symtab:
-                    frame_info["name"] = frame.name()
-                frames.append(frame_info)
-                frame = frame.older()
-            self.data = frames
+            frame = (snapshot or StopSnapshot(inferior_thread)).frame()
+            self.data = stacks.intern(collect_pcs(frame, self.max_depth))
         except gdb.error as e:
             self.data = f"Error: {e}"
             print(f"[gdb_debugger] tracer warning: could not get backtrace: {e}")
@@ -32,6 +46,6 @@ class BacktraceTracer(Tracer):
     def stop(self):
         """This is a single-shot tracer, so stop is a no-op."""
         pass
-        
+
     def __str__(self) -> str:
-        return "BacktraceTracer" 
\ No newline at end of file
+        return "BacktraceTracer"
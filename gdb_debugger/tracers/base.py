@@ -1,14 +1,17 @@
 import gdb
+from gdb_common.snapshot import StopSnapshot
 
 class Tracer:
     """Base class for all tracers."""
     def __init__(self):
         self.data = None
 
-    def start(self, inferior_thread: gdb.Thread):
+    def start(self, inferior_thread: gdb.Thread, snapshot: StopSnapshot = None):
         """
         Starts the tracer. This method should be implemented by subclasses
-        to collect the desired data from the inferior.
+        to collect the desired data from the inferior. All tracers running
+        at one stop share `snapshot` (see gdb_common.snapshot) so their
+        target reads are cached; without one the tracer makes its own.
         """
         raise NotImplementedError
 
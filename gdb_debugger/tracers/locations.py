@@ -0,0 +1,32 @@
+import re
+
+# Parsing of GDB's `info address` output into a register and offset for
+# access plans (see access_plan.py).
+
+# Dotted field paths rooted at a variable: `self.ptr.pointer`, `id.__0`
+SIMPLE_EXPR = re.compile(r"[A-Za-z_]\w*(\.\w+)*")
+
+_IN_REGISTER = re.compile(r"is a variable in \$(\w+)")
+_FRAME_BASE = re.compile(r"is a variable at frame base reg \$(\w+) offset (-?\d+)\+(-?\d+)")
+_BASE_REG = re.compile(r"is a variable at offset (-?\d+) from base reg \$(\w+)")
+_STATIC = re.compile(r"is static storage at address (0x[0-9a-fA-F]+)")
+
+
+def parse_location(desc: str):
+    """(register, offset, in_register) from an `info address` description, or None.
+
+    register is None for statics, whose offset is then their address.
+    """
+    m = _IN_REGISTER.search(desc)
+    if m:
+        return m.group(1), 0, True
+    m = _FRAME_BASE.search(desc)
+    if m:
+        return m.group(1), int(m.group(2)) + int(m.group(3)), False
+    m = _BASE_REG.search(desc)
+    if m:
+        return m.group(2), int(m.group(1)), False
+    m = _STATIC.search(desc)
+    if m:
+        return None, int(m.group(1), 16), False
+    return None
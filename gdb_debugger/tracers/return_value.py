@@ -0,0 +1,31 @@
+from gdb_debugger.tracers.base import Tracer
+import gdb
+from gdb_common.snapshot import StopSnapshot
+
+class ReturnValueTracer(Tracer):
+    """
+    An exit tracer that records the traced function's return value as an
+    integer, unwrapping single-field newtypes such as
+    `RawTask { ptr: NonNull { pointer } }` down to the pointer.
+    """
+    def start(self, inferior_thread: gdb.Thread, snapshot: StopSnapshot = None):
+        val = snapshot.return_value if snapshot is not None else None
+        if val is None:
+            self.data = "Error: no return value (not run from a finish breakpoint?)"
+            return
+        try:
+            for _ in range(4):
+                fields = val.type.strip_typedefs().fields()
+                if val.type.strip_typedefs().code != gdb.TYPE_CODE_STRUCT or not fields:
+                    break
+                val = val[fields[0]]
+            self.data = int(val)
+        except gdb.error as e:
+            self.data = f"Error: {e}"
+
+    def stop(self):
+        """This is a single-shot tracer, so stop is a no-op."""
+        pass
+
+    def __str__(self) -> str:
+        return "ReturnValueTracer"
@@ -0,0 +1,78 @@
+# Call stack interning for BacktraceTracer. Symbol lookup is passed in by
+# the caller (backtrace.py uses gdb.block_for_pc).
+
+
+def collect_pcs(frame, max_depth: int) -> tuple:
+    """PCs of `frame` and its callers, innermost first, at most `max_depth`."""
+    pcs = []
+    while frame and len(pcs) < max_depth:
+        pcs.append(frame.pc())
+        frame = frame.older()
+    return tuple(pcs)
+
+
+class StackTable:
+    """
+    Interned call stacks. A hit only records the frame PCs; identical stacks
+    share one id and a hit count, and PCs are turned into function names
+    lazily (and once per PC) when a report asks for them.
+    """
+    def __init__(self, lookup):
+        self.lookup = lookup  # callable(pc) -> function name or None
+        self.ids = {}       # tuple of pcs -> stack id
+        self.stacks = []    # stack id -> tuple of pcs
+        self.counts = []    # stack id -> hits
+        self._symbols = {}  # lookup pc -> function name or None
+        self.on_new_stack = None  # callback(stack_id, pcs), e.g. to persist it
+
+    def intern(self, pcs: tuple) -> int:
+        stack_id = self.ids.get(pcs)
+        if stack_id is None:
+            stack_id = self.ids[pcs] = len(self.stacks)
+            self.stacks.append(pcs)
+            self.counts.append(0)
+            if self.on_new_stack:
+                self.on_new_stack(stack_id, pcs)
+        self.counts[stack_id] += 1
+        return stack_id
+
+    def symbol(self, pc: int, caller: bool = False):
+        # A caller frame's pc is its return address, which may already belong
+        # to the next line or function; look up the call instruction instead
+        lookup = pc - 1 if caller else pc
+        if lookup not in self._symbols:
+            self._symbols[lookup] = self.lookup(lookup)
+        return self._symbols[lookup]
+
+    def symbolize_all(self) -> dict:
+        """Lookup pc -> name for every frame of every stack seen so far."""
+        for pcs in self.stacks:
+            for i, pc in enumerate(pcs):
+                self.symbol(pc, caller=i > 0)
+        return dict(self._symbols)
+
+    def restore(self, stacks: dict, symbols: dict):
+        """Reload stacks and their symbols from a recording (gdb_debugger.store)."""
+        self.clear()
+        for stack_id in sorted(stacks):
+            pcs = stacks[stack_id]
+            self.ids[pcs] = stack_id
+            self.stacks.append(pcs)
+            self.counts.append(0)
+        self._symbols.update(symbols)
+
+    def resolve(self, stack_id: int) -> list:
+        """The stack as [{"pc": int, "name": str or None}, ...], innermost first."""
+        return [{"pc": pc, "name": self.symbol(pc, caller=i > 0)}
+                for i, pc in enumerate(self.stacks[stack_id])]
+
+    def most_common(self, top: int = 20) -> list:
+        """(stack id, hits) pairs, most frequent first."""
+        order = sorted(range(len(self.stacks)), key=lambda i: self.counts[i], reverse=True)
+        return [(i, self.counts[i]) for i in order[:top]]
+
+    def clear(self):
+        self.ids.clear()
+        self.stacks.clear()
+        self.counts.clear()
+        self._symbols.clear()
@@ -1,6 +1,15 @@
 from gdb_debugger.tracers.base import Tracer
 import gdb
 import struct
+from gdb_common.snapshot import StopSnapshot
+from gdb_debugger.tracers.access_plan import compile_plan
+
+# (breakpoint pc, expression) -> AccessPlan, or _NO_PLAN once compiling failed.
+# Tracers are created afresh for every hit, so the cache lives at module level.
+_plans = {}
+_NO_PLAN = object()
+# Statics resolve to absolute addresses; a new process may map them elsewhere
+gdb.events.exited.connect(lambda event: _plans.clear())
 
 class VariableTracer(Tracer):
     """
@@ -16,44 +25,57 @@ class VariableTracer(Tracer):
         self.variable_name = variable_name
         self.scope = scope
 
-    def start(self, inferior_thread: gdb.Thread):
+    def start(self, inferior_thread: gdb.Thread, snapshot: StopSnapshot = None):
         """
-        Reads the variable's value using a hybrid strategy:
+        Reads the variable's value. The first hit at a breakpoint location
+        compiles an access plan (see access_plan.py); later hits there just
+        run it. Without a plan, a hybrid strategy is used:
         1. Try a non-intrusive memory read first.
         2. If that fails, fall back to the powerful (but intrusive)
            gdb.parse_and_eval(), which can read from registers.
         """
+        snap = snapshot or StopSnapshot(inferior_thread)
         try:
-            inferior_thread.switch()
-            val = gdb.parse_and_eval(self.variable_name)
-
-            # --- Non-intrusive read first ---
-            if val.address:
-                try:
-                    val_type = val.type
-                    val_size = val_type.sizeof
-                    memory = gdb.selected_inferior().read_memory(val.address, val_size)
-                    
-                    if val_size == 8: self.data = struct.unpack('<Q', memory)[0]
-                    elif val_size == 4: self.data = struct.unpack('<I', memory)[0]
-                    elif val_size == 2: self.data = struct.unpack('<H', memory)[0]
-                    elif val_size == 1: self.data = struct.unpack('<B', memory)[0]
-                    else: self.data = f"Unsupported size: {val_size}"
+            key = (snap.frame().pc(), self.variable_name)
+            plan = _plans.get(key)
+            if plan is not None and plan is not _NO_PLAN:
+                self.data = plan.run(snap)
+                if self.data is not None:
                     return
-                except gdb.MemoryError:
-                    # Fall through to the intrusive method if memory is not valid
-                    pass
-            
-            # --- Fallback to intrusive read (for registers) ---
-            self.data = int(val)
-
+            self.data = self._evaluate(snap)
+            if plan is None:
+                plan = compile_plan(self.variable_name, snap)
+                # Keep the plan only if it agrees with GDB on this first hit
+                _plans[key] = plan if plan is not None and plan.run(snap) == self.data else _NO_PLAN
         except gdb.error as e:
             self.data = f"Error: {e}"
             print(f"[gdb_debugger] tracer warning: could not read '{self.variable_name}': {e}")
 
+    def _evaluate(self, snap: StopSnapshot):
+        val = snap.parse_and_eval(self.variable_name)
+
+        # --- Non-intrusive read first ---
+        if val.address:
+            try:
+                val_type = val.type
+                val_size = val_type.sizeof
+                memory = snap.read_memory(int(val.address), val_size)
+
+                if val_size == 8: return struct.unpack('<Q', memory)[0]
+                elif val_size == 4: return struct.unpack('<I', memory)[0]
+                elif val_size == 2: return struct.unpack('<H', memory)[0]
+                elif val_size == 1: return struct.unpack('<B', memory)[0]
+                else: return f"Unsupported size: {val_size}"
+            except gdb.MemoryError:
+                # Fall through to the intrusive method if memory is not valid
+                pass
+
+        # --- Fallback to intrusive read (for registers) ---
+        return int(val)
+
     def stop(self):
         """This is a single-shot tracer, so stop is a no-op."""
         pass
 
     def __str__(self) -> str:
-        return f"VariableTracer({self.variable_name})" 
\ No newline at end of file
+        return f"VariableTracer({self.variable_name})" 
@@ -0,0 +1,126 @@
+"""Heap allocations per future for async_flame_gdb.
+
+Each allocation is charged to the future being polled on its thread (the
+innermost entry of the poll stack), and to the whole logical stack of polls.
+Sampling is by bytes, as in tcmalloc: every thread draws the number of bytes
+until its next sample from an exponential distribution with mean
+`sample_bytes`, so an allocation of `size` bytes is sampled with probability
+1 - exp(-size / sample_bytes) and counts 1/p times. Large allocations are
+almost always sampled; a stream of small ones is sampled about once per
+`sample_bytes`. Sampled blocks are remembered by address until they are
+freed, which gives the bytes still live per future at the end of the run.
+"""
+import json
+import math
+import random
+
+from wakes import OUTSIDE_POLL
+
+# Rust's allocator shims, by the role of a call. Newer toolchains mangle them
+# into the `__rustc` namespace, so a binary has one of two spellings.
+SHIM_ROLES = {"__rust_alloc": "alloc", "__rust_alloc_zeroed": "alloc",
+              "__rust_realloc": "realloc", "__rust_dealloc": "dealloc"}
+
+
+def shim_spellings(sym):
+    """Names a shim may have in the symbol table, the plain one first."""
+    return (sym, f"__rustc::{sym}")
+
+
+class AllocStats:
+    __slots__ = ("allocs", "bytes", "samples", "live_allocs", "live_bytes")
+
+    def __init__(self):
+        self.allocs = 0.0       # estimated
+        self.bytes = 0.0        # estimated
+        self.samples = 0
+        self.live_allocs = 0.0
+        self.live_bytes = 0.0
+
+
+class AllocTracker:
+    def __init__(self, sample_bytes=0, seed=None):
+        self.sample_bytes = sample_bytes  # 0: every allocation
+        self.futures = {}       # future -> AllocStats
+        self.stacks = {}        # (poll stack names, outermost first) -> estimated bytes
+        self.live = {}          # sampled block address -> (future, estimated count, estimated bytes)
+        self._until_sample = {}  # tid -> bytes left before the next sample
+        self._random = random.Random(seed)
+
+    def set_interval(self, sample_bytes):
+        self.sample_bytes = max(0, int(sample_bytes))
+        self._until_sample.clear()
+
+    def _next_interval(self):
+        return self._random.expovariate(1.0 / self.sample_bytes)
+
+    def sample(self, tid, size):
+        """(estimated count, estimated bytes) if this allocation is sampled, else None."""
+        if self.sample_bytes <= 0:
+            return 1.0, float(size)
+        left = self._until_sample.get(tid)
+        if left is None:
+            left = self._next_interval()
+        left -= size
+        if left > 0:
+            self._until_sample[tid] = left
+            return None
+        self._until_sample[tid] = self._next_interval()
+        p = -math.expm1(-size / self.sample_bytes) if size > 0 else 1.0
+        return 1.0 / p, size / p
+
+    def on_alloc(self, ptr, stack, weight):
+        future = stack[-1] if stack else OUTSIDE_POLL
+        count, nbytes = weight
+        stats = self.futures.get(future)
+        if stats is None:
+            stats = self.futures[future] = AllocStats()
+        stats.allocs += count
+        stats.bytes += nbytes
+        stats.samples += 1
+        key = tuple(stack) if stack else (OUTSIDE_POLL,)
+        self.stacks[key] = self.stacks.get(key, 0.0) + nbytes
+        if ptr:
+            stats.live_allocs += count
+            stats.live_bytes += nbytes
+            self.live[ptr] = (future, count, nbytes)
+
+    def on_free(self, ptr):
+        entry = self.live.pop(ptr, None)
+        if entry is None:
+            return False
+        future, count, nbytes = entry
+        stats = self.futures[future]
+        stats.live_allocs -= count
+        stats.live_bytes -= nbytes
+        return True
+
+    def rows(self):
+        rows = [{"future": name, "allocs": round(s.allocs), "bytes": round(s.bytes), "samples": s.samples,
+                 "live_allocs": round(s.live_allocs), "live_bytes": round(s.live_bytes)}
+                for name, s in self.futures.items()]
+        rows.sort(key=lambda r: r["bytes"], reverse=True)
+        return rows
+
+    def report(self, top=20):
+        rows = self.rows()
+        mode = f"1 sample per {self.sample_bytes} bytes" if self.sample_bytes else "every allocation"
+        lines = [f"{sum(r['samples'] for r in rows)} sampled allocations ({mode}), "
+                 f"{len(self.live)} sampled blocks still live",
+                 f"{'allocs':>10} {'MiB':>10} {'live MiB':>10}  future"]
+        for r in rows[:top]:
+            lines.append(f"{r['allocs']:>10} {r['bytes'] / 2**20:>10.2f} {r['live_bytes'] / 2**20:>10.2f}  {r['future']}")
+        return lines
+
+    def write_folded(self, path):
+        """Bytes per logical async stack, for flamegraph.pl / inferno."""
+        with open(path, "w") as fp:
+            for stack, nbytes in sorted(self.stacks.items()):
+                if round(nbytes) > 0:
+                    fp.write(";".join(name.replace(";", ",") for name in stack) + f" {round(nbytes)}\n")
+
+    def dump(self, path):
+        stacks = sorted(self.stacks.items(), key=lambda kv: kv[1], reverse=True)
+        with open(path, "w") as fp:
+            json.dump({"sample_bytes": self.sample_bytes, "futures": self.rows(),
+                       "stacks": [{"stack": list(s), "bytes": round(b)} for s, b in stacks]}, fp, indent=2)
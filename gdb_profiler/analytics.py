@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+# Offline statistics over async-flame traces, for traces too big to eyeball:
+#
+#   python -m gdb_profiler.analytics results/traceEvents.json [--top 20] [--bucket-ms 1000] [--json out.json]
+#
+# Poll slices (B/E events) are stream-parsed into columns (phase, ts, thread,
+# name), cached next to the trace as <trace>.npz so later runs skip the JSON
+# entirely, and paired per thread without a Python loop over events: within
+# one thread a B at nesting depth d is closed by the next E at depth d, so
+# sorting by (thread, depth, position) leaves every B directly followed by
+# its E. Each span's parent is found by a searchsorted over the spans one
+# level up; self time subtracts the children's durations.
+
+PH_B, PH_E = 1, 2
+CHUNK = 1 << 22
+
+
+class Columns:
+    """B/E events of one trace as parallel arrays, names and threads interned."""
+
+    def __init__(self, ph, ts, tid, name, names, tids):
+        self.ph = ph        # uint8, PH_B / PH_E
+        self.ts = ts        # float64, microseconds
+        self.tid = tid      # int32 index into tids
+        self.name = name    # int32 index into names
+        self.names = names
+        self.tids = tids
+
+    def save(self, path):
+        np.savez(path, ph=self.ph, ts=self.ts, tid=self.tid, name=self.name,
+                 names=np.array(self.names, dtype=object), tids=np.array(self.tids, dtype=object))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=True)
+        return cls(data["ph"], data["ts"], data["tid"], data["name"], list(data["names"]), list(data["tids"]))
+
+
+def iter_chrome_events(path):
+    """Events of a Chrome trace (`{"traceEvents": [...]}` or a bare array), one at a time."""
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buf = f.read(CHUNK)
+        key = buf.find('"traceEvents"')
+        start = buf.find("[", key if key != -1 else 0)
+        if start == -1:
+            raise ValueError(f"{path}: no traceEvents array found")
+        pos = start + 1
+        eof = False
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf) or (not eof and len(buf) - pos < 65536):
+                more = f.read(CHUNK)
+                eof = not more
+                buf, pos = buf[pos:] + more, 0
+                if pos >= len(buf):
+                    return
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                event, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(CHUNK)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield event
+
+
+def iter_ndjson_events(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+READERS = {".json": iter_chrome_events, ".ndjson": iter_ndjson_events}
+
+
+def read_columns(path, cache=True) -> Columns:
+    """Columns of `path`, from its .npz cache when that is newer than the trace."""
+    npz = path + ".npz"
+    if cache and os.path.exists(npz) and os.path.getmtime(npz) >= os.path.getmtime(path):
+        return Columns.load(npz)
+    reader = READERS.get(os.path.splitext(path)[1], iter_chrome_events)
+    names, tids = {}, {}
+    ph, ts, tid, name = [], [], [], []
+    for ev in reader(path):
+        kind = ev.get("ph")
+        if kind == "B":
+            ph.append(PH_B)
+            name.append(names.setdefault(ev.get("name", ""), len(names)))
+        elif kind == "E":
+            ph.append(PH_E)
+            name.append(-1)   # E names carry suffixes ("(unwound)"); the B names the slice
+        else:
+            continue
+        ts.append(ev.get("ts", 0.0))
+        tid.append(tids.setdefault(str(ev.get("tid", "")), len(tids)))
+    columns = Columns(np.array(ph, dtype=np.uint8), np.array(ts, dtype=np.float64),
+                      np.array(tid, dtype=np.int32), np.array(name, dtype=np.int32),
+                      list(names), list(tids))
+    if cache:
+        columns.save(npz)
+    return columns
+
+
+class Spans:
+    """Paired poll slices: start/end/duration/self time, thread, name, nesting level.
+
+    `parent` is the index of the enclosing span on the same thread, -1 for
+    top-level polls (and for children whose parent was never closed).
+    """
+
+    def __init__(self, start, end, tid, name, level):
+        self.start = start
+        self.end = end
+        self.dur = end - start
+        self.tid = tid
+        self.name = name
+        self.level = level
+        self.parent = self._parents()
+        self.self_time = self.dur - self._children_time()
+
+    def _parents(self):
+        n = len(self.start)
+        parent = np.full(n, -1, dtype=np.int64)
+        if n == 0:
+            return parent
+        levels = int(self.level.max()) + 1
+        group = self.tid.astype(np.int64) * levels + self.level
+        rank = np.unique(self.start, return_inverse=True)[1].astype(np.int64)
+        ranks = int(rank.max()) + 1
+        order = np.argsort(group * ranks + rank, kind="stable")
+        keys = (group * ranks + rank)[order]
+        # The parent is the last span one level up that started no later, if
+        # it is still open; otherwise the real parent was never closed
+        children = np.nonzero(self.level > 0)[0]
+        parent_group = group[children] - 1
+        pos = np.searchsorted(keys, parent_group * ranks + rank[children], side="right") - 1
+        found = order[np.clip(pos, 0, None)]
+        ok = (pos >= 0) & (group[found] == parent_group) & (self.end[found] >= self.start[children])
+        parent[children[ok]] = found[ok]
+        return parent
+
+    def _children_time(self):
+        child_sum = np.zeros(len(self.start))
+        nested = np.nonzero(self.parent >= 0)[0]
+        np.add.at(child_sum, self.parent[nested], self.dur[nested])
+        return child_sum
+
+
+def pair(columns: Columns) -> Spans:
+    ph, tid = columns.ph, columns.tid
+    n = len(ph)
+    if n == 0:
+        empty = np.array([])
+        return Spans(empty, empty, empty.astype(np.int32), empty.astype(np.int32), empty.astype(np.int64))
+    # Per-thread nesting depth before each event (events keep emission order within a thread)
+    by_thread = np.argsort(tid, kind="stable")
+    step = np.where(ph[by_thread] == PH_B, 1, -1).astype(np.int64)
+    depth_after = np.cumsum(step)
+    first = np.r_[True, tid[by_thread][1:] != tid[by_thread][:-1]]
+    thread_base = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+    base = (depth_after - step)[thread_base]
+    depth_before = depth_after - step - base
+    # An E with no open B (its poll began before the trace) doesn't lower the
+    # depth: subtract the lowest depth reached so far on the thread
+    thread = np.cumsum(first) - 1
+    spread = 2 * n + 1
+    depth_before -= np.minimum.accumulate(depth_before - thread * spread) + thread * spread
+    level = np.where(step > 0, depth_before, depth_before - 1)
+    # ... and is dropped
+    keep = level >= 0
+    idx, level = by_thread[keep], level[keep]
+    order = np.lexsort((np.arange(len(idx)), level, tid[idx]))
+    idx, level = idx[order], level[order]
+    is_b = ph[idx] == PH_B
+    match = is_b[:-1] & ~is_b[1:] & (tid[idx][:-1] == tid[idx][1:]) & (level[:-1] == level[1:])
+    b, e = idx[:-1][match], idx[1:][match]
+    return Spans(columns.ts[b], columns.ts[e], tid[b], columns.name[b], level[:-1][match])
+
+
+def future_stats(spans: Spans, names, top=20):
+    count = np.bincount(spans.name, minlength=len(names))
+    total = np.bincount(spans.name, weights=spans.dur, minlength=len(names))
+    own = np.bincount(spans.name, weights=spans.self_time, minlength=len(names))
+    by_name = np.argsort(spans.name, kind="stable")
+    sorted_dur = spans.dur[by_name]
+    bounds = np.r_[0, np.cumsum(count)]
+    rows = []
+    for key, values in (("total_us", total), ("self_us", own)):
+        for i in np.argsort(-values)[:top]:
+            if count[i] == 0:
+                continue
+            durations = sorted_dur[bounds[i]:bounds[i + 1]]
+            p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+            rows.append({"rank_by": key, "name": names[i], "polls": int(count[i]),
+                         "total_us": float(total[i]), "self_us": float(own[i]),
+                         "p50_us": float(p50), "p90_us": float(p90), "p99_us": float(p99),
+                         "max_us": float(durations.max())})
+    return rows
+
+
+def thread_stats(spans: Spans, tids, bucket_us):
+    """Utilization (busy share of top-level polls) and poll rate per thread and bucket."""
+    if len(spans.start) == 0:
+        return {"bucket_us": bucket_us, "t0_us": 0.0, "threads": [], "poll_rate": []}
+    t0, t1 = spans.start.min(), spans.end.max()
+    edges = np.arange(t0, t1 + bucket_us, bucket_us)
+    threads = []
+    for t in range(len(tids)):
+        mine = spans.tid == t
+        top = mine & (spans.level == 0)
+        s, d = spans.start[top], spans.dur[top]
+        order = np.argsort(s)
+        s, d = s[order], d[order]
+        cum = np.cumsum(d)
+        k = np.searchsorted(s, edges, side="right") - 1
+        kk = np.clip(k, 0, None)
+        busy = np.where(k >= 0, cum[kk] - d[kk] + np.clip(edges - s[kk], 0, d[kk]), 0.0) if len(s) else np.zeros(len(edges))
+        per_bucket = np.diff(busy) / bucket_us
+        polls = np.histogram(spans.start[mine], bins=edges)[0]
+        threads.append({"tid": tids[t], "polls": int(mine.sum()), "busy_us": float(d.sum()),
+                        "utilization": float(d.sum() / max(t1 - t0, 1e-9)),
+                        "utilization_per_bucket": per_bucket.round(4).tolist(),
+                        "polls_per_s": (polls / (bucket_us / 1e6)).round(1).tolist()})
+    total_rate = np.histogram(spans.start, bins=edges)[0] / (bucket_us / 1e6)
+    return {"bucket_us": bucket_us, "t0_us": float(t0), "threads": threads,
+            "poll_rate": total_rate.round(1).tolist()}
+
+
+def analyze(path, top=20, bucket_ms=1000.0, cache=True):
+    columns = read_columns(path, cache)
+    spans = pair(columns)
+    return {"events": int(len(columns.ph)), "polls": int(len(spans.start)),
+            "futures": future_stats(spans, columns.names, top),
+            "threads": thread_stats(spans, columns.tids, bucket_ms * 1000)}
+
+
+def report(result, top=20):
+    lines = [f"{result['events']} B/E events, {result['polls']} polls"]
+    for key, title in (("total_us", "total"), ("self_us", "self")):
+        lines.append(f"\nTop futures by {title} time")
+        lines.append(f"{'polls':>9} {'total ms':>10} {'self ms':>10} {'p50 us':>9} {'p90 us':>9} "
+                     f"{'p99 us':>9} {'max us':>9}  future")
+        for r in [r for r in result["futures"] if r["rank_by"] == key][:top]:
+            lines.append(f"{r['polls']:>9} {r['total_us'] / 1e3:>10.2f} {r['self_us'] / 1e3:>10.2f} "
+                         f"{r['p50_us']:>9.1f} {r['p90_us']:>9.1f} {r['p99_us']:>9.1f} {r['max_us']:>9.1f}  {r['name']}")
+    threads = result["threads"]
+    lines.append(f"\nThreads (buckets of {threads['bucket_us'] / 1e3:g} ms)")
+    lines.append(f"{'tid':>10} {'polls':>9} {'busy ms':>10} {'util':>6}  utilization per bucket")
+    for t in threads["threads"]:
+        spark = " ".join(f"{u:.2f}" for u in t["utilization_per_bucket"][:16])
+        lines.append(f"{t['tid']:>10} {t['polls']:>9} {t['busy_us'] / 1e3:>10.2f} {t['utilization']:>6.1%}  {spark}")
+    rate = " ".join(f"{r:.0f}" for r in threads["poll_rate"][:16])
+    lines.append(f"\npolls/s per bucket: {rate}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.analytics",
+                                     description="Per-future and per-thread statistics of an async-flame trace.")
+    parser.add_argument("trace", help="traceEvents.json (or .ndjson)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--bucket-ms", type=float, default=1000.0, help="time bucket for rates and utilization")
+    parser.add_argument("--json", help="also write the full result here")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write <trace>.npz")
+    args = parser.parse_args(argv)
+    result = analyze(args.trace, args.top, args.bucket_ms, cache=not args.no_cache)
+    for line in report(result, args.top):
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Lazy, per-objfile arming of poll breakpoints for async_flame_gdb.
+
+Poll breakpoints are set on addresses rather than symbol names: one symbol
+lookup per objfile gives its load bias, and every other poll address is
+derived from the link-time addresses in the future map. PIE executables and
+shared objects are relocated when the process starts, so their bias is only
+known (and only kept) while it runs; symbols that cannot be armed yet stay
+pending until their objfile is loaded or the process starts.
+
+async_flame_gdb.py owns the breakpoints and passes in the GDB lookups.
+"""
+import os
+
+ET_DYN = 3
+
+
+class PollSite:
+    """One poll function from the future map, armed or not."""
+    __slots__ = ("sym", "name", "objfile", "link_addr")
+
+    def __init__(self, sym, name, objfile, link_addr):
+        self.sym = sym
+        self.name = name
+        self.objfile = objfile      # basename of the binary the map was exported from, None = main executable
+        self.link_addr = link_addr  # link-time address from the map, None for maps without `poll_addr`
+
+
+def is_pie(path):
+    """ET_DYN executables and shared objects are relocated at load time."""
+    try:
+        with open(path, "rb") as f:
+            header = f.read(18)
+    except OSError:
+        return True
+    return len(header) == 18 and int.from_bytes(header[16:18], "little") == ET_DYN
+
+
+class PollArming:
+    def __init__(self, sites, find_objfile, symbol_address, process_live, main_objfile, is_pie=is_pie):
+        self.sites = sites                  # poll symbol -> PollSite
+        self.find_objfile = find_objfile    # callable(basename) -> path of the loaded objfile, or None
+        self.symbol_address = symbol_address  # callable(symbol) -> runtime address, or None
+        self.process_live = process_live    # callable() -> True while the inferior runs
+        self.main_objfile = main_objfile    # callable() -> basename of the main executable
+        self.is_pie = is_pie                # callable(path) -> relocated at load time
+        # objfile basename -> load bias
+        self.bias = {}
+        # Biases computed from a live process; they are dropped when it exits since
+        # PIE executables and shared objects may load elsewhere on the next run.
+        self.live_biased = set()
+        # Enabled poll symbols whose objfile is not loaded (or not relocated) yet.
+        self.pending = set()
+        # Objfiles found not ready during the current arming pass, so a pass over
+        # thousands of pending polls checks each objfile once.
+        self._misses = set()
+        self._pie = {}
+
+    def objfile_of(self, site):
+        return site.objfile or self.main_objfile()
+
+    def new_pass(self):
+        """Start an arming pass: objfiles that were not ready get looked at again."""
+        self._misses.clear()
+
+    def objfile_bias(self, basename):
+        """Load bias for `basename`, or None while it can't be armed yet."""
+        if basename in self.bias:
+            return self.bias[basename]
+        if basename in self._misses:
+            return None
+        self._misses.add(basename)
+        path = self.find_objfile(basename)
+        if path is None:
+            return None
+        live = self.process_live()
+        if not live:
+            if path not in self._pie:
+                self._pie[path] = self.is_pie(path)
+            if self._pie[path]:
+                return None
+        anchors = [site for site in self.sites.values()
+                   if self.objfile_of(site) == basename and site.link_addr is not None][:3]
+        bias = 0
+        for site in anchors:
+            address = self.symbol_address(site.sym)
+            if address is not None:
+                bias = address - site.link_addr
+                break
+        else:
+            if anchors:
+                return None
+        self._misses.discard(basename)
+        self.bias[basename] = bias
+        if live:
+            self.live_biased.add(basename)
+        return bias
+
+    def location(self, sym):
+        """Breakpoint spec for poll symbol `sym`, or None while its objfile isn't ready."""
+        site = self.sites[sym]
+        bias = self.objfile_bias(self.objfile_of(site))
+        if bias is None:
+            return None
+        return f"*{site.link_addr + bias:#x}" if site.link_addr is not None else sym
+
+    def arm(self, sym, create):
+        """Arm `sym` through create(spec) -> bool; it stays pending until that succeeds."""
+        spec = self.location(sym)
+        if spec is not None and create(spec):
+            self.pending.discard(sym)
+            return True
+        self.pending.add(sym)
+        return False
+
+    def on_exited(self, armed):
+        """Forget per-run relocations. Returns the symbols among `armed` whose
+        breakpoints are now stale; they go back to pending for the next run."""
+        stale = [sym for sym in armed if self.objfile_of(self.sites[sym]) in self.live_biased]
+        self.pending.update(stale)
+        for basename in self.live_biased:
+            self.bias.pop(basename, None)
+        self.live_biased.clear()
+        return stale
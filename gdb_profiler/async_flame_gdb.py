@@ -5,14 +5,55 @@ import gdb, json, time, pathlib, importlib, sys, re, os
 SCRIPT_DIR = pathlib.Path(__file__).resolve().parent
 WORKSPACE_ROOT = SCRIPT_DIR.parent # Goes up one level from gdb_profiler to future-tracing
 
-MAP_FILE = WORKSPACE_ROOT / "results" / "future_map.json"
-# PLUGIN_NAME = gdb.parameter("plugin") if hasattr(gdb, "parameter") else "tokio"  # default tokio
-PLUGIN_NAME = os.getenv("ASYNC_FLAME_PLUGIN", "tokio")
+# Sibling modules (runtime_plugins, trace_filter, ...) are imported as top-level
+# modules, so the 'gdb_profiler' directory itself needs to be on sys.path; the
+# workspace root is needed for the shared dwarf_analyzer and gdb_common packages.
+for _path in (SCRIPT_DIR, WORKSPACE_ROOT):
+    if str(_path) not in sys.path:
+        sys.path.insert(0, str(_path))
+
+from trace_filter import TraceFilter, KINDS as FILTER_KINDS
+from overhead import OverheadTracker
+from spans import InstanceTracker, decode_poll_outcome
+from wakes import WakeTracker, OUTSIDE_POLL
+from locks import LockTracker
+from channels import ChannelTracker, channel_label
+from allocs import AllocTracker, SHIM_ROLES, shim_spellings
+from arming import PollArming, PollSite
+from watchdog import Watchdog, GDB_SIGNAL_NAME as WATCHDOG_SIGNAL, handle_settings
+from dwarf_analyzer.symbols import linked_crates
+from gdb_common import snapshot
+
+STARTUP_T0 = time.perf_counter()
+
+# ASYNC_FLAME_MAP lets concurrent runs (gdb_profiler.orchestrate) use one map per binary
+MAP_FILE = pathlib.Path(os.getenv("ASYNC_FLAME_MAP", WORKSPACE_ROOT / "results" / "future_map.json"))
+# Runtime plugins are picked by looking for their crates in the binary;
+# ASYNC_FLAME_PLUGIN=<module> still forces one.
+PLUGIN_NAME = os.getenv("ASYNC_FLAME_PLUGIN")
+# ASYNC_FLAME_NON_STOP=1 traces in non-stop mode: a breakpoint hit stops only
+# the thread that hit it, so the other workers keep running. Must be chosen
+# before the program is started.
+NON_STOP = os.getenv("ASYNC_FLAME_NON_STOP") == "1"
+if NON_STOP:
+    gdb.execute("set non-stop on")
+# ASYNC_FLAME_ALLOC=<bytes> attributes heap allocations to futures from the
+# start, sampling once per that many bytes (0: every allocation). Off by
+# default; `async_flame_alloc` switches it at runtime.
+ALLOC_SAMPLE_BYTES = os.getenv("ASYNC_FLAME_ALLOC")
+# ASYNC_FLAME_WATCHDOG_MS=<ms> captures the stack of any poll still running
+# after that long (see `async_flame_watchdog`).
+WATCHDOG_MS = os.getenv("ASYNC_FLAME_WATCHDOG_MS")
 
 # ---------- util -------------
 
 def monotonic_ns():
     """Best effort monotonic ns using gdb call into inferior if possible."""
+    if NON_STOP:
+        # An inferior call resumes the stopped thread in the middle of the
+        # handler, which invalidates its snapshot and lets it run on while
+        # the others are traced; use the host's CLOCK_MONOTONIC instead
+        return time.monotonic_ns()
     try:
         # Try CLOCK_MONOTONIC_RAW first for robustness against time adjustments
         val_str = gdb.execute("call (long long)clock_gettime(CLOCK_MONOTONIC_RAW, {{&{struct timespec}ts, 0}}) == 0 ? (ts.tv_sec * 1000000000LL + ts.tv_nsec) : -1LL", to_string=True)
@@ -28,9 +69,11 @@ def monotonic_ns():
         pass # GDB error, fallback to host time
     return int(time.time() * 1e9) # Fallback to host time if gdb calls fail
 
-trace_events = []
+# Per-thread event buffers (tid -> events in emission order), merged by
+# timestamp when dumped
+trace_buffers = {}
 
-def emit(ph, ts_ns, tid, name, args=None, cat="future_poll"):
+def emit(ph, ts_ns, tid, name, args=None, cat="future_poll", id=None):
     ev = {
         "ph": ph,
         "ts": ts_ns / 1000,  # Chrome expects microseconds
@@ -41,7 +84,66 @@ def emit(ph, ts_ns, tid, name, args=None, cat="future_poll"):
     }
     if args:
         ev["args"] = args
-    trace_events.append(ev)
+    if id is not None:
+        ev["id"] = id  # async (b/n/e) and flow events are matched on cat + id
+    buffer = trace_buffers.get(ev["tid"])
+    if buffer is None:
+        buffer = trace_buffers[ev["tid"]] = []
+    buffer.append(ev)
+
+def merged_trace_events():
+    return sorted((ev for buffer in trace_buffers.values() for ev in buffer), key=lambda ev: ev["ts"])
+
+# Argument registers at function entry (`self: Pin<&mut Self>` is the first one for poll)
+_ARG_REGISTERS = {
+    "i386:x86-64": ("rdi", "rsi", "rdx", "rcx", "r8", "r9"),
+    "aarch64": ("x0", "x1", "x2", "x3", "x4", "x5", "x6", "x7"),
+    "riscv:rv64": ("a0", "a1", "a2", "a3", "a4", "a5", "a6", "a7"),
+}
+_arg_registers = None
+_RET_REGISTERS = {"i386:x86-64": "rax", "aarch64": "x0", "riscv:rv64": "a0"}
+
+def _as_address(val):
+    """int() of a pointer, unwrapping Pin { __pointer } / NonNull { pointer } style newtypes."""
+    for _ in range(4):
+        try:
+            return int(val)
+        except (gdb.error, TypeError, ValueError):
+            fields = val.type.strip_typedefs().fields()
+            if not fields:
+                return None
+            val = val[fields[0]]
+    return None
+
+def read_args(snap, at_entry, count):
+    """First `count` arguments of the function stopped in `snap` as addresses (None if unreadable).
+
+    At the raw entry address they are still in the argument registers;
+    after the prologue (symbol breakpoints) ask DWARF for the parameters.
+    """
+    global _arg_registers
+    frame = snap.frame()
+    if at_entry:
+        if _arg_registers is None:
+            _arg_registers = _ARG_REGISTERS.get(frame.architecture().name(), ())
+        if len(_arg_registers) >= count:
+            try:
+                return [snap.register(r) for r in _arg_registers[:count]]
+            except (gdb.error, ValueError):
+                pass
+    values = []
+    try:
+        for sym in frame.block():
+            if len(values) == count:
+                break
+            if sym.is_argument:
+                values.append(_as_address(frame.read_var(sym)))
+    except (gdb.error, RuntimeError):
+        pass
+    return values + [None] * (count - len(values))
+
+def read_arg0(snap, at_entry):
+    return read_args(snap, at_entry, 1)[0]
 
 # ---------- load future map -------------
 if not MAP_FILE.exists():
@@ -56,132 +158,733 @@ else:
     with MAP_FILE.open() as f:
         FUT_MAP = json.load(f)
 
-symbol_to_name = {}
+poll_sites = {}
 for meta in FUT_MAP.values():
     sym = meta.get("poll_symbol")
     if sym:
         # Ensure we use the DWARF name if available, otherwise fallback to mangled symbol name
-        display_name = meta.get("name", sym) 
-        symbol_to_name[sym] = display_name
+        display_name = meta.get("name", sym)
+        addr = meta.get("poll_addr")
+        poll_sites[sym] = PollSite(sym, display_name, meta.get("objfile"), int(addr, 16) if addr else None)
 
 # ---------- load runtime plugin ----------
+base_plugin_mod_path = "runtime_plugins.base"
+RuntimePlugin = importlib.import_module(base_plugin_mod_path).RuntimePlugin
+
+def plugin_classes(mod):
+    """Plugin classes defined (not merely imported) in `mod`."""
+    return [cls for cls in mod.__dict__.values()
+            if isinstance(cls, type) and issubclass(cls, RuntimePlugin)
+            and cls is not RuntimePlugin and cls.__module__ == mod.__name__]
+
+def detect_plugin_class(binary):
+    """Highest-priority plugin whose crates are all linked into `binary`."""
+    candidates = []
+    for path in sorted((SCRIPT_DIR / "runtime_plugins").glob("*.py")):
+        if path.stem in ("__init__", "base"):
+            continue
+        try:
+            mod = importlib.import_module(f"runtime_plugins.{path.stem}")
+        except Exception as e:
+            print(f"[async-flame] Skipping plugin module '{path.stem}': {e}")
+            continue
+        candidates.extend(cls for cls in plugin_classes(mod) if cls.crates)
+    present = linked_crates(binary, {c for cls in candidates for c in cls.crates})
+    matching = [cls for cls in candidates if set(cls.crates) <= present]
+    return max(matching, key=lambda cls: cls.priority, default=None)
+
 try:
-    plugin_mod_path = f"runtime_plugins.{PLUGIN_NAME}" # Relative to this file's new location
-    base_plugin_mod_path = "runtime_plugins.base"
-
-    # Ensure GDB can find the plugin directory (gdb_profiler/runtime_plugins)
-    # The 'gdb_profiler' directory itself needs to be on sys.path for 'import runtime_plugins' to work
-    # if this script is not run with `python -m gdb_profiler.async_flame_gdb`
-    # SCRIPT_DIR is <workspace>/gdb_profiler
-    if str(SCRIPT_DIR) not in sys.path:
-        sys.path.insert(0, str(SCRIPT_DIR))
-        
-    plugin_mod = importlib.import_module(plugin_mod_path)
-    RuntimePluginCls = next(
-        cls for cls in plugin_mod.__dict__.values()
-        if isinstance(cls, type) and issubclass(cls, importlib.import_module(base_plugin_mod_path).RuntimePlugin) and cls.__name__ != "RuntimePlugin"
-    )
+    if PLUGIN_NAME:
+        plugin_mod = importlib.import_module(f"runtime_plugins.{PLUGIN_NAME}") # Relative to this file's new location
+        # ASYNC_FLAME_PLUGIN=base: the generic plugin, polls only
+        RuntimePluginCls = next(iter(plugin_classes(plugin_mod)), RuntimePlugin)
+    else:
+        binary = gdb.current_progspace().filename
+        RuntimePluginCls = detect_plugin_class(binary) if binary else None
+        if RuntimePluginCls is None:
+            print(f"[async-flame] No known async runtime found in {binary or 'the (not yet loaded) program'}.")
+            RuntimePluginCls = RuntimePlugin
     plugin = RuntimePluginCls()
-    print(f"[async-flame] Loaded runtime plugin: {plugin.name} from {plugin_mod.__file__}")
+    print(f"[async-flame] Loaded runtime plugin: {plugin.name} from {sys.modules[RuntimePluginCls.__module__].__file__}")
 except Exception as e:
     print(f"[async-flame] Failed to load plugin '{PLUGIN_NAME}': {e}. Using generic plugin.")
-    # Ensure base_plugin_mod_path is also findable if the initial import failed early
-    if str(SCRIPT_DIR) not in sys.path:
-        sys.path.insert(0, str(SCRIPT_DIR))
-    plugin = importlib.import_module(f"{base_plugin_mod_path}").RuntimePlugin() # Ensure full path for base
+    plugin = RuntimePlugin()
+
+# ---------- struct layouts for plugins ----------
+# Generated with `python -m dwarf_analyzer.layouts <binary> results/type_layouts.json`
+LAYOUT_FILE = pathlib.Path(os.getenv("ASYNC_FLAME_LAYOUTS", WORKSPACE_ROOT / "results" / "type_layouts.json"))
+layouts = None
+if LAYOUT_FILE.exists():
+    from dwarf_analyzer.layouts import StructLayouts
+    layouts = StructLayouts.load(LAYOUT_FILE)
+plugin.attach(layouts)
 
 # ---------- breakpoints using FinishBreakpoint pattern ------------
 
 # Stores entry metadata for finish breakpoints
-# Key: gdb.Frame.id(), Value: dict {ts, name, tid}
+# Key: (tid, pc, sp) of the poll frame, Value: dict {ts, name, tid}
 finish_bp_metadata = {}
 
+# Per-instance poll statistics, fed by PollBP / PollFinishBP
+instances = InstanceTracker()
+
+# tid -> [display name of each poll in flight, innermost last]
+poll_stacks = {}
+# tid -> task key the runtime just started polling, until its first future poll names it
+current_task = {}
+wakes = WakeTracker()
+locks = LockTracker()
+allocs = AllocTracker()
+watchdog = Watchdog()
+channels = ChannelTracker()
+
+def pop_poll_stack(tid):
+    stack = poll_stacks.get(tid)
+    if stack:
+        stack.pop()
+    if watchdog.enabled:
+        watchdog.pop(tid)
+
+def end_instance_poll(addr, name, entry_ts, ts, tid, outcome):
+    """Close the per-poll async slice and, on Ready, the instance's outer span."""
+    if addr is None:
+        return
+    inst_id = f"0x{addr:x}"
+    emit("e", ts, tid, "poll", args={"outcome": outcome or "unknown"}, cat="future_instance", id=inst_id)
+    done = instances.poll_end(addr, name, entry_ts, ts, outcome)
+    if done is not None:
+        emit("e", ts, tid, name, cat="future_instance", id=inst_id, args={
+            "polls": done.polls,
+            "busy_us": done.busy_ns / 1000,
+            "wall_us": (ts - done.first_ts) / 1000,
+        })
+
 class PollFinishBP(gdb.FinishBreakpoint):
-    def __init__(self, frame_id, name, entry_ts, tid):
-        super().__init__(gdb.newest_frame(), internal=True)
+    def __init__(self, frame, frame_id, name, entry_ts, tid, sym, addr):
+        # Finish breakpoints are specific to the thread of `frame`
+        super().__init__(frame, internal=True)
         self.frame_id = frame_id
         self.name = name
         self.entry_ts = entry_ts
         self.tid = tid
+        self.sym = sym
+        self.addr = addr
 
     def stop(self):
-        emit("E", monotonic_ns(), self.tid, self.name, cat="future_poll")
+        t0 = time.perf_counter_ns()
+        ts = monotonic_ns()
+        emit("E", ts, self.tid, self.name, cat="future_poll")
+        try:
+            outcome = decode_poll_outcome(self.return_value)
+        except Exception:
+            outcome = None
+        end_instance_poll(self.addr, self.name, self.entry_ts, ts, self.tid, outcome)
+        pop_poll_stack(self.tid)
         if self.frame_id in finish_bp_metadata: # Clean up
             del finish_bp_metadata[self.frame_id]
+        account_overhead(self.sym, "poll", self.name, t0, self.tid, finish=True)
         return False # Do not stop execution
 
     def out_of_scope(self):
         # Function exited via an exception or other non-standard path
-        emit("E", monotonic_ns(), self.tid, f"{self.name} (unwound)", cat="future_poll_unwind")
+        t0 = time.perf_counter_ns()
+        ts = monotonic_ns()
+        emit("E", ts, self.tid, f"{self.name} (unwound)", cat="future_poll_unwind")
+        end_instance_poll(self.addr, self.name, self.entry_ts, ts, self.tid, "unwound")
+        pop_poll_stack(self.tid)
         if self.frame_id in finish_bp_metadata: # Clean up
             del finish_bp_metadata[self.frame_id]
+        account_overhead(self.sym, "poll", self.name, t0, self.tid, finish=True)
 
 class PollBP(gdb.Breakpoint):
-    def __init__(self, symbol, disp_name):
-        super().__init__(symbol, internal=False) # User-visible breakpoint
+    def __init__(self, spec, disp_name, sym):
+        super().__init__(spec, internal=False) # User-visible breakpoint
         self.disp_name = disp_name
+        self.sym = sym
+        self.at_entry = spec.startswith("*")
 
     def stop(self):
+        t0 = time.perf_counter_ns()
+        tid = 0
         try:
-            tid = gdb.selected_thread().ptid[1]
+            # GDB selects the stopping thread before calling stop(); take it
+            # once, everything below works on this thread's snapshot
+            thread = gdb.selected_thread()
+            tid = thread.ptid[1]
+            if not trace_filter.thread_enabled(tid) or not trace_filter.should_sample(self.sym):
+                return False
             entry_ts = monotonic_ns()
 
             # Get unique ID for the current frame
-            frame = gdb.newest_frame()
+            snap = snapshot.current(thread)
+            frame = snap.frame()
             # Use a robust method to obtain a unique identifier for the frame without relying on Frame.sp()
             try:
-                sp_val = int(frame.read_register("sp"))
+                sp_val = snap.register("sp")
             except Exception:
                 sp_val = 0
 
-            frame_id = (frame.pc(), sp_val)
+            frame_id = (tid, frame.pc(), sp_val)
+            addr = read_arg0(snap, self.at_entry)  # self: Pin<&mut Self>
+            if watchdog.enabled:
+                watchdog.pid = watchdog.pid or gdb.selected_inferior().pid
+            # The finish breakpoint comes first: if it can't be set (outermost
+            # frame, unwind failure) nothing below would ever be closed
+            PollFinishBP(frame, frame_id, self.disp_name, entry_ts, tid, self.sym, addr)
 
             # Store metadata for the finish breakpoint
             finish_bp_metadata[frame_id] = {
                 'name': self.disp_name,
                 'entry_ts': entry_ts,
-                'tid': tid
+                'tid': tid,
+                'addr': addr,
             }
 
             emit("B", entry_ts, tid, self.disp_name, cat="future_poll")
-            PollFinishBP(frame_id, self.disp_name, entry_ts, tid)  # Create finish breakpoint
+            poll_stacks.setdefault(tid, []).append(self.disp_name)
+            if watchdog.enabled:
+                watchdog.push(tid, self.disp_name, entry_ts)
+            task = current_task.pop(tid, None)
+            if task is not None:
+                wakes.name_task(task, self.disp_name)
+            if addr is not None:
+                # Async spans per instance: an outer b/e from first poll to Ready,
+                # and a nested b/e per poll carrying its Pending/Ready outcome.
+                inst_id = f"0x{addr:x}"
+                if instances.poll_start(addr, self.disp_name, entry_ts):
+                    emit("b", entry_ts, tid, self.disp_name, cat="future_instance", id=inst_id)
+                emit("b", entry_ts, tid, "poll", cat="future_instance", id=inst_id)
         except Exception as e:
             # Ensure tracing keeps going even if something went wrong
             print(f"[async-flame] PollBP.stop error for {self.disp_name}: {e}")
+        finally:
+            account_overhead(self.sym, "poll", self.disp_name, t0, tid)
         # Always continue execution
         return False
 
+class LockFinishBP(gdb.FinishBreakpoint):
+    """Return of a lock-acquire poll: the first Pending starts a wait, Ready ends it."""
+    def __init__(self, frame, sym, acquire, lock, waiter, tid):
+        super().__init__(frame, internal=True)
+        self.sym = sym
+        self.acquire = acquire
+        self.lock = lock
+        self.waiter = waiter
+        self.tid = tid
+
+    def stop(self):
+        t0 = time.perf_counter_ns()
+        try:
+            ts = monotonic_ns()
+            try:
+                outcome = decode_poll_outcome(self.return_value)
+            except Exception:
+                outcome = None
+            wait_id = f"0x{self.acquire:x}"
+            for kind, value in locks.on_acquire_poll(self.acquire, self.lock, self.waiter, ts, outcome):
+                if kind == "wait_begin":
+                    emit("b", ts, self.tid, "lock wait", args={"lock": f"0x{self.lock:x}", "waiter": self.waiter},
+                         cat="lock_wait", id=wait_id)
+                elif kind == "wait_end":
+                    emit("e", ts, self.tid, "lock wait", args={"wait_us": value / 1000}, cat="lock_wait", id=wait_id)
+                else:
+                    flow_id, releaser = value
+                    emit("f", ts, self.tid, "lock handoff", args={"releaser": releaser, "waiter": self.waiter},
+                         cat="lock", id=flow_id)
+        except Exception as e:
+            print(f"[async-flame] LockFinishBP.stop error for {self.sym}: {e}")
+        finally:
+            account_overhead(("plugin", self.sym), "plugin", self.sym, t0, self.tid, finish=True)
+        return False
+
+    def out_of_scope(self):
+        # Unwound: the acquire future's drop (if it was waiting) closes the wait
+        pass
+
 class PluginBP(gdb.Breakpoint):
     def __init__(self, symbol):
         super().__init__(symbol, internal=True)
         self.sym = symbol
+        self.at_entry = symbol.startswith("*")
+        lock_role = plugin.lock_breakpoints().get(symbol)
+        channel_role = plugin.channel_breakpoints().get(symbol)
+        if lock_role:
+            self.role = f"lock_{lock_role}"
+        elif channel_role:
+            self.role = f"channel_{channel_role}"
+        elif symbol in plugin.wake_breakpoints():
+            self.role = "wake"
+        elif symbol in plugin.task_poll_breakpoints():
+            self.role = "task_poll"
+        else:
+            self.role = None
     def stop(self):
-        tid = gdb.selected_thread().ptid[1]
-        ts = monotonic_ns()
-        args = plugin.on_breakpoint(self.sym, gdb.selected_inferior())
-        emit("i", ts, tid, self.sym, args=args, cat=f"plugin_{plugin.name}")
+        t0 = time.perf_counter_ns()
+        tid = 0
+        try:
+            thread = gdb.selected_thread()
+            tid = thread.ptid[1]
+            if not trace_filter.thread_enabled(tid):
+                return False
+            ts = monotonic_ns()
+            # One cached view of the stop for every hook below (taken after
+            # monotonic_ns, whose inferior call resumes the target)
+            snap = snapshot.current(thread)
+            if self.role and self.role.startswith(("lock_", "channel_")):
+                # Lock and channel hooks fire on every operation; they only feed their trackers
+                if self.role.startswith("lock_"):
+                    self.track_lock(ts, tid, snap)
+                else:
+                    self.track_channel(ts, tid, snap)
+                return False
+            args = plugin.on_breakpoint(self.sym, snap)
+            emit("i", ts, tid, self.sym, args=args, cat=f"plugin_{plugin.name}")
+            if plugin.arg_count:
+                # Scheduler counters walk runtime structures from layouts; a walk
+                # that fails only loses this hit's counters, not the wake below
+                try:
+                    argv = read_args(snap, self.at_entry, plugin.arg_count)
+                    for ev in plugin.trace_events(self.sym, snap, argv, tid):
+                        emit(ev["ph"], ts, tid, ev["name"], args=ev.get("args"),
+                             cat=ev.get("cat", f"plugin_{plugin.name}"), id=ev.get("id"))
+                except Exception as e:
+                    print(f"[async-flame] {plugin.name} trace_events error for {self.sym}: {e}")
+            if self.role:
+                self.track_wake(ts, tid, snap)
+        except Exception as e:
+            # A failing hook must not stop the inferior (which ends a batch run)
+            print(f"[async-flame] PluginBP.stop error for {self.sym}: {e}")
+        finally:
+            account_overhead(("plugin", self.sym), "plugin", self.sym, t0, tid)
         return False
+    def track_wake(self, ts, tid, snap):
+        """Flow event from the waking poll to the woken task's next poll."""
+        arg0 = read_arg0(snap, self.at_entry)
+        if arg0 is None:
+            return
+        task = plugin.task_key(self.sym, arg0, snap)
+        if task is None:
+            return
+        if self.role == "wake":
+            stack = poll_stacks.get(tid)
+            waker = stack[-1] if stack else OUTSIDE_POLL
+            flow_id = wakes.on_wake(task, waker, ts)
+            if flow_id:
+                emit("s", ts, tid, "wake", args={"waker": waker, "task": f"0x{task:x}"}, cat="wake", id=flow_id)
+        else:
+            current_task[tid] = task
+            woken = wakes.on_task_poll(task, ts)
+            if woken:
+                flow_id, waker, delay = woken
+                # No binding point: the flow ends on the next slice on this thread, the task's poll
+                emit("f", ts, tid, "wake", args={"waker": waker, "delay_us": delay / 1000}, cat="wake", id=flow_id)
+    def track_channel(self, ts, tid, snap):
+        """Queue-depth counter track per channel, plus full/empty time for the summary."""
+        argv = read_args(snap, self.at_entry, max(1, plugin.arg_count))
+        state = plugin.channel_state(self.sym, snap, argv)
+        if state is None:
+            return
+        role = self.role[len("channel_"):]
+        channels.sample(role, state, ts)
+        if state.get("len") is not None:
+            label = channel_label(state["channel"], state.get("receiver"))
+            emit("C", ts, tid, f"{state['kind']} channel {label}", args={"len": state["len"]},
+                 cat=f"plugin_{plugin.name}")
+    def track_lock(self, ts, tid, snap):
+        """Lock waits per acquire future, and flows from a release to the waiter it unblocks."""
+        arg0 = read_arg0(snap, self.at_entry)
+        if arg0 is None:
+            return
+        stack = poll_stacks.get(tid)
+        current = stack[-1] if stack else OUTSIDE_POLL
+        if self.role == "lock_acquire":
+            lock = plugin.lock_key(arg0, snap)
+            if lock is not None:
+                LockFinishBP(snap.frame(), self.sym, arg0, lock, current, tid)
+        elif self.role == "lock_cancel":
+            if locks.on_cancel(arg0):
+                emit("e", ts, tid, "lock wait", args={"outcome": "cancelled"}, cat="lock_wait", id=f"0x{arg0:x}")
+        else:
+            flow_id = locks.on_release(arg0, current)
+            if flow_id:
+                emit("s", ts, tid, "lock handoff", args={"lock": f"0x{arg0:x}", "releaser": current},
+                     cat="lock", id=flow_id)
 
-# set breakpoints
-active_poll_bps = 0
-for sym, name in symbol_to_name.items():
-    if not sym: # Skip if poll_symbol was not found
-        continue
+# ---------- heap allocations ----------
+
+# Rust's allocator shims: every Box/Vec/String allocation goes through them.
+# They usually have no DWARF, so arguments are read from the entry registers
+# (the breakpoint lands past at most a frame-pointer push, which keeps them)
+# and the returned pointer from the return register. Sites are keyed by the
+# plain shim name (allocs.SHIM_ROLES) whichever spelling the binary uses.
+
+class AllocFinishBP(gdb.FinishBreakpoint):
+    """Return of a sampled allocation: remember the block so its free is seen."""
+    def __init__(self, frame, sym, tid, stack, weight):
+        super().__init__(frame, internal=True)
+        self.sym = sym
+        self.tid = tid
+        self.stack = stack
+        self.weight = weight
+
+    def stop(self):
+        t0 = time.perf_counter_ns()
+        snap = snapshot.current(gdb.selected_thread())
+        try:
+            ptr = snap.register(_RET_REGISTERS.get(snap.frame().architecture().name(), "rax"))
+        except (gdb.error, ValueError):
+            ptr = None
+        allocs.on_alloc(ptr, self.stack, self.weight)
+        account_overhead(("alloc", self.sym), "alloc", self.sym, t0, self.tid, finish=True)
+        return False
+
+    def out_of_scope(self):
+        t0 = time.perf_counter_ns()
+        allocs.on_alloc(None, self.stack, self.weight)
+        account_overhead(("alloc", self.sym), "alloc", self.sym, t0, self.tid, finish=True)
+
+class AllocBP(gdb.Breakpoint):
+    def __init__(self, symbol, role, location):
+        super().__init__(location, internal=True)
+        self.sym = symbol
+        self.role = role
+
+    def stop(self):
+        t0 = time.perf_counter_ns()
+        tid = 0
+        try:
+            thread = gdb.selected_thread()
+            tid = thread.ptid[1]
+            if not trace_filter.thread_enabled(tid):
+                return False
+            snap = snapshot.current(thread)
+            args = read_args(snap, True, 4)
+            if self.role == "dealloc":
+                if args[0]:
+                    allocs.on_free(args[0])
+                return False
+            if self.role == "realloc":
+                # realloc(ptr, old_size, align, new_size): a free plus a new block
+                if args[0]:
+                    allocs.on_free(args[0])
+                size = args[3]
+            else:
+                size = args[0]
+            if size is None:
+                return False
+            weight = allocs.sample(tid, size)
+            if weight is not None:
+                AllocFinishBP(snap.frame(), self.sym, tid, tuple(poll_stacks.get(tid, ())), weight)
+        except Exception as e:
+            print(f"[async-flame] AllocBP.stop error: {e}")
+        finally:
+            account_overhead(("alloc", self.sym), "alloc", self.sym, t0, tid)
+        return False
+
+alloc_bps = {}
+alloc_tracking = False
+
+def alloc_site_enabled(sym):
+    """Allocator entry points follow name/crate rules and the budget like poll sites."""
+    stats = overhead.sites.get(("alloc", sym))
+    return trace_filter.future_enabled(sym, sym) and not (stats and stats.disarmed)
+
+def resolve_alloc_symbol(sym):
+    """The spelling of allocator shim `sym` in the binary, or None."""
+    for name in shim_spellings(sym):
+        try:
+            gdb.parse_and_eval(f"&'{name}'")
+            return name
+        except gdb.error:
+            pass
+    return None
+
+def arm_alloc(sample_bytes=None):
+    """Switch allocation tracking on (or re-apply the filters to it when `sample_bytes` is None)."""
+    global alloc_tracking
+    if sample_bytes is not None:
+        allocs.set_interval(sample_bytes)
+    alloc_tracking = True
+    missing = []
+    for sym, role in SHIM_ROLES.items():
+        if not alloc_site_enabled(sym):
+            bp = alloc_bps.pop(sym, None)
+            if bp is not None and bp.is_valid():
+                bp.delete()
+            continue
+        if sym in alloc_bps:
+            continue
+        location = resolve_alloc_symbol(sym)
+        if location is None:
+            missing.append(sym)
+            continue
+        try:
+            alloc_bps[sym] = AllocBP(sym, role, location)
+        except gdb.error:
+            missing.append(sym)
+    if missing and not alloc_bps:
+        print(f"[async-flame] No allocator breakpoint resolved ({', '.join(missing)}, "
+              f"plain or __rustc::); no allocations will be recorded.")
+
+def disarm_alloc():
+    global alloc_tracking
+    alloc_tracking = False
+    for bp in alloc_bps.values():
+        if bp.is_valid():
+            bp.delete()
+    alloc_bps.clear()
+
+# ---------- blocking-in-async watchdog ----------
+
+WATCHDOG_MAX_FRAMES = 64
+# Number of the `catch signal` catchpoint; catchpoints have no gdb.Breakpoint
+# object in older GDBs, so they are driven through CLI commands
+_watchdog_catchpoint = None
+# `handle` settings of the watchdog signal before it was armed
+_watchdog_handle = None
+
+def capture_long_poll(tid, poll):
+    """Backtrace of `tid`, stopped by the watchdog signal in the middle of `poll`."""
+    frames = []
+    frame = gdb.newest_frame()
+    while frame is not None and len(frames) < WATCHDOG_MAX_FRAMES:
+        frames.append(frame.name() or f"0x{frame.pc():x}")
+        frame = frame.older()
+    now = watchdog.clock()
+    wall = now - poll.host_ns
+    elapsed = watchdog.running_ns(tid, poll, now)
+    polls = [p.name for p in watchdog.inflight.get(tid, ())]
+    # Trace time of the stop, in the trace's clock (which runs on while the
+    # inferior is stopped): poll entry plus host-measured wall time
+    emit("i", poll.entry_ts + wall, tid, f"long poll: {poll.name}", args={
+        "future": poll.name,
+        "innermost_poll": polls[-1] if polls else poll.name,
+        "poll_stack": polls,
+        "elapsed_ms": round(elapsed / 1e6, 3),
+        "stopped_ms": round((wall - elapsed) / 1e6, 3),
+        "stack": frames,
+    }, cat="blocking")
+    print(f"[async-flame] watchdog: {poll.name} on thread {tid} still polling after {elapsed / 1e6:.1f} ms, "
+          f"in {' <- '.join(frames[:4])}")
+
+class WatchdogCondition(gdb.Function):
+    """$_async_flame_watchdog() -- condition of the watchdog catchpoint; captures and never stops."""
+    def __init__(self):
+        super().__init__("_async_flame_watchdog")
+    def invoke(self):
+        t0 = time.perf_counter_ns()
+        tid = None
+        try:
+            tid = gdb.selected_thread().ptid[1]
+            poll = watchdog.take_request(tid)
+            if poll is not None:
+                capture_long_poll(tid, poll)
+            elif not watchdog.enabled and not watchdog.requests:
+                # Disarmed while signals were on their way: the last one arrived
+                gdb.post_event(remove_watchdog_catchpoint)
+        except Exception as e:
+            print(f"[async-flame] watchdog capture error: {e}")
+        watchdog.add_pause(time.perf_counter_ns() - t0, tid if NON_STOP else None)
+        return 0
+
+WatchdogCondition()
+
+def arm_watchdog(threshold_ms):
+    global _watchdog_catchpoint, _watchdog_handle
+    if _watchdog_catchpoint is None:
+        name = WATCHDOG_SIGNAL
+        _watchdog_handle = handle_settings(gdb.execute(f"info signals {name}", to_string=True), name)
+        # Discarded, never shown: the catchpoint condition does all the work
+        gdb.execute(f"handle {name} nostop noprint nopass", to_string=True)
+        gdb.execute(f"catch signal {name}", to_string=True)
+        _watchdog_catchpoint = int(gdb.parse_and_eval("$bpnum"))
+        gdb.execute(f"condition {_watchdog_catchpoint} $_async_flame_watchdog()", to_string=True)
+    watchdog.start(threshold_ms)
+
+def remove_watchdog_catchpoint():
+    """Delete the catchpoint and give the signal back its previous `handle` settings."""
+    global _watchdog_catchpoint, _watchdog_handle
+    if _watchdog_catchpoint is None or watchdog.enabled:
+        return
+    try:
+        gdb.execute(f"delete {_watchdog_catchpoint}", to_string=True)
+    except gdb.error:
+        pass    # already deleted by hand
+    if _watchdog_handle:
+        gdb.execute(f"handle {WATCHDOG_SIGNAL} {_watchdog_handle}", to_string=True)
+    _watchdog_catchpoint = None
+    _watchdog_handle = None
+
+def disarm_watchdog():
+    watchdog.stop()
+    # A signal already sent but not yet reported would reach the program
+    # (whose default action for it is to terminate): keep discarding until
+    # the last one arrives
+    if not watchdog.requests:
+        remove_watchdog_catchpoint()
+
+# ---------- self-overhead accounting ----------
+
+overhead = OverheadTracker()
+
+def account_overhead(key, kind, name, t0, tid, finish=False):
+    """Charge a handler's host time to its site; disarm the site once it blows the budget.
+
+    Breakpoints must not be deleted from inside `stop`, so the disarm is
+    deferred with gdb.post_event; the gap marker is emitted right away while
+    the inferior is still stopped.
+    """
+    handler_ns = time.perf_counter_ns() - t0
+    if watchdog.enabled:
+        # The inferior (only this thread in non-stop mode) did not run meanwhile
+        watchdog.add_pause(handler_ns, tid if NON_STOP else None)
+    if not overhead.record(key, kind, name, handler_ns, finish):
+        return
+    site = overhead.sites[key]
+    emit("i", monotonic_ns(), tid, f"tracing disabled: {name}",
+         args={"reason": "overhead budget", "handler_ms": round(site.total_ns / 1e6, 3), "hits": site.hits},
+         cat="async_flame_gap")
+    gdb.post_event(lambda: budget_disarm(key, kind))
+
+def budget_disarm(key, kind):
+    if kind == "poll":
+        disarm_poll_bp(key)
+    elif kind == "alloc":
+        bp = alloc_bps.pop(key[1], None)
+        if bp is not None and bp.is_valid():
+            bp.delete()
+    else:
+        bp = plugin_bps.pop(key[1], None)
+        if bp is not None and bp.is_valid():
+            bp.delete()
+    print(f"[async-flame] Overhead budget exceeded, disarmed {overhead.sites[key].name}")
+
+# ---------- runtime filtering ----------
+
+trace_filter = TraceFilter()
+
+# Armed poll breakpoints, keyed by poll symbol. Futures disabled by a filter
+# rule have no entry here: their breakpoint is deleted, not just skipped.
+poll_bps = {}
+
+# ---------- lazy, per-objfile breakpoint arming ----------
+
+def _main_objfile():
+    return os.path.basename(gdb.current_progspace().filename or "")
+
+def _find_objfile(basename):
+    return next((o.filename for o in gdb.objfiles()
+                 if o.filename and os.path.basename(o.filename) == basename), None)
+
+def _symbol_address(sym):
     try:
-        PollBP(sym, name)
-        active_poll_bps += 1
-    except gdb.error as e:
-        print(f"[async-flame] Error setting PollBP for {name} ({sym}): {e}")
-        pass # Continue if a symbol can't be resolved
-
-active_plugin_bps = 0
-for sym in plugin.extra_breakpoints():
+        return int(gdb.parse_and_eval(f"(unsigned long)&'{sym}'"))
+    except gdb.error:
+        return None
+
+def _process_live():
+    return gdb.selected_inferior().pid != 0
+
+arming = PollArming(poll_sites, _find_objfile, _symbol_address, _process_live, _main_objfile)
+# Enabled poll symbols whose objfile is not loaded (or not relocated) yet.
+pending_polls = arming.pending
+
+def _create_poll_bp(sym, spec):
     try:
-        PluginBP(sym)
-        active_plugin_bps +=1
-    except gdb.error as e:
-        print(f"[async-flame] Error setting PluginBP for {sym}: {e}")
-        pass
+        poll_bps[sym] = PollBP(spec, poll_sites[sym].name, sym)
+        return True
+    except gdb.error:
+        # Most likely a shared object that isn't loaded yet, retried on the next new_objfile event
+        return False
+
+def arm_poll_bp(sym):
+    if sym in poll_bps:
+        return True
+    return arming.arm(sym, lambda spec: _create_poll_bp(sym, spec))
+
+def disarm_poll_bp(sym):
+    pending_polls.discard(sym)
+    bp = poll_bps.pop(sym, None)
+    if bp is not None and bp.is_valid():
+        bp.delete()
+
+def apply_filters():
+    """Arm or delete poll breakpoints so they match the current filter rules."""
+    arming.new_pass()
+    for sym, site in poll_sites.items():
+        stats = overhead.sites.get(sym)
+        if trace_filter.future_enabled(site.name, sym) and not (stats and stats.disarmed):
+            arm_poll_bp(sym)
+        else:
+            disarm_poll_bp(sym)
+    if alloc_tracking:
+        arm_alloc()
+
+plugin_bps = {}
+
+def plugin_symbols():
+    return [*plugin.extra_breakpoints(), *plugin.lock_breakpoints(), *plugin.channel_breakpoints()]
+
+pending_plugin_syms = set(plugin_symbols())
+
+def arm_pending():
+    """Retry everything that is still pending; returns the number of newly armed breakpoints."""
+    armed = 0
+    arming.new_pass()
+    for sym in list(pending_polls):
+        armed += arm_poll_bp(sym)
+    for sym in list(pending_plugin_syms):
+        try:
+            plugin_bps[sym] = PluginBP(sym)
+            pending_plugin_syms.discard(sym)
+            armed += 1
+        except gdb.error:
+            pass
+    return armed
+
+def on_new_objfile(event):
+    if not pending_polls and not pending_plugin_syms:
+        return
+    t0 = time.perf_counter()
+    armed = arm_pending()
+    if armed:
+        print(f"[async-flame] {os.path.basename(event.new_objfile.filename or '?')}: armed {armed} breakpoints "
+              f"in {(time.perf_counter() - t0) * 1000:.1f} ms, {len(pending_polls)} polls still pending.")
+
+def on_exited(event):
+    """Forget per-run relocations; affected breakpoints go back to pending for the next run."""
+    for sym in arming.on_exited(list(poll_bps)):
+        bp = poll_bps.pop(sym)
+        if bp.is_valid():
+            bp.delete()
+    watchdog.reset()
+    # Signals still on their way died with the process
+    remove_watchdog_catchpoint()
+
+def _event_tid(event):
+    """Thread of a stop/continue event in non-stop mode, None (every thread) in all-stop."""
+    thread = getattr(event, "inferior_thread", None)
+    return thread.ptid[1] if thread is not None else None
+
+def on_stop(event):
+    # Only stops GDB reports arrive here; handlers that return False account for themselves
+    watchdog.pause(_event_tid(event))
+
+def on_cont(event):
+    watchdog.resume(_event_tid(event))
+
+gdb.events.new_objfile.connect(on_new_objfile)
+gdb.events.exited.connect(on_exited)
+gdb.events.stop.connect(on_stop)
+gdb.events.cont.connect(on_cont)
+
+# set breakpoints
+apply_filters()
+arm_pending()
+if ALLOC_SAMPLE_BYTES is not None:
+    arm_alloc(int(ALLOC_SAMPLE_BYTES or "0"))
+if WATCHDOG_MS:
+    arm_watchdog(float(WATCHDOG_MS))
 
 # command to dump json
 class DumpTrace(gdb.Command):
@@ -201,9 +904,12 @@ class DumpTrace(gdb.Command):
         # This is a heuristic: if inferior is not valid, assume exit
         if not gdb.selected_inferior().is_valid():
             for frame_id, meta in list(finish_bp_metadata.items()): # list() for safe iteration
-                emit("E", monotonic_ns(), meta['tid'], f"{meta['name']} (prog_exit)", cat="future_poll_exit")
+                ts = monotonic_ns()
+                emit("E", ts, meta['tid'], f"{meta['name']} (prog_exit)", cat="future_poll_exit")
+                end_instance_poll(meta['addr'], meta['name'], meta['entry_ts'], ts, meta['tid'], "prog_exit")
                 del finish_bp_metadata[frame_id]
 
+        trace_events = merged_trace_events()
         trace_payload = {
             "traceEvents": trace_events,
             "displayTimeUnit": "us" # Chrome prefers us
@@ -211,8 +917,241 @@ class DumpTrace(gdb.Command):
         with open(final_out_path, "w") as fp:
             json.dump(trace_payload, fp, indent=2)
         print(f"[async-flame] {final_out_path} written (events={len(trace_events)})")
+        instances_path = final_out_path.with_suffix(".instances.json")
+        instances.dump(instances_path)
+        print(f"[async-flame] {instances_path} written (future types={len(instances.rows())})")
+        wakes_path = final_out_path.with_suffix(".wakes.json")
+        wakes.dump(wakes_path)
+        print(f"[async-flame] {wakes_path} written (waker/wakee pairs={len(wakes.rows())})")
+        locks_path = final_out_path.with_suffix(".locks.json")
+        locks.dump(locks_path)
+        print(f"[async-flame] {locks_path} written (contended locks={len(locks.rows())})")
+        channels_path = final_out_path.with_suffix(".channels.json")
+        channels.dump(channels_path)
+        print(f"[async-flame] {channels_path} written (channels={len(channels.channels)})")
+        if allocs.futures:
+            allocs_path = final_out_path.with_suffix(".allocs.json")
+            allocs.dump(allocs_path)
+            allocs.write_folded(final_out_path.with_suffix(".allocs.folded"))
+            print(f"[async-flame] {allocs_path} and .allocs.folded written (futures={len(allocs.futures)})")
+
+class FilterCommand(gdb.Command):
+    """Shared parsing for async_flame_enable / async_flame_disable."""
+    def __init__(self, name, enable):
+        super().__init__(name, gdb.COMMAND_USER)
+        self.enable = enable
+    def invoke(self, arg, from_tty):
+        parts = arg.split(None, 1)
+        if len(parts) != 2 or parts[0] not in FILTER_KINDS:
+            print(f"[async-flame] usage: {'async_flame_enable' if self.enable else 'async_flame_disable'} "
+                  f"{{{'|'.join(FILTER_KINDS)}}} PATTERN")
+            return
+        try:
+            trace_filter.add_rule(self.enable, parts[0], parts[1].strip())
+        except (ValueError, re.error) as e:
+            print(f"[async-flame] Invalid filter: {e}")
+            return
+        apply_filters()
+        print(f"[async-flame] {len(poll_bps)}/{len(poll_sites)} future poll breakpoints armed, {len(pending_polls)} pending.")
+
+class SampleCommand(gdb.Command):
+    """async_flame_sample N -- trace only 1 in N polls of each future."""
+    def __init__(self):
+        super().__init__("async_flame_sample", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            trace_filter.set_sampling(int(arg.strip() or "1"))
+        except ValueError as e:
+            print(f"[async-flame] usage: async_flame_sample N ({e})")
+            return
+        print(f"[async-flame] Tracing 1 in {trace_filter.sample_every} polls per future.")
+
+class RateLimitCommand(gdb.Command):
+    """async_flame_ratelimit EVENTS_PER_SEC [BURST] -- per-future token bucket, 0 turns it off."""
+    def __init__(self):
+        super().__init__("async_flame_ratelimit", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            values = [float(v) for v in arg.split()]
+            trace_filter.set_rate_limit(values[0], values[1] if len(values) > 1 else 0.0)
+        except (ValueError, IndexError) as e:
+            print(f"[async-flame] usage: async_flame_ratelimit EVENTS_PER_SEC [BURST] ({e})")
+            return
+        print("[async-flame] " + trace_filter.describe()[1])
+
+class FiltersCommand(gdb.Command):
+    """async_flame_filters [reset] -- show (or clear) the filter, sampling and rate-limit state."""
+    def __init__(self):
+        super().__init__("async_flame_filters", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        if arg.strip() == "reset":
+            trace_filter.reset()
+            apply_filters()
+        for line in trace_filter.describe():
+            print(f"[async-flame] {line}")
+        print(f"[async-flame] {len(poll_bps)}/{len(poll_sites)} future poll breakpoints armed, {len(pending_polls)} pending.")
+
+class OverheadCommand(gdb.Command):
+    """async_flame_overhead [N] -- show handler time and hits for the N most expensive breakpoints."""
+    def __init__(self):
+        super().__init__("async_flame_overhead", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_overhead [N]")
+            return
+        for line in overhead.report(top):
+            print(f"[async-flame] {line}")
+
+class BudgetCommand(gdb.Command):
+    """async_flame_budget MS|off|reset -- auto-disarm breakpoints whose handler time exceeds MS."""
+    def __init__(self):
+        super().__init__("async_flame_budget", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        arg = arg.strip()
+        if arg == "reset":
+            # Forget the accounting and re-arm whatever the budget switched off
+            overhead.reset()
+            apply_filters()
+            for sym in plugin_symbols():
+                if sym not in plugin_bps:
+                    pending_plugin_syms.add(sym)
+            arm_pending()
+        elif arg == "off":
+            overhead.budget_ns = 0
+        else:
+            try:
+                overhead.budget_ns = int(float(arg) * 1e6)
+            except ValueError:
+                print("[async-flame] usage: async_flame_budget MS|off|reset")
+                return
+        state = f"{overhead.budget_ns / 1e6:g} ms per breakpoint" if overhead.budget_ns else "off"
+        print(f"[async-flame] Overhead budget: {state}.")
+
+class InstancesCommand(gdb.Command):
+    """async_flame_instances [N] -- polls-until-Ready, busy and wall time per future type."""
+    def __init__(self):
+        super().__init__("async_flame_instances", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_instances [N]")
+            return
+        for line in instances.report(top):
+            print(f"[async-flame] {line}")
+
+class WakesCommand(gdb.Command):
+    """async_flame_wakes [N] -- wake-to-poll delay distribution per waker/wakee pair."""
+    def __init__(self):
+        super().__init__("async_flame_wakes", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_wakes [N]")
+            return
+        for line in wakes.report(top):
+            print(f"[async-flame] {line}")
+
+class LocksCommand(gdb.Command):
+    """async_flame_locks [N] -- the N most contended async locks by total wait time."""
+    def __init__(self):
+        super().__init__("async_flame_locks", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_locks [N]")
+            return
+        for line in locks.report(top):
+            print(f"[async-flame] {line}")
+
+class ChannelsCommand(gdb.Command):
+    """async_flame_channels [N] -- channels that spent the most time full (then empty)."""
+    def __init__(self):
+        super().__init__("async_flame_channels", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_channels [N]")
+            return
+        for line in channels.report(top):
+            print(f"[async-flame] {line}")
+
+class AllocCommand(gdb.Command):
+    """async_flame_alloc BYTES|off -- attribute heap allocations to futures, sampling once per BYTES (0: all)."""
+    def __init__(self):
+        super().__init__("async_flame_alloc", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        arg = arg.strip()
+        if arg == "off":
+            disarm_alloc()
+            print("[async-flame] Allocation tracking off.")
+            return
+        try:
+            sample_bytes = int(arg)
+        except ValueError:
+            print("[async-flame] usage: async_flame_alloc BYTES|off")
+            return
+        arm_alloc(sample_bytes)
+        if alloc_bps:
+            mode = f"1 sample per {allocs.sample_bytes} bytes" if allocs.sample_bytes else "every allocation"
+            print(f"[async-flame] Allocation tracking on ({mode}), {len(alloc_bps)} allocator entry points.")
+
+class AllocsCommand(gdb.Command):
+    """async_flame_allocs [N] -- allocated and still-live bytes per future."""
+    def __init__(self):
+        super().__init__("async_flame_allocs", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        try:
+            top = int(arg.strip() or "20")
+        except ValueError:
+            print("[async-flame] usage: async_flame_allocs [N]")
+            return
+        for line in allocs.report(top):
+            print(f"[async-flame] {line}")
+
+class WatchdogCommand(gdb.Command):
+    """async_flame_watchdog MS|off -- capture the stack of polls still running after MS milliseconds."""
+    def __init__(self):
+        super().__init__("async_flame_watchdog", gdb.COMMAND_USER)
+    def invoke(self, arg, from_tty):
+        arg = arg.strip()
+        if arg == "off":
+            disarm_watchdog()
+            print("[async-flame] Watchdog off.")
+            return
+        try:
+            threshold_ms = float(arg)
+            if threshold_ms <= 0:
+                raise ValueError(arg)
+        except ValueError:
+            print("[async-flame] usage: async_flame_watchdog MS|off")
+            return
+        arm_watchdog(threshold_ms)
+        print(f"[async-flame] Watchdog on: stacks of polls running longer than {threshold_ms:g} ms "
+              f"(category `blocking`), {watchdog.signals} captured so far.")
 
 DumpTrace()
+FilterCommand("async_flame_enable", True)
+FilterCommand("async_flame_disable", False)
+SampleCommand()
+RateLimitCommand()
+FiltersCommand()
+OverheadCommand()
+InstancesCommand()
+WakesCommand()
+LocksCommand()
+ChannelsCommand()
+AllocCommand()
+AllocsCommand()
+WatchdogCommand()
+BudgetCommand()
 
-print(f"[async-flame] Breakpoints set: {active_poll_bps} future polls, {active_plugin_bps} runtime events from plugin '{plugin.name}'.")
+print(f"[async-flame] Breakpoints set in {(time.perf_counter() - STARTUP_T0) * 1000:.1f} ms: "
+      f"{len(poll_bps)} future polls armed, {len(pending_polls)} pending; "
+      f"{len(plugin_bps)} runtime events from plugin '{plugin.name}' armed, {len(pending_plugin_syms)} pending.")
 print(f"[async-flame] Run your program. Then use 'dump_async_flame' to write traceEvents.json.") 
\ No newline at end of file
@@ -0,0 +1,146 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from gdb_profiler.analytics import pair, read_columns
+
+# Logical async stacks as folded stacks for flamegraph.pl / inferno:
+#
+#   python -m gdb_profiler.async_stacks results/traceEvents.json \
+#       [--deps results/async_dependencies.json] [--per-thread] [-o results/async.folded]
+#   flamegraph.pl results/async.folded > async.svg     # or: inferno-flamegraph
+#
+# A stack is the chain of polls in flight on one thread, outermost (the task's
+# root future) first, so runtime frames never show up. Each stack is weighted
+# by the self time of its innermost poll, in microseconds.
+#
+# Futures without a poll breakpoint (no poll symbol in the future map) are
+# polled inline by their parent and leave a gap: the trace shows A polling C
+# while the state machine is really A -> B -> C. With the analyzer's
+# dependency tree (`dwarf_analyzer.main <binary> --json`), the futures that
+# A contains and that contain C are inserted between them when they form a
+# single chain, marked `_[i]` so both flamegraph tools color them like
+# inlined frames.
+
+INFERRED = "_[i]"
+
+
+def load_dependency_tree(path):
+    """`dependency_tree` of the analyzer's --json output (a bare tree also works)."""
+    with open(path) as f:
+        data = json.load(f)
+    tree = data.get("dependency_tree", data)
+    return {name: set(deps) for name, deps in tree.items()}
+
+
+class GapFiller:
+    """Futures between an observed parent and child poll, from the dependency tree."""
+
+    def __init__(self, tree):
+        # The analyzer's tree is transitive: tree[a] holds every future nested in a
+        self.tree = tree
+        self._cache = {}
+
+    def between(self, parent, child):
+        key = (parent, child)
+        if key not in self._cache:
+            self._cache[key] = self._between(parent, child)
+        return self._cache[key]
+
+    def _between(self, parent, child):
+        if child not in self.tree.get(parent, ()):
+            return []
+        inner = [x for x in self.tree[parent]
+                 if x not in (parent, child) and child in self.tree.get(x, ())]
+        # Outermost first; give up unless each one contains the next
+        inner.sort(key=lambda x: -len(self.tree.get(x, ())))
+        for outer, nested in zip(inner, inner[1:]):
+            if nested not in self.tree.get(outer, ()):
+                return []
+        return inner
+
+
+def frame_name(name):
+    # ';' separates frames in the folded format ([u8; 32] and the like)
+    return name.replace(";", ",")
+
+
+def fold(spans, names, tids, gaps=None, per_thread=False):
+    """{folded stack: self time in us}, one entry per distinct logical stack."""
+    n = len(spans.start)
+    if n == 0:
+        return {}
+    # Intern (parent path, name) level by level; parents sit one level up
+    path = np.full(n, -1, dtype=np.int64)
+    path_parent, path_name, path_tid = [], [], []
+    for level in range(int(spans.level.max()) + 1):
+        sel = np.nonzero(spans.level == level)[0]
+        if len(sel) == 0:
+            continue
+        parent = spans.parent[sel]
+        up = np.where(parent >= 0, path[np.clip(parent, 0, None)], -1)
+        # Roots (and orphans whose parent never closed) are keyed by thread in per-thread mode
+        tid = np.where(up >= 0, 0, spans.tid[sel] if per_thread else 0).astype(np.int64)
+        key = np.stack([up, spans.name[sel].astype(np.int64), tid], axis=1)
+        uniq, inverse = np.unique(key, axis=0, return_inverse=True)
+        path[sel] = len(path_parent) + inverse.reshape(-1)
+        path_parent.extend(uniq[:, 0].tolist())
+        path_name.extend(uniq[:, 1].tolist())
+        path_tid.extend(uniq[:, 2].tolist())
+    weight = np.bincount(path, weights=spans.self_time, minlength=len(path_parent))
+
+    folded = {}
+    for p in np.nonzero(weight > 0)[0]:
+        chain = []
+        node = int(p)
+        while node >= 0:
+            chain.append(names[path_name[node]])
+            root = node
+            node = path_parent[node]
+        chain.reverse()
+        frames = [frame_name(chain[0])]
+        for outer, inner in zip(chain, chain[1:]):
+            if gaps is not None:
+                frames.extend(frame_name(x) + INFERRED for x in gaps.between(outer, inner))
+            frames.append(frame_name(inner))
+        if per_thread:
+            frames.insert(0, f"thread {tids[path_tid[root]]}")
+        stack = ";".join(frames)
+        folded[stack] = folded.get(stack, 0.0) + float(weight[p])
+    return folded
+
+
+def write_folded(folded, path):
+    with open(path, "w") as f:
+        for stack, us in sorted(folded.items()):
+            if round(us) > 0:
+                f.write(f"{stack} {round(us)}\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.async_stacks",
+                                     description="Folded logical async stacks of a trace, weighted by self time.")
+    parser.add_argument("trace", help="traceEvents.json (or .ndjson)")
+    parser.add_argument("-o", "--output", help="folded stack file (default: <trace>.folded)")
+    parser.add_argument("--deps", help="analyzer --json output, to fill in futures polled without a breakpoint")
+    parser.add_argument("--per-thread", action="store_true", help="root every stack at its thread")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write <trace>.npz")
+    args = parser.parse_args(argv)
+
+    columns = read_columns(args.trace, cache=not args.no_cache)
+    spans = pair(columns)
+    gaps = GapFiller(load_dependency_tree(args.deps)) if args.deps else None
+    folded = fold(spans, columns.names, columns.tids, gaps, args.per_thread)
+    out = args.output or os.path.splitext(args.trace)[0] + ".folded"
+    write_folded(folded, out)
+    total = sum(folded.values())
+    print(f"[async-stacks] {len(folded)} stacks, {total / 1e3:.1f} ms self time from {len(spans.start)} polls "
+          f"-> {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
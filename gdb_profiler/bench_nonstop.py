@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import pathlib
+import re
+import subprocess
+import sys
+
+from gdb_profiler.orchestrate import CACHE, GDB_SCRIPT, RESULTS, WORKSPACE_ROOT, analyze, binary_key
+
+# Throughput of a multi-threaded tokio workload untraced, traced in all-stop
+# mode and traced in non-stop mode (ASYNC_FLAME_NON_STOP=1):
+#
+#   (cd tests/tokio_nonstop_bench && cargo build)
+#   python -m gdb_profiler.bench_nonstop [--seconds 10] [--tasks 64] [--workers 4]
+#
+# In all-stop mode every poll breakpoint stops all workers while GDB runs
+# the handler; in non-stop mode only the hitting worker waits, so the gap
+# between the two grows with the number of busy workers.
+
+DEFAULT_BINARY = WORKSPACE_ROOT / "tests" / "tokio_nonstop_bench" / "target" / "debug" / "tokio_nonstop_bench"
+RESULT_LINE = re.compile(r"steps=(\d+) elapsed=([\d.]+)s steps_per_s=([\d.]+)")
+
+
+def run(mode, binary, program_args, env, timeout):
+    if mode == "untraced":
+        cmd = [str(binary), *program_args]
+    else:
+        cmd = ["gdb", "-q", "-nx", "-batch", "-ex", "set pagination off", "-ex", "set confirm off",
+               "-x", str(GDB_SCRIPT), "-ex", "run", "-ex", f"dump_async_flame bench_nonstop.{mode}.json",
+               "--args", str(binary), *program_args]
+        env = dict(env, ASYNC_FLAME_NON_STOP="1" if mode == "non-stop" else "0")
+    out = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=timeout).stdout
+    m = RESULT_LINE.search(out)
+    events = re.search(r"written \(events=(\d+)\)", out)
+    if m is None:
+        (RESULTS / f"bench_nonstop.{mode}.log").write_text(out)
+    return {"steps": int(m.group(1)) if m else None,
+            "steps_per_s": float(m.group(3)) if m else None,
+            "events": int(events.group(1)) if events else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.bench_nonstop",
+                                     description="Compare all-stop and non-stop tracing throughput.")
+    parser.add_argument("binary", nargs="?", default=str(DEFAULT_BINARY))
+    parser.add_argument("--seconds", type=int, default=10, help="workload duration per run")
+    parser.add_argument("--tasks", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="tokio worker threads")
+    args = parser.parse_args(argv)
+
+    binary = pathlib.Path(args.binary)
+    if not binary.exists():
+        print(f"[bench] {binary} not found; build tests/tokio_nonstop_bench first.")
+        return 1
+    RESULTS.mkdir(parents=True, exist_ok=True)
+    cache_dir = CACHE / binary_key(binary)
+    if not cache_dir.exists():
+        analyze(str(binary), str(cache_dir))
+    env = dict(os.environ, TOKIO_WORKER_THREADS=str(args.workers),
+               ASYNC_FLAME_MAP=str(cache_dir / "future_map.json"),
+               ASYNC_FLAME_LAYOUTS=str(cache_dir / "type_layouts.json"))
+    program_args = [str(args.seconds), str(args.tasks)]
+    # Traced runs are slow to start and to dump; give them ample headroom
+    timeout = args.seconds * 20 + 600
+
+    rows = {}
+    for mode in ("untraced", "all-stop", "non-stop"):
+        rows[mode] = run(mode, binary, program_args, env, timeout)
+        print(f"[bench] {mode:<9} done")
+
+    base = rows["untraced"]["steps_per_s"]
+    print(f"{'mode':<10} {'steps/s':>12} {'vs untraced':>12} {'poll events':>12}")
+    for mode, row in rows.items():
+        rate = row["steps_per_s"]
+        ratio = f"{rate / base:.3f}x" if rate and base else "-"
+        print(f"{mode:<10} {rate if rate is not None else '-':>12} {ratio:>12} "
+              f"{row['events'] if row['events'] is not None else '-':>12}")
+    a, n = rows["all-stop"]["steps_per_s"], rows["non-stop"]["steps_per_s"]
+    if a and n:
+        print(f"[bench] non-stop traced throughput is {n / a:.2f}x all-stop with {args.workers} workers")
+    with open(RESULTS / "bench_nonstop.json", "w") as f:
+        json.dump({"workers": args.workers, "tasks": args.tasks, "seconds": args.seconds, "runs": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
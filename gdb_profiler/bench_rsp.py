@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import pathlib
+import re
+import socket
+import subprocess
+import sys
+
+from gdb_profiler.bench_nonstop import DEFAULT_BINARY, RESULT_LINE
+from gdb_profiler.orchestrate import CACHE, GDB_SCRIPT, RESULTS, WORKSPACE_ROOT, analyze, binary_key
+
+# Cost per traced poll of the same workload through async_flame_gdb (GDB and
+# its Python API, all-stop) and through rsp_trace (the remote protocol
+# straight to gdbserver):
+#
+#   (cd tests/tokio_nonstop_bench && cargo build)
+#   python -m gdb_profiler.bench_rsp [--seconds 10] [--tasks 64] [--workers 4]
+#
+# The workload runs for a fixed time and prints how many steps it made. The
+# time a traced run lost is its elapsed time minus what its steps take
+# untraced; divided by the polls in its trace that is the cost per poll,
+# breakpoint stop and resume included. Both tracers record polls only
+# (async_flame_gdb runs with the generic plugin), so the hits are the same.
+
+HIT_LINE = re.compile(r"([\d.]+) us handler time per hit, (\d+) round-trips / (\d+) packets")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def polls_in(path):
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    return sum(1 for ev in events if ev["ph"] == "B" and ev.get("cat") == "future_poll")
+
+
+def run(mode, binary, program_args, env, timeout):
+    """Workload output (and tracer output) of one run; the trace goes to results/bench_rsp.<mode>.json."""
+    trace = RESULTS / f"bench_rsp.{mode}.json"
+    if mode == "untraced":
+        out = subprocess.run([str(binary), *program_args], env=env, capture_output=True, text=True,
+                             timeout=timeout).stdout
+        return out, "", None
+    if mode == "gdb":
+        cmd = ["gdb", "-q", "-nx", "-batch", "-ex", "set pagination off", "-ex", "set confirm off",
+               "-x", str(GDB_SCRIPT), "-ex", "run", "-ex", f"dump_async_flame {trace.name}",
+               "--args", str(binary), *program_args]
+        out = subprocess.run(cmd, env=dict(env, ASYNC_FLAME_PLUGIN="base", ASYNC_FLAME_NON_STOP="0"),
+                             capture_output=True, text=True, timeout=timeout).stdout
+        return out, out, trace
+    port = free_port()
+    # The inferior inherits gdbserver's stdout, so the workload's result line comes from the server
+    server = subprocess.Popen(["gdbserver", "--once", f"localhost:{port}", str(binary), *program_args],
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in server.stdout:
+            if "Listening on port" in line:
+                break
+        tracer = subprocess.run([sys.executable, "-m", "gdb_profiler.rsp_trace", f"localhost:{port}",
+                                 str(binary), str(trace)],
+                                cwd=WORKSPACE_ROOT, env=env, capture_output=True, text=True, timeout=timeout).stdout
+        out = server.communicate(timeout=timeout)[0]
+    finally:
+        if server.poll() is None:
+            server.kill()
+    return out, tracer, trace
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.bench_rsp",
+                                     description="Compare the per-poll cost of async_flame_gdb and rsp_trace.")
+    parser.add_argument("binary", nargs="?", default=str(DEFAULT_BINARY))
+    parser.add_argument("--seconds", type=int, default=10, help="workload duration per run")
+    parser.add_argument("--tasks", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=4, help="tokio worker threads")
+    args = parser.parse_args(argv)
+
+    binary = pathlib.Path(args.binary)
+    if not binary.exists():
+        print(f"[bench] {binary} not found; build tests/tokio_nonstop_bench first.")
+        return 1
+    RESULTS.mkdir(parents=True, exist_ok=True)
+    cache_dir = CACHE / binary_key(binary)
+    if not cache_dir.exists():
+        analyze(str(binary), str(cache_dir))
+    env = dict(os.environ, TOKIO_WORKER_THREADS=str(args.workers),
+               ASYNC_FLAME_MAP=str(cache_dir / "future_map.json"),
+               ASYNC_FLAME_LAYOUTS=str(cache_dir / "type_layouts.json"))
+    program_args = [str(args.seconds), str(args.tasks)]
+    timeout = args.seconds * 20 + 600
+
+    rows = {}
+    for mode in ("untraced", "gdb", "rsp"):
+        out, tracer_out, trace = run(mode, binary, program_args, env, timeout)
+        m = RESULT_LINE.search(out)
+        if m is None or (trace is not None and not trace.exists()):
+            (RESULTS / f"bench_rsp.{mode}.log").write_text(out + tracer_out)
+            print(f"[bench] {mode} run failed, see results/bench_rsp.{mode}.log")
+            return 1
+        row = rows[mode] = {"steps": int(m.group(1)), "elapsed_s": float(m.group(2)),
+                            "polls": polls_in(trace) if trace is not None else None}
+        hit = HIT_LINE.search(tracer_out)
+        if hit:
+            row["handler_us"] = float(hit.group(1))
+            row["round_trips"], row["packets"] = int(hit.group(2)), int(hit.group(3))
+        print(f"[bench] {mode:<8} done")
+
+    base_rate = rows["untraced"]["steps"] / rows["untraced"]["elapsed_s"]
+    print(f"{'mode':<8} {'steps/s':>12} {'polls':>10} {'us/poll':>9}")
+    for mode, row in rows.items():
+        rate = row["steps"] / row["elapsed_s"]
+        cost = "-"
+        if row["polls"]:
+            # Time lost to tracing: elapsed minus the untraced time of the same steps
+            row["us_per_poll"] = (row["elapsed_s"] - row["steps"] / base_rate) / row["polls"] * 1e6
+            cost = f"{row['us_per_poll']:.1f}"
+        print(f"{mode:<8} {rate:>12.1f} {row['polls'] or '-':>10} {cost:>9}")
+    g, r = rows["gdb"].get("us_per_poll"), rows["rsp"].get("us_per_poll")
+    if g and r:
+        print(f"[bench] rsp_trace costs {r / g:.2f}x async_flame_gdb per poll "
+              f"({r:.1f} vs {g:.1f} us, {args.workers} workers)")
+    with open(RESULTS / "bench_rsp.json", "w") as f:
+        json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Channel queue depth for async_flame_gdb.
+
+Every send and receive the runtime plugin instruments yields a sample of the
+channel's queue length (and capacity, for bounded channels). Between two
+samples a channel is assumed to keep the length last seen, which gives the
+time it spent full (senders would block) and empty (receivers starve).
+Broadcast channels are sampled per receiver, since each one lags on its own.
+"""
+import json
+
+
+class ChannelStats:
+    __slots__ = ("kind", "capacity", "semaphore", "sends", "recvs", "recvs_empty", "max_len",
+                 "last_ts", "last_len", "observed_ns", "full_ns", "empty_ns")
+
+    def __init__(self, kind, capacity, semaphore):
+        self.kind = kind
+        self.capacity = capacity
+        self.semaphore = semaphore
+        self.sends = 0
+        self.recvs = 0
+        self.recvs_empty = 0
+        self.max_len = 0
+        self.last_ts = None
+        self.last_len = None
+        self.observed_ns = 0
+        self.full_ns = 0
+        self.empty_ns = 0
+
+
+def channel_label(channel, receiver=None):
+    return f"0x{channel:x}" + (f" rx 0x{receiver:x}" if receiver is not None else "")
+
+
+class ChannelTracker:
+    def __init__(self):
+        self.channels = {}      # (channel, receiver or None) -> ChannelStats
+
+    def sample(self, role, state, ts):
+        """Account a send/recv; `state` is the dict returned by the plugin's channel_state()."""
+        key = (state["channel"], state.get("receiver"))
+        stats = self.channels.get(key)
+        if stats is None:
+            stats = self.channels[key] = ChannelStats(state["kind"], state.get("capacity"), state.get("semaphore"))
+        length = state.get("len")
+        if role == "send":
+            stats.sends += 1
+        else:
+            stats.recvs += 1
+            if length == 0:
+                stats.recvs_empty += 1
+        if length is None:
+            return
+        if stats.last_ts is not None:
+            dt = max(0, ts - stats.last_ts)
+            stats.observed_ns += dt
+            if stats.last_len == 0:
+                stats.empty_ns += dt
+            elif stats.capacity and stats.last_len >= stats.capacity:
+                stats.full_ns += dt
+        stats.last_ts, stats.last_len = ts, length
+        stats.max_len = max(stats.max_len, length)
+
+    def rows(self):
+        rows = []
+        for (channel, receiver), s in self.channels.items():
+            observed = s.observed_ns or 1
+            rows.append({
+                "channel": channel_label(channel, receiver),
+                "kind": s.kind,
+                "capacity": s.capacity,
+                "semaphore": f"0x{s.semaphore:x}" if s.semaphore else None,
+                "sends": s.sends,
+                "recvs": s.recvs,
+                "recvs_empty": s.recvs_empty,
+                "max_len": s.max_len,
+                "observed_us": s.observed_ns / 1e3,
+                "full_us": s.full_ns / 1e3,
+                "empty_us": s.empty_ns / 1e3,
+                "full_share": s.full_ns / observed,
+                "empty_share": s.empty_ns / observed,
+            })
+        rows.sort(key=lambda r: (r["full_us"], r["empty_us"]), reverse=True)
+        return rows
+
+    def report(self, top=20):
+        rows = self.rows()
+        lines = [f"{len(rows)} channels, {sum(1 for r in rows if r['full_us'])} seen full",
+                 f"{'kind':<15} {'cap':>6} {'max':>6} {'sends':>8} {'recvs':>8} {'full':>6} {'empty':>6}  channel"]
+        for r in rows[:top]:
+            cap = r["capacity"] if r["capacity"] is not None else "-"
+            lines.append(f"{r['kind']:<15} {cap:>6} {r['max_len']:>6} {r['sends']:>8} {r['recvs']:>8} "
+                         f"{r['full_share']:>6.1%} {r['empty_share']:>6.1%}  {r['channel']}")
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as fp:
+            json.dump({"channels": self.rows()}, fp, indent=2)
@@ -0,0 +1,157 @@
+import argparse
+import json
+import math
+import re
+import sys
+
+import numpy as np
+
+from gdb_profiler.analytics import pair, read_columns
+
+# Per-future regressions between two traces of the same workload:
+#
+#   python -m gdb_profiler.compare results/before.traceEvents.json results/after.traceEvents.json \
+#       [--max-slowdown 0.10] [--max-total 0.25] [--alpha 0.01] [--min-polls 20] [--json report.json]
+#
+# Futures are matched by display name with the analyzer's `<0x..>` type-id
+# suffix dropped, since type ids change from build to build. For each one
+# the poll count, total time and latency percentiles of both runs are
+# compared, and a one-sided Mann-Whitney U test says whether its poll
+# durations got longer. A future regresses when
+#   * its median poll is more than --max-slowdown slower and the test is
+#     significant at --alpha, or
+#   * its total poll time grew by more than --max-total.
+# Both runs need at least --min-polls polls of the future. The exit status is
+# 1 when anything regressed, so the command can gate CI.
+#
+# Traces go through analytics' columnar reader (and its .npz cache); only the
+# duration arrays are kept per run.
+
+TYPE_ID = re.compile(r"<0x[0-9a-f]+>")
+
+
+def canonical(name):
+    return TYPE_ID.sub("", name)
+
+
+class Run:
+    """Poll durations of one trace, grouped by canonical future name."""
+
+    def __init__(self, path, cache=True):
+        columns = read_columns(path, cache)
+        spans = pair(columns)
+        keys = {}
+        name_key = np.array([keys.setdefault(canonical(n), len(keys)) for n in columns.names], dtype=np.int64)
+        key = name_key[spans.name] if len(spans.name) else np.array([], dtype=np.int64)
+        order = np.lexsort((spans.dur, key))
+        durations = spans.dur[order]
+        bounds = np.r_[0, np.cumsum(np.bincount(key, minlength=len(keys)))]
+        self.path = path
+        self.span_us = float(spans.end.max() - spans.start.min()) if len(spans.start) else 0.0
+        # name -> sorted durations (us)
+        self.futures = {name: durations[bounds[i]:bounds[i + 1]] for name, i in keys.items()
+                        if bounds[i + 1] > bounds[i]}
+
+
+def mann_whitney(before, after):
+    """One-sided p-value for "after is stochastically larger", and P(after > before)."""
+    na, nb = len(before), len(after)
+    values = np.concatenate([before, after])
+    uniq, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    # Average rank of each distinct value (1-based)
+    avg_rank = np.cumsum(counts) - (counts - 1) / 2.0
+    rank_sum = avg_rank[inverse[na:]].sum()
+    u = rank_sum - nb * (nb + 1) / 2.0
+    n = na + nb
+    ties = float((counts ** 3 - counts).sum())
+    var = na * nb / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+    if var <= 0:
+        return 1.0, 0.5
+    z = (u - na * nb / 2.0) / math.sqrt(var)
+    return 0.5 * math.erfc(z / math.sqrt(2)), u / (na * nb)
+
+
+def summarize(durations):
+    p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+    return {"polls": int(len(durations)), "total_us": float(durations.sum()),
+            "p50_us": float(p50), "p90_us": float(p90), "p99_us": float(p99)}
+
+
+def compare(before: Run, after: Run, max_slowdown=0.10, max_total=0.25, alpha=0.01, min_polls=20):
+    rows = []
+    for name in sorted(before.futures.keys() & after.futures.keys()):
+        a, b = before.futures[name], after.futures[name]
+        row = {"name": name, "before": summarize(a), "after": summarize(b)}
+        base_p50, base_total = row["before"]["p50_us"], row["before"]["total_us"]
+        row["p50_change"] = row["after"]["p50_us"] / base_p50 - 1 if base_p50 > 0 else 0.0
+        row["total_change"] = row["after"]["total_us"] / base_total - 1 if base_total > 0 else 0.0
+        row["polls_change"] = len(b) / len(a) - 1
+        reasons = []
+        if len(a) >= min_polls and len(b) >= min_polls:
+            row["p_value"], row["p_slower"] = mann_whitney(a, b)
+            if row["p50_change"] > max_slowdown and row["p_value"] < alpha:
+                reasons.append(f"median poll +{row['p50_change']:.0%} (p={row['p_value']:.1e})")
+            if row["total_change"] > max_total:
+                reasons.append(f"total time +{row['total_change']:.0%}")
+        else:
+            row["p_value"], row["p_slower"] = None, None
+        row["regressed"] = reasons
+        # Rank by the extra time the regression costs
+        row["extra_us"] = row["after"]["total_us"] - base_total
+        rows.append(row)
+    rows.sort(key=lambda r: (not r["regressed"], -r["extra_us"]))
+    return {"before": before.path, "after": after.path,
+            "thresholds": {"max_slowdown": max_slowdown, "max_total": max_total,
+                           "alpha": alpha, "min_polls": min_polls},
+            "futures": rows,
+            "only_before": sorted(before.futures.keys() - after.futures.keys()),
+            "only_after": sorted(after.futures.keys() - before.futures.keys())}
+
+
+def report(result, top=30):
+    rows = result["futures"]
+    regressed = [r for r in rows if r["regressed"]]
+    lines = [f"{len(rows)} futures in both traces, {len(regressed)} regressed"]
+    lines.append(f"{'polls':>15} {'total ms':>19} {'p50 us':>17} {'p99 us':>17} {'p':>8}  future")
+    for r in rows[:top]:
+        a, b = r["before"], r["after"]
+        p = f"{r['p_value']:.1e}" if r["p_value"] is not None else "-"
+        mark = "REGRESSED " if r["regressed"] else ""
+        lines.append(f"{a['polls']:>7}>{b['polls']:<7} {a['total_us'] / 1e3:>9.2f}>{b['total_us'] / 1e3:<9.2f} "
+                     f"{a['p50_us']:>8.1f}>{b['p50_us']:<8.1f} {a['p99_us']:>8.1f}>{b['p99_us']:<8.1f} "
+                     f"{p:>8}  {mark}{r['name']}")
+        for reason in r["regressed"]:
+            lines.append(f"{'':>82}  - {reason}")
+    for key, title in (("only_before", "only in before"), ("only_after", "only in after")):
+        if result[key]:
+            lines.append(f"{title}: {', '.join(result[key][:10])}" + (" ..." if len(result[key]) > 10 else ""))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.compare",
+                                     description="Compare per-future poll times of two traces.")
+    parser.add_argument("before", help="baseline traceEvents.json (or .ndjson)")
+    parser.add_argument("after", help="candidate traceEvents.json (or .ndjson)")
+    parser.add_argument("--max-slowdown", type=float, default=0.10, help="allowed median poll slowdown (0.10 = 10%%)")
+    parser.add_argument("--max-total", type=float, default=0.25, help="allowed growth of total poll time")
+    parser.add_argument("--alpha", type=float, default=0.01, help="significance level of the slowdown test")
+    parser.add_argument("--min-polls", type=int, default=20, help="ignore futures with fewer polls in either run")
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--json", help="also write the full report here")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write <trace>.npz")
+    args = parser.parse_args(argv)
+
+    before = Run(args.before, cache=not args.no_cache)
+    after = Run(args.after, cache=not args.no_cache)
+    result = compare(before, after, args.max_slowdown, args.max_total, args.alpha, args.min_polls)
+    for line in report(result, args.top):
+        print(line)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return 1 if any(r["regressed"] for r in result["futures"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Async lock contention for async_flame_gdb.
+
+Lock-acquire futures (Tokio's `batch_semaphore::Acquire`, behind `Mutex`,
+`RwLock` and `Semaphore`) are followed by address: the first poll that
+returns Pending starts a wait, the poll that returns Ready ends it. Each wait
+is charged to the lock and to the future that was awaiting it (the innermost
+traced poll on the thread). A release of a lock that has waiters starts a
+handoff flow, which the next waiter to become Ready finishes. Tokio's
+semaphore queue is FIFO, so flows pair releases and acquisitions in order.
+"""
+import json
+
+from spans import percentile
+
+
+class LockStats:
+    __slots__ = ("acquires", "contended", "cancelled", "waits", "waiters", "releasers")
+
+    def __init__(self):
+        self.acquires = 0
+        self.contended = 0
+        self.cancelled = 0
+        self.waits = []         # wait_ns of every contended acquisition
+        self.waiters = {}       # awaiting future -> [waits, wait_ns]
+        self.releasers = {}     # releasing future -> handoffs
+
+
+class LockTracker:
+    def __init__(self):
+        self.locks = {}         # lock address -> LockStats
+        self.waiting = {}       # acquire future address -> (lock, waiter, first Pending ts)
+        self.handoffs = {}      # lock -> [(flow_id, releaser)], oldest first
+        self._next_id = 0
+
+    def _stats(self, lock):
+        stats = self.locks.get(lock)
+        if stats is None:
+            stats = self.locks[lock] = LockStats()
+        return stats
+
+    def on_acquire_poll(self, acquire, lock, waiter, ts, outcome):
+        """Account one poll of an acquire future. Returns a list of
+        ("wait_begin", None) / ("wait_end", wait_ns) / ("handoff", (flow_id, releaser))
+        for the trace."""
+        events = []
+        pending = self.waiting.get(acquire)
+        if pending is not None and pending[0] != lock:
+            # Address reused by an acquisition of another lock: the old one was dropped unseen
+            self._stats(pending[0]).cancelled += 1
+            del self.waiting[acquire]
+            pending = None
+        if outcome == "Pending":
+            if pending is None:
+                self.waiting[acquire] = (lock, waiter, ts)
+                events.append(("wait_begin", None))
+            return events
+        if outcome != "Ready":
+            return events
+        stats = self._stats(lock)
+        stats.acquires += 1
+        if pending is None:
+            return events
+        del self.waiting[acquire]
+        _, waiter, start = pending
+        wait = max(0, ts - start)
+        stats.contended += 1
+        stats.waits.append(wait)
+        entry = stats.waiters.setdefault(waiter, [0, 0])
+        entry[0] += 1
+        entry[1] += wait
+        events.append(("wait_end", wait))
+        queue = self.handoffs.get(lock)
+        if queue:
+            flow_id, releaser = queue.pop(0)
+            stats.releasers[releaser] = stats.releasers.get(releaser, 0) + 1
+            events.append(("handoff", (flow_id, releaser)))
+        return events
+
+    def _waiters(self, lock):
+        return sum(1 for pending in self.waiting.values() if pending[0] == lock)
+
+    def on_cancel(self, acquire):
+        """An acquire future was dropped; True if it was still waiting."""
+        pending = self.waiting.pop(acquire, None)
+        if pending is None:
+            return False
+        lock = pending[0]
+        self._stats(lock).cancelled += 1
+        # A handoff meant for a waiter that gave up goes to nobody
+        queue = self.handoffs.get(lock)
+        if queue:
+            del queue[self._waiters(lock):]
+        return True
+
+    def on_release(self, lock, releaser):
+        """Returns a flow id if the release will hand the lock to a waiter."""
+        queue = self.handoffs.setdefault(lock, [])
+        if len(queue) >= self._waiters(lock):
+            return None
+        self._next_id += 1
+        flow_id = f"lock{self._next_id}"
+        queue.append((flow_id, releaser))
+        return flow_id
+
+    def rows(self):
+        rows = []
+        for lock, stats in self.locks.items():
+            if not stats.contended and not stats.cancelled:
+                continue
+            waits = sorted(stats.waits)
+            waiters = sorted(stats.waiters.items(), key=lambda kv: kv[1][1], reverse=True)
+            rows.append({
+                "lock": f"0x{lock:x}",
+                "acquires": stats.acquires,
+                "contended": stats.contended,
+                "cancelled": stats.cancelled,
+                "wait_us_total": sum(waits) / 1e3,
+                "wait_us_p50": percentile(waits, 50) / 1e3,
+                "wait_us_p99": percentile(waits, 99) / 1e3,
+                "wait_us_max": waits[-1] / 1e3 if waits else 0,
+                "waiters": [{"future": name, "waits": n, "wait_us": ns / 1e3} for name, (n, ns) in waiters],
+                "releasers": dict(sorted(stats.releasers.items(), key=lambda kv: kv[1], reverse=True)),
+            })
+        rows.sort(key=lambda r: r["wait_us_total"], reverse=True)
+        return rows
+
+    def report(self, top=20):
+        rows = self.rows()
+        lines = [f"{len(rows)} contended locks, {len(self.waiting)} acquisitions still waiting",
+                 f"{'lock':>16} {'acq':>7} {'waits':>7} {'total ms':>9} {'p50 us':>9} {'p99 us':>9} "
+                 f"{'max us':>9}  top waiter / releaser"]
+        for r in rows[:top]:
+            waiter = r["waiters"][0]["future"] if r["waiters"] else "-"
+            releaser = next(iter(r["releasers"]), "-")
+            lines.append(f"{r['lock']:>16} {r['acquires']:>7} {r['contended']:>7} {r['wait_us_total'] / 1e3:>9.2f} "
+                         f"{r['wait_us_p50']:>9.1f} {r['wait_us_p99']:>9.1f} {r['wait_us_max']:>9.1f}  "
+                         f"{waiter} / {releaser}")
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as fp:
+            json.dump({"locks": self.rows(), "still_waiting": len(self.waiting)}, fp, indent=2)
@@ -0,0 +1,205 @@
+import argparse
+import hashlib
+import json
+import os
+import pathlib
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Headless async-flame runs for many binaries at once:
+#
+#   python -m gdb_profiler.orchestrate                 # every project under tests/
+#   python -m gdb_profiler.orchestrate -j 16 --timeout 300 svc-a/target/release/svc-a ...
+#
+# Each target is analyzed (future map + struct layouts, one objdump per binary)
+# in a process pool, then traced in its own `gdb -batch` process. Analysis
+# results are cached under results/cache/<binary hash>/, so rebuilt-but-
+# identical binaries and repeated nightly runs skip the DWARF parse.
+# Per target, results/<name>.traceEvents.json (+ .instances/.wakes) and
+# results/<name>.gdb.log are written; results/orchestrate_summary.json lists
+# every run.
+
+WORKSPACE_ROOT = pathlib.Path(__file__).resolve().parent.parent
+RESULTS = WORKSPACE_ROOT / "results"
+CACHE = RESULTS / "cache"
+GDB_SCRIPT = WORKSPACE_ROOT / "gdb_profiler" / "async_flame_gdb.py"
+# After a timeout the inferior is interrupted so GDB can still dump the trace;
+# it is killed if that takes longer than this
+DUMP_GRACE_S = 30
+# Part of the cache key: bump it when the future map or layout format changes
+ANALYSIS_VERSION = "2"
+
+
+class Target:
+    def __init__(self, name, binary, project=None):
+        self.name = name
+        self.binary = pathlib.Path(binary) if binary else None
+        self.project = project
+        self.status = "pending"
+        self.detail = ""
+        self.analysis_s = 0.0
+        self.trace_s = 0.0
+        self.events = None
+
+    def summary(self):
+        return {"name": self.name, "binary": str(self.binary), "status": self.status, "detail": self.detail,
+                "analysis_s": round(self.analysis_s, 2), "trace_s": round(self.trace_s, 2), "events": self.events}
+
+
+def cargo_package(project: pathlib.Path):
+    text = (project / "Cargo.toml").read_text()
+    m = re.search(r'^\[package\][^\[]*?^name\s*=\s*"([^"]+)"', text, re.M | re.S)
+    return m.group(1) if m else project.name
+
+
+def resolve_targets(paths, profile):
+    """Binaries as given; Cargo projects become their target/<profile>/<package>."""
+    targets = []
+    for path in paths:
+        path = pathlib.Path(path)
+        if (path / "Cargo.toml").exists():
+            package = cargo_package(path)
+            targets.append(Target(package, path / "target" / profile / package, project=path))
+        else:
+            targets.append(Target(path.name, path))
+    # Same basename twice (debug and release, several services): keep names unique
+    seen = {}
+    for t in targets:
+        seen[t.name] = seen.get(t.name, 0) + 1
+        if seen[t.name] > 1:
+            t.name = f"{t.name}.{seen[t.name]}"
+    return targets
+
+
+def binary_key(binary: pathlib.Path) -> str:
+    digest = hashlib.sha1(ANALYSIS_VERSION.encode())
+    with open(binary, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def analyze(binary: str, out_dir: str):
+    """Worker process: one DWARF parse, exported as future map and layouts."""
+    sys.path.insert(0, str(WORKSPACE_ROOT))
+    from dwarf_analyzer.main import DwarfAnalyzer
+    from dwarf_analyzer import export_map, layouts
+    analyzer = DwarfAnalyzer(binary)
+    analyzer.parse_dwarf()
+    tmp = pathlib.Path(f"{out_dir}.tmp{os.getpid()}")
+    tmp.mkdir(parents=True, exist_ok=True)
+    try:
+        export_map.export(binary, str(tmp / "future_map.json"), analyzer)
+        layouts.export(binary, str(tmp / "type_layouts.json"), analyzer)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    try:
+        tmp.rename(out_dir)   # atomic publish; another run may have won the race
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def trace(target: Target, cache_dir: pathlib.Path, timeout, program_args):
+    """One `gdb -batch` run: start the program, dump the trace when it exits or times out."""
+    out_name = f"{target.name}.traceEvents.json"
+    cmd = ["gdb", "-q", "-nx", "-batch",
+           "-ex", "set pagination off", "-ex", "set confirm off",
+           "-x", str(GDB_SCRIPT), "-ex", "run", "-ex", f"dump_async_flame {out_name}",
+           "--args", str(target.binary), *program_args]
+    env = dict(os.environ,
+               ASYNC_FLAME_MAP=str(cache_dir / "future_map.json"),
+               ASYNC_FLAME_LAYOUTS=str(cache_dir / "type_layouts.json"))
+    log_path = RESULTS / f"{target.name}.gdb.log"
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                env=env, cwd=target.project or WORKSPACE_ROOT, start_new_session=True)
+        try:
+            proc.wait(timeout=timeout)
+            target.status = "ok" if proc.returncode == 0 else "failed"
+        except subprocess.TimeoutExpired:
+            target.status = "timeout"
+            os.killpg(proc.pid, signal.SIGINT)
+            try:
+                proc.wait(timeout=DUMP_GRACE_S)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+                proc.wait()
+    target.trace_s = time.perf_counter() - start
+    out_path = RESULTS / out_name
+    if out_path.exists():
+        with open(out_path) as f:
+            target.events = len(json.load(f).get("traceEvents", []))
+    elif target.status == "ok":
+        target.status = "failed"
+    if target.status != "ok":
+        target.detail = f"gdb exit {proc.returncode}, see {log_path.relative_to(WORKSPACE_ROOT)}"
+
+
+def run_target(target: Target, analyzers: ProcessPoolExecutor, locks, args):
+    if target.project is not None and args.build:
+        build = ["cargo", "build", "-q"] + (["--release"] if args.profile == "release" else [])
+        result = subprocess.run(build, cwd=target.project, capture_output=True, text=True)
+        if result.returncode != 0:
+            target.status, target.detail = "build-failed", (result.stderr.strip().splitlines() or [""])[-1]
+            return target
+    if not target.binary.exists():
+        target.status, target.detail = "missing", f"{target.binary} not found (build it or pass --build)"
+        return target
+
+    start = time.perf_counter()
+    cache_dir = CACHE / binary_key(target.binary)
+    with locks.setdefault(cache_dir.name, threading.Lock()):
+        if not cache_dir.exists():
+            analyzers.submit(analyze, str(target.binary), str(cache_dir)).result()
+    target.analysis_s = time.perf_counter() - start
+    trace(target, cache_dir, args.timeout, args.program_args)
+    return target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m gdb_profiler.orchestrate",
+                                     description="Trace many binaries concurrently, one gdb -batch each.")
+    parser.add_argument("targets", nargs="*",
+                        help="binaries or Cargo project directories (default: every project under tests/)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="concurrent runs (default: number of cores)")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds per traced run (default 600)")
+    parser.add_argument("--profile", default="debug", help="Cargo profile directory for project targets")
+    parser.add_argument("--build", action="store_true", help="cargo build project targets first")
+    parser.add_argument("--args", dest="program_args", default="", help="arguments passed to every program")
+    args = parser.parse_args(argv)
+    args.program_args = args.program_args.split()
+
+    paths = args.targets or sorted(p.parent for p in (WORKSPACE_ROOT / "tests").glob("*/Cargo.toml"))
+    targets = resolve_targets(paths, args.profile)
+    RESULTS.mkdir(parents=True, exist_ok=True)
+    locks = {}
+    with ProcessPoolExecutor(max_workers=args.jobs) as analyzers, \
+            ThreadPoolExecutor(max_workers=args.jobs) as runners:
+        futures = [runners.submit(run_target, t, analyzers, locks, args) for t in targets]
+        for future in futures:
+            try:
+                t = future.result()
+            except Exception as e:
+                t = targets[futures.index(future)]
+                t.status, t.detail = "error", str(e)
+            print(f"[orchestrate] {t.name:<32} {t.status:<12} analysis {t.analysis_s:6.1f}s "
+                  f"trace {t.trace_s:7.1f}s events {t.events if t.events is not None else '-'} {t.detail}")
+
+    summary_path = RESULTS / "orchestrate_summary.json"
+    with open(summary_path, "w") as f:
+        json.dump([t.summary() for t in targets], f, indent=2)
+    print(f"[orchestrate] {sum(t.status == 'ok' for t in targets)}/{len(targets)} ok, summary in {summary_path}")
+    return 0 if all(t.status == "ok" for t in targets) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
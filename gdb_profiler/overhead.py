@@ -0,0 +1,86 @@
+"""Host-side overhead accounting for the async_flame_gdb breakpoints.
+
+Every breakpoint handler reports how long it spent in Python (plus any GDB
+calls it made); PollFinishBP cost is charged to the PollBP that created it,
+so one site covers the entry and exit cost of a future's poll.
+"""
+
+
+class SiteStats:
+    __slots__ = ("kind", "name", "hits", "ns", "finish_hits", "finish_ns", "disarmed")
+
+    def __init__(self, kind, name):
+        self.kind = kind          # "poll", "plugin" or "alloc"
+        self.name = name          # display name (future name, plugin or allocator symbol)
+        self.hits = 0
+        self.ns = 0
+        self.finish_hits = 0
+        self.finish_ns = 0
+        self.disarmed = False     # switched off by the budget
+
+    @property
+    def total_ns(self):
+        return self.ns + self.finish_ns
+
+
+class OverheadTracker:
+    """Per-breakpoint hit counts and handler time, with an optional budget.
+
+    With `budget_ns` > 0, `record` returns True exactly once for a site whose
+    cumulative handler time crosses the budget; the caller disarms it.
+    """
+
+    def __init__(self):
+        self.sites = {}
+        self.budget_ns = 0
+
+    def _site(self, key, kind, name):
+        site = self.sites.get(key)
+        if site is None:
+            site = self.sites[key] = SiteStats(kind, name)
+        return site
+
+    def record(self, key, kind, name, ns, finish=False):
+        site = self._site(key, kind, name)
+        if finish:
+            site.finish_hits += 1
+            site.finish_ns += ns
+        else:
+            site.hits += 1
+            site.ns += ns
+        if self.budget_ns and not site.disarmed and site.total_ns > self.budget_ns:
+            site.disarmed = True
+            return True
+        return False
+
+    def reset(self):
+        self.sites.clear()
+
+    def total_ns(self):
+        return sum(s.total_ns for s in self.sites.values())
+
+    def report(self, top=20):
+        sites = sorted(self.sites.items(), key=lambda kv: kv[1].total_ns, reverse=True)
+        total = self.total_ns() or 1
+        lines = [f"total handler time {self.total_ns() / 1e6:.1f} ms over {len(sites)} breakpoints"]
+        if self.budget_ns:
+            lines.append(f"budget {self.budget_ns / 1e6:g} ms per breakpoint, "
+                         f"{sum(s.disarmed for _, s in sites)} disarmed")
+        lines.append("per breakpoint:")
+        lines.append(f"  {'kind':<6} {'hits':>9} {'total ms':>10} {'us/hit':>8} {'share':>6}  name")
+        for key, s in sites[:top]:
+            hits = s.hits or 1
+            flag = "  [disarmed]" if s.disarmed else ""
+            lines.append(f"  {s.kind:<6} {s.hits:>9} {s.total_ns / 1e6:>10.2f} {s.total_ns / hits / 1e3:>8.1f} "
+                         f"{s.total_ns * 100 / total:>5.1f}%  {s.name}{flag}")
+        by_future = {}
+        for s in self.sites.values():
+            if s.kind != "poll":
+                continue
+            hits, ns = by_future.get(s.name, (0, 0))
+            by_future[s.name] = (hits + s.hits, ns + s.total_ns)
+        if by_future:
+            lines.append("per future:")
+            for name, (hits, ns) in sorted(by_future.items(), key=lambda kv: kv[1][1], reverse=True)[:top]:
+                lines.append(f"  {hits:>9} polls {ns / 1e6:>10.2f} ms  {name}")
+        return lines
@@ -0,0 +1,238 @@
+import socket
+
+# Minimal client for the GDB Remote Serial Protocol, enough to trace with
+# gdbserver or QEMU's gdbstub without a GDB process in between:
+# breakpoints (Z0/z0), register and memory reads (p/g, m or x), qXfer
+# objects and vCont. Once QStartNoAckMode is accepted, requests can be
+# pipelined: `pipeline()` writes a batch of packets and then reads the
+# replies in order, so a breakpoint hit needing a register, a stack word
+# and a new breakpoint costs one round-trip instead of three.
+
+
+class RspError(Exception):
+    """Error reply (Exx) or broken connection."""
+
+
+def checksum(data: bytes) -> int:
+    return sum(data) & 0xFF
+
+
+def decode(data: bytes) -> bytes:
+    """Undo run-length encoding (`c*n`) and binary escapes (`}x`) of a reply."""
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        c = data[i]
+        if c == 0x7D:       # '}': next byte ^ 0x20
+            out.append(data[i + 1] ^ 0x20)
+            i += 2
+        elif c == 0x2A:     # '*': repeat the previous byte (n - 29) times
+            out.extend(out[-1:] * (data[i + 1] - 29))
+            i += 2
+        else:
+            out.append(c)
+            i += 1
+    return bytes(out)
+
+
+def thread_id(text: str):
+    """'p<pid>.<tid>' or '<tid>' (hex) -> (pid or None, tid)."""
+    if text.startswith("p"):
+        pid, _, tid = text[1:].partition(".")
+        return int(pid, 16), int(tid or "-1", 16)
+    return None, int(text, 16)
+
+
+class Stop:
+    """A parsed stop reply: T/S (signal), W/X (exit)."""
+    __slots__ = ("kind", "signal", "pid", "tid", "registers", "raw")
+
+    def __init__(self, reply: bytes):
+        self.raw = reply
+        self.kind = chr(reply[0])
+        self.registers = {}   # expedited registers: number -> little-endian hex
+        self.pid = self.tid = None
+        self.signal = int(reply[1:3], 16) if len(reply) >= 3 else 0
+        if self.kind == "T":
+            for item in reply[3:].decode(errors="replace").split(";"):
+                key, _, value = item.partition(":")
+                if key == "thread":
+                    self.pid, self.tid = thread_id(value)
+                elif key and all(c in "0123456789abcdef" for c in key):
+                    self.registers[int(key, 16)] = value
+        elif self.kind in "WX":
+            # W<code>[;process:<pid>]
+            self.signal = int(reply[1:].split(b";")[0], 16)
+
+    @property
+    def exited(self):
+        return self.kind in "WX"
+
+    def register(self, number: int):
+        value = self.registers.get(number)
+        return None if value is None or "x" in value else int.from_bytes(bytes.fromhex(value), "little")
+
+
+class RspClient:
+    def __init__(self, host: str, port: int, timeout: float = 10.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.timeout = timeout
+        self._buf = bytearray()
+        self.ack = True
+        self.features = {}
+        self.packets = 0   # packets sent
+        self.round_trips = 0
+
+    # --- framing ---
+
+    def _fill(self):
+        data = self.sock.recv(65536)
+        if not data:
+            raise RspError("connection closed by the stub")
+        self._buf += data
+
+    def send(self, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.sock.sendall(b"$%s#%02x" % (payload, checksum(payload)))
+        self.packets += 1
+
+    def send_many(self, payloads):
+        frames = []
+        for payload in payloads:
+            if isinstance(payload, str):
+                payload = payload.encode()
+            frames.append(b"$%s#%02x" % (payload, checksum(payload)))
+        self.sock.sendall(b"".join(frames))
+        self.packets += len(frames)
+
+    def recv(self, wait: bool = False) -> bytes:
+        """Next packet's payload (acks and notifications skipped); `wait` disables the timeout."""
+        self.sock.settimeout(None if wait else self.timeout)
+        while True:
+            while self._buf[:1] in (b"+", b"-"):
+                del self._buf[:1]
+            if not self._buf:
+                self._fill()
+                continue
+            start = self._buf.find(b"$")
+            notification = self._buf.find(b"%")
+            if notification != -1 and (start == -1 or notification < start):
+                end = self._buf.find(b"#", notification)
+                if end == -1 or len(self._buf) < end + 3:
+                    self._fill()
+                    continue
+                del self._buf[:end + 3]     # async notifications are not used
+                continue
+            if start == -1:
+                self._buf.clear()
+                self._fill()
+                continue
+            end = self._buf.find(b"#", start)
+            if end == -1 or len(self._buf) < end + 3:
+                self._fill()
+                continue
+            payload = bytes(self._buf[start + 1:end])
+            del self._buf[:end + 3]
+            if self.ack:
+                self.sock.sendall(b"+")
+            return decode(payload)
+
+    def request(self, payload) -> bytes:
+        self.send(payload)
+        self.round_trips += 1
+        return self.recv()
+
+    def pipeline(self, payloads) -> list:
+        """Send every packet, then read one reply per packet (no-ack mode only)."""
+        if self.ack:
+            return [self.request(p) for p in payloads]
+        self.send_many(payloads)
+        self.round_trips += 1
+        return [self.recv() for _ in payloads]
+
+    @staticmethod
+    def check(reply: bytes) -> bytes:
+        if reply[:1] == b"E" and len(reply) == 3:
+            raise RspError(f"stub error {reply.decode()}")
+        return reply
+
+    # --- session ---
+
+    def handshake(self):
+        self.sock.sendall(b"+")
+        reply = self.request("qSupported:multiprocess+;swbreak+;vContSupported+;binary-upload+")
+        for item in reply.decode().split(";"):
+            if "=" in item:
+                key, value = item.split("=", 1)
+                self.features[key] = value
+            elif item:
+                self.features[item[:-1]] = item[-1] == "+"
+        if self.features.get("QStartNoAckMode") and self.request("QStartNoAckMode") == b"OK":
+            self.ack = False
+        return self.features
+
+    def halt_reason(self) -> Stop:
+        return Stop(self.check(self.request("?")))
+
+    def xfer(self, obj: str, annex: str = "") -> bytes:
+        data = bytearray()
+        size = int(self.features.get("PacketSize", "1000"), 16) - 16
+        while True:
+            reply = self.check(self.request(f"qXfer:{obj}:read:{annex}:{len(data):x},{size:x}"))
+            data += reply[1:]
+            if reply[:1] == b"l":
+                return bytes(data)
+
+    # --- inferior state ---
+
+    def memory_packet(self, address: int, length: int) -> str:
+        return f"{'x' if self.features.get('binary-upload') else 'm'}{address:x},{length:x}"
+
+    def parse_memory(self, reply: bytes) -> bytes:
+        self.check(reply)
+        if self.features.get("binary-upload"):
+            return reply[1:] if reply[:1] == b"b" else b""
+        return bytes.fromhex(reply.decode())
+
+    def read_memory(self, address: int, length: int) -> bytes:
+        return self.parse_memory(self.request(self.memory_packet(address, length)))
+
+    @staticmethod
+    def register_packet(number: int) -> str:
+        return f"p{number:x}"
+
+    @staticmethod
+    def parse_register(reply: bytes):
+        if reply[:1] == b"E" or b"x" in reply:
+            return None
+        return int.from_bytes(bytes.fromhex(reply.decode()), "little")
+
+    @staticmethod
+    def breakpoint_packet(address: int, insert: bool = True, kind: int = 1) -> str:
+        return f"{'Z' if insert else 'z'}0,{address:x},{kind:x}"
+
+    def set_thread(self, pid, tid) -> bytes:
+        return self.request(f"Hg{self.thread_text(pid, tid)}")
+
+    def thread_text(self, pid, tid) -> str:
+        return f"p{pid:x}.{tid:x}" if pid is not None and self.features.get("multiprocess") else f"{tid:x}"
+
+    def resume_packet(self, stop: Stop = None, signal: int = 0) -> str:
+        """vCont that continues every thread, passing `signal` to the stopped one."""
+        if signal and stop is not None and stop.tid is not None:
+            return f"vCont;C{signal:02x}:{self.thread_text(stop.pid, stop.tid)};c"
+        return "vCont;c"
+
+    def wait_stop(self) -> Stop:
+        return Stop(self.recv(wait=True))
+
+    def interrupt(self):
+        self.sock.sendall(b"\x03")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
@@ -0,0 +1,286 @@
+import json
+import os
+import pathlib
+import struct
+import sys
+import time
+
+from gdb_profiler.rsp import RspClient, RspError
+from gdb_profiler.spans import InstanceTracker
+
+# async_flame_gdb's poll tracing without GDB: talks RSP to a gdbserver (or
+# QEMU gdbstub) directly and writes the same future_poll / future_instance
+# trace events.
+#
+#   gdbserver --once :1234 tests/tokio_test_project/target/debug/tokio_test_project
+#   python -m gdb_profiler.rsp_trace localhost:1234 \
+#       tests/tokio_test_project/target/debug/tokio_test_project [results/traceEvents.rsp.json]
+#
+# Poll entries are Z0 breakpoints at `poll_addr` from the future map plus the
+# load bias (AT_ENTRY from the auxv minus the ELF entry point). The return
+# address is read at entry and gets a Z0 of its own while any poll is due to
+# return there; a return is matched to its entry by thread and stack pointer.
+# A hit needs one pipelined round-trip (select thread, read arg0, read the
+# return address, arm it) plus the resume; expedited registers in the stop
+# reply provide pc and sp for free.
+#
+# The outcome of a poll is read from the future rather than from the return
+# registers, whose layout depends on Poll<Output>: an async fn or block that
+# returned Ready is left in its Returned state (1), one that returned Pending
+# in a SuspendN state (3..). The map's `discr_offset` says where that state
+# lives; other futures' outcomes are recorded as unknown.
+
+WORKSPACE_ROOT = pathlib.Path(__file__).resolve().parent.parent
+MAP_FILE = pathlib.Path(os.getenv("ASYNC_FLAME_MAP", WORKSPACE_ROOT / "results" / "future_map.json"))
+AT_ENTRY = 9
+SIGTRAP = 5
+# rustc coroutine states: 0 Unresumed, 1 Returned, 2 Panicked, 3.. SuspendN
+COROUTINE_RETURNED = 1
+COROUTINE_SUSPEND0 = 3
+
+# Register numbers in gdbserver's target descriptions. `ret_reg` holds the
+# return address at entry (None: it is the word at sp); `pushed` is how far
+# the call moved sp, so sp after the return is entry sp + pushed.
+ARCHES = {
+    62: {"name": "x86-64", "pc": 16, "sp": 7, "arg0": 5, "ret_reg": None, "pushed": 8},
+    183: {"name": "aarch64", "pc": 32, "sp": 31, "arg0": 0, "ret_reg": 30, "pushed": 0},
+}
+
+
+def elf_info(binary):
+    with open(binary, "rb") as f:
+        header = f.read(64)
+    machine, = struct.unpack_from("<H", header, 0x12)
+    entry, = struct.unpack_from("<Q", header, 0x18)
+    return machine, entry
+
+
+class PollSite:
+    __slots__ = ("name", "discr_offset")
+
+    def __init__(self, name, discr_offset):
+        self.name = name
+        self.discr_offset = discr_offset  # offset of the coroutine state in `self`, None if not an async fn
+
+
+def coroutine_outcome(state):
+    """'Ready' / 'Pending' / None from a coroutine's state byte after a poll."""
+    if state == COROUTINE_RETURNED:
+        return "Ready"
+    if state is not None and state >= COROUTINE_SUSPEND0:
+        return "Pending"
+    return None
+
+
+def load_poll_sites(map_file, binary):
+    """link address -> PollSite, for the polls of `binary` in the future map."""
+    with open(map_file) as f:
+        future_map = json.load(f)
+    objfile = os.path.basename(binary)
+    sites = {}
+    for meta in future_map.values():
+        addr = meta.get("poll_addr")
+        if addr and meta.get("poll_symbol") and meta.get("objfile", objfile) == objfile:
+            sites[int(addr, 16)] = PollSite(meta.get("name", meta["poll_symbol"]), meta.get("discr_offset"))
+    return sites
+
+
+class Frame:
+    __slots__ = ("name", "ret", "exit_sp", "entry_ts", "addr", "state_addr")
+
+    def __init__(self, name, ret, exit_sp, entry_ts, addr, state_addr):
+        self.name = name
+        self.ret = ret
+        self.exit_sp = exit_sp
+        self.entry_ts = entry_ts
+        self.addr = addr
+        self.state_addr = state_addr    # coroutine state byte, None: outcome unknown
+
+
+class RspTracer:
+    def __init__(self, client: RspClient, arch: dict, polls: dict):
+        self.client = client
+        self.arch = arch
+        self.polls = polls          # runtime address -> PollSite
+        self.returns = {}           # armed return address -> polls due to return there
+        self.stacks = {}            # tid -> [Frame], innermost last
+        self.trace_events = []
+        self.instances = InstanceTracker()
+        self.hits = 0
+        self.handler_ns = 0
+
+    def emit(self, ph, ts_ns, tid, name, args=None, cat="future_poll", id=None):
+        ev = {"ph": ph, "ts": ts_ns / 1000, "pid": 1, "tid": str(tid), "name": name, "cat": cat}
+        if args:
+            ev["args"] = args
+        if id is not None:
+            ev["id"] = id
+        self.trace_events.append(ev)
+
+    def arm(self):
+        replies = self.client.pipeline([self.client.breakpoint_packet(a) for a in self.polls])
+        failed = sum(1 for r in replies if r != b"OK")
+        print(f"[rsp-trace] {len(self.polls) - failed} poll breakpoints armed"
+              + (f", {failed} rejected" if failed else ""))
+
+    def end_poll(self, frame, tid, ts, outcome):
+        self.emit("E", ts, tid, frame.name, cat="future_poll" if outcome != "unwound" else "future_poll_unwind")
+        if frame.addr is None:
+            return
+        inst_id = f"0x{frame.addr:x}"
+        self.emit("e", ts, tid, "poll", args={"outcome": outcome or "unknown"}, cat="future_instance", id=inst_id)
+        done = self.instances.poll_end(frame.addr, frame.name, frame.entry_ts, ts, outcome)
+        if done is not None:
+            self.emit("e", ts, tid, frame.name, cat="future_instance", id=inst_id, args={
+                "polls": done.polls, "busy_us": done.busy_ns / 1000, "wall_us": (ts - done.first_ts) / 1000})
+
+    def release(self, ret, packets):
+        self.returns[ret] -= 1
+        if not self.returns[ret]:
+            del self.returns[ret]
+            packets.append(self.client.breakpoint_packet(ret, insert=False))
+
+    def unwind(self, tid, sp, ts, packets, inclusive=True):
+        """Frames of `tid` the stack has already left: returned through a panic or longjmp."""
+        stack = self.stacks.get(tid)
+        while stack and (stack[-1].exit_sp <= sp if inclusive else stack[-1].exit_sp < sp):
+            frame = stack.pop()
+            self.end_poll(frame, tid, ts, "unwound")
+            self.release(frame.ret, packets)
+
+    def on_poll(self, stop, pc, sp, ts):
+        client, arch = self.client, self.arch
+        packets = [f"Hg{client.thread_text(stop.pid, stop.tid)}", client.register_packet(arch["arg0"])]
+        packets.append(client.register_packet(arch["ret_reg"]) if arch["ret_reg"] is not None
+                       else client.memory_packet(sp, 8))
+        replies = client.pipeline(packets)
+        addr = client.parse_register(replies[1])
+        if arch["ret_reg"] is not None:
+            ret = client.parse_register(replies[2])
+        else:
+            raw = client.parse_memory(replies[2])
+            ret = int.from_bytes(raw, "little") if len(raw) == 8 else None
+        extra = []
+        self.unwind(stop.tid, sp + arch["pushed"], ts, extra)
+        site = self.polls[pc]
+        name = site.name
+        self.emit("B", ts, stop.tid, name)
+        if addr is not None:
+            inst_id = f"0x{addr:x}"
+            if self.instances.poll_start(addr, name, ts):
+                self.emit("b", ts, stop.tid, name, cat="future_instance", id=inst_id)
+            self.emit("b", ts, stop.tid, "poll", cat="future_instance", id=inst_id)
+        if ret is not None:
+            state_addr = addr + site.discr_offset if addr is not None and site.discr_offset is not None else None
+            self.stacks.setdefault(stop.tid, []).append(Frame(name, ret, sp + arch["pushed"], ts, addr, state_addr))
+            if ret not in self.returns:
+                self.returns[ret] = 0
+                extra.append(client.breakpoint_packet(ret))
+            self.returns[ret] += 1
+        return extra
+
+    def on_return(self, stop, pc, sp, ts):
+        extra = []
+        self.unwind(stop.tid, sp, ts, extra, inclusive=False)
+        stack = self.stacks.get(stop.tid)
+        if not stack or stack[-1].ret != pc or stack[-1].exit_sp != sp:
+            return extra    # another call returning to the same address
+        frame = stack.pop()
+        outcome = None
+        if frame.state_addr is not None:
+            # Little-endian targets only: the low byte is the state whatever the discriminant width
+            try:
+                raw = self.client.read_memory(frame.state_addr, 1)
+            except RspError:
+                raw = b""
+            outcome = coroutine_outcome(raw[0] if raw else None)
+        self.end_poll(frame, stop.tid, ts, outcome)
+        self.release(frame.ret, extra)
+        return extra
+
+    def run(self):
+        client = self.client
+        stop = None
+        packets = ["vCont;c"]
+        try:
+            while True:
+                # Deferred breakpoint changes go out with the resume
+                replies = client.pipeline(packets[:-1]) if len(packets) > 1 else []
+                if any(r[:1] == b"E" for r in replies):
+                    print(f"[rsp-trace] breakpoint update failed: {replies}")
+                client.send(packets[-1])
+                stop = client.wait_stop()
+                ts = time.perf_counter_ns()
+                if stop.exited:
+                    print(f"[rsp-trace] Program exited ({'code' if stop.kind == 'W' else 'signal'} {stop.signal})")
+                    return
+                pc, sp = stop.register(self.arch["pc"]), stop.register(self.arch["sp"])
+                packets = []
+                if stop.signal == SIGTRAP and pc in self.polls:
+                    packets = self.on_poll(stop, pc, sp, ts)
+                elif stop.signal == SIGTRAP and pc in self.returns:
+                    packets = self.on_return(stop, pc, sp, ts)
+                else:
+                    packets.append(client.resume_packet(stop, 0 if stop.signal == SIGTRAP else stop.signal))
+                    continue
+                self.hits += 1
+                self.handler_ns += time.perf_counter_ns() - ts
+                packets.append(client.resume_packet())
+        except KeyboardInterrupt:
+            print("[rsp-trace] Interrupted, stopping the program")
+            client.interrupt()
+            client.wait_stop()
+
+    def dump(self, path):
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as fp:
+            json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "us"}, fp)
+        print(f"[rsp-trace] {path} written (events={len(self.trace_events)})")
+        instances_path = path.with_suffix(".instances.json")
+        self.instances.dump(instances_path)
+        if self.hits:
+            print(f"[rsp-trace] {self.hits} breakpoint hits, {self.handler_ns / self.hits / 1000:.1f} us "
+                  f"handler time per hit, {self.client.round_trips} round-trips / {self.client.packets} packets")
+
+
+def main(argv):
+    if len(argv) < 3:
+        print("Usage: python -m gdb_profiler.rsp_trace <host:port> <binary> [out.json]")
+        return 1
+    host, _, port = argv[1].rpartition(":")
+    binary = argv[2]
+    out = argv[3] if len(argv) > 3 else WORKSPACE_ROOT / "results" / "traceEvents.rsp.json"
+    machine, link_entry = elf_info(binary)
+    arch = ARCHES.get(machine)
+    if arch is None:
+        print(f"[rsp-trace] Unsupported ELF machine {machine}")
+        return 1
+    if not MAP_FILE.exists():
+        print(f"[rsp-trace] future_map.json not found at {MAP_FILE}; run dwarf_analyzer.export_map first.")
+        return 1
+    sites = load_poll_sites(MAP_FILE, binary)
+
+    client = RspClient(host or "localhost", int(port))
+    try:
+        client.handshake()
+        client.halt_reason()
+        auxv = client.xfer("auxv")
+        pairs = dict(struct.iter_unpack("<QQ", auxv[:len(auxv) // 16 * 16]))
+        bias = pairs.get(AT_ENTRY, link_entry) - link_entry
+        print(f"[rsp-trace] {arch['name']}, load bias 0x{bias:x}, "
+              f"{'no-ack pipelining' if not client.ack else 'ack mode'}")
+        tracer = RspTracer(client, arch, {addr + bias: site for addr, site in sites.items()})
+        tracer.arm()
+        tracer.run()
+        tracer.dump(out)
+    except RspError as e:
+        print(f"[rsp-trace] {e}")
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,11 @@
+from .async_task import AsyncTaskPlugin
+
+class AsyncStdPlugin(AsyncTaskPlugin):
+    name = "async-std"
+    crates = ("async_std",)
+    # async-std runs on async-global-executor / async-executor, so it must win over smol
+    priority = 20
+    spawn_breakpoints = (
+        "async_std::task::builder::Builder::spawn",
+        "async_std::task::builder::Builder::local",
+    )
@@ -0,0 +1,115 @@
+from .base import RuntimePlugin
+
+# async-task is the task layer under both async-std (via async-global-executor)
+# and smol (async-executor); its raw vtable functions all take the task
+# pointer as their first argument.
+RAW_SCHEDULE = "async_task::raw::RawTask::schedule"
+RAW_RUN = "async_task::raw::RawTask::run"
+RAW_WAKE = "async_task::raw::RawTask::wake"
+RAW_WAKE_BY_REF = "async_task::raw::RawTask::wake_by_ref"
+
+# async-executor's global queue is a ConcurrentQueue::unbounded() of Runnables.
+# The instantiation is spelled out so channel queues are not instrumented too.
+QUEUE_PUSH = (
+    "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable<()>>::push",
+    "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable>::push",
+)
+QUEUE_POP = (
+    "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable<()>>::pop",
+    "concurrent_queue::unbounded::Unbounded<async_task::runnable::Runnable>::pop",
+)
+
+# concurrent_queue::unbounded index encoding
+SHIFT = 1
+LAP = 32
+
+
+def unbounded_len(head, tail):
+    """Port of concurrent_queue::unbounded::Unbounded::len()."""
+    tail &= ~((1 << SHIFT) - 1)
+    head &= ~((1 << SHIFT) - 1)
+    if (tail >> SHIFT) & (LAP - 1) == LAP - 1:
+        tail += 1 << SHIFT
+    if (head >> SHIFT) & (LAP - 1) == LAP - 1:
+        head += 1 << SHIFT
+    lap = (head >> SHIFT) // LAP
+    tail -= (lap * LAP) << SHIFT
+    head -= (lap * LAP) << SHIFT
+    tail >>= SHIFT
+    head >>= SHIFT
+    return tail - head - tail // LAP
+
+
+class AsyncTaskPlugin(RuntimePlugin):
+    """Shared instrumentation for executors built on async-task + async-executor.
+
+    Not picked by itself (no `crates`); AsyncStdPlugin and SmolPlugin add the
+    executor-specific spawn entry points.
+    """
+    name = "async-task"
+    arg_count = 1
+    spawn_breakpoints = ()
+
+    def __init__(self):
+        self.offsets = None
+        self.scheduled = 0
+        self.ran = 0
+
+    def attach(self, layouts):
+        if layouts is None:
+            print(f"[async-flame] {self.name}: no struct layouts, queue length counters disabled")
+            return
+        offsets = {
+            "head": layouts.offset(r"Unbounded<.*Runnable.*>", "head", ("tail",)),
+            "tail": layouts.offset(r"Unbounded<.*Runnable.*>", "tail", ("head",)),
+            "padded_value": layouts.offset(r"CachePadded<.*Position<.*Runnable.*>>", "value"),
+            "index": layouts.offset(r"Position<.*Runnable.*>", "index", ("block",)),
+        }
+        if offsets["padded_value"] is None:
+            offsets["padded_value"] = 0
+        missing = [k for k, v in offsets.items() if v is None]
+        if missing:
+            print(f"[async-flame] {self.name}: layouts lack {', '.join(missing)}; queue length counters disabled")
+            return
+        self.offsets = offsets
+
+    def extra_breakpoints(self):
+        return [RAW_SCHEDULE, RAW_RUN, RAW_WAKE, RAW_WAKE_BY_REF,
+                *self.spawn_breakpoints, *QUEUE_PUSH, *QUEUE_POP]
+
+    def on_breakpoint(self, bp_name: str, inferior):
+        return {f"{self.name}_evt": bp_name}
+
+    def wake_breakpoints(self):
+        return [RAW_WAKE, RAW_WAKE_BY_REF, RAW_SCHEDULE]
+
+    def task_poll_breakpoints(self):
+        return [RAW_RUN]
+
+    def _read(self, inferior, addr, size):
+        try:
+            return int.from_bytes(inferior.read_memory(addr, size).tobytes(), "little")
+        except Exception:
+            return None
+
+    def trace_events(self, bp_name: str, inferior, args, tid: int):
+        events = []
+        if bp_name == RAW_SCHEDULE:
+            self.scheduled += 1
+        elif bp_name == RAW_RUN:
+            self.ran += 1
+        elif bp_name in self.spawn_breakpoints:
+            events.append({"ph": "i", "name": "spawn", "cat": f"{self.name}_sched"})
+        if bp_name in (RAW_SCHEDULE, RAW_RUN):
+            # Event-derived backlog: works without layouts, counts every executor
+            events.append({"ph": "C", "name": f"{self.name} runnable backlog",
+                           "args": {"scheduled_minus_run": max(0, self.scheduled - self.ran)}})
+        elif (bp_name in QUEUE_PUSH or bp_name in QUEUE_POP) and self.offsets and args[0]:
+            o = self.offsets
+            queue = args[0]
+            head = self._read(inferior, queue + o["head"] + o["padded_value"] + o["index"], 8)
+            tail = self._read(inferior, queue + o["tail"] + o["padded_value"] + o["index"], 8)
+            if head is not None and tail is not None:
+                events.append({"ph": "C", "name": f"{self.name} run queue 0x{queue:x}",
+                               "args": {"len": unbounded_len(head, tail)}})
+        return events
@@ -1,7 +1,26 @@
 class RuntimePlugin:
-    """Minimal interface every async runtime plugin must implement."""
+    """Minimal interface every async runtime plugin must implement.
+
+    Hooks that take `inferior` get a `gdb_common.snapshot.StopSnapshot`
+    for the current stop: it has the `read_memory` of gdb.Inferior plus
+    `read_int`, and caches reads so several hooks at one stop share them.
+    """
 
     name: str = "generic"
+    # Crates whose symbols identify this runtime in a binary (see
+    # dwarf_analyzer.symbols.linked_crates); plugins with a higher
+    # `priority` win when several match, e.g. async-std also links async-executor.
+    crates: tuple = ()
+    priority: int = 0
+    # How many leading function arguments trace_events() wants to see
+    arg_count: int = 0
+
+    def attach(self, layouts):
+        """Called once before breakpoints are armed with the struct layouts
+        exported by `dwarf_analyzer.layouts` (a StructLayouts), or None when
+        no layout file is available.
+        """
+        pass
 
     def extra_breakpoints(self):
         """Return a list of additional symbol names where context-switches happen.
@@ -13,4 +32,54 @@ class RuntimePlugin:
         """Called when any of the extra breakpoints fire.
         Return dict that will be stored in traceEvent.args.
         """
-        return {} 
\ No newline at end of file
+        return {}
+
+    def wake_breakpoints(self):
+        """Subset of extra_breakpoints() where a task is woken (made runnable)."""
+        return []
+
+    def task_poll_breakpoints(self):
+        """Subset of extra_breakpoints() where the runtime starts polling a task."""
+        return []
+
+    def task_key(self, bp_name: str, arg0: int, inferior):
+        """Identify the task a wake / task-poll breakpoint refers to.
+        `arg0` is the function's first argument; most runtimes pass the task
+        pointer there, so it is the default key.
+        """
+        return arg0
+
+    def trace_events(self, bp_name: str, inferior, args, tid: int):
+        """Extra trace events for an extra breakpoint hit, e.g. counter tracks.
+        `args` holds the first `arg_count` function arguments (ints or None).
+        Return a list of dicts with "ph", "name" and optionally "args", "cat"
+        and "id"; the profiler fills in the timestamp, pid and tid.
+        """
+        return []
+
+    def lock_breakpoints(self):
+        """Lock instrumentation as {symbol: role}. Roles: "acquire" (poll of a
+        lock-acquire future, arg0 is the future), "cancel" (that future's drop)
+        and "release" (permits handed back, arg0 is the lock). Symbols are
+        armed like extra_breakpoints(), which must not list them again.
+        """
+        return {}
+
+    def lock_key(self, acquire: int, inferior):
+        """Address of the lock the acquire future at `acquire` waits on, None if unknown."""
+        return None
+
+    def channel_breakpoints(self):
+        """Channel instrumentation as {symbol: role}, role "send" or "recv".
+        Symbols are armed like extra_breakpoints(), which must not list them again.
+        """
+        return {}
+
+    def channel_state(self, bp_name: str, inferior, args):
+        """Queue state at a channel breakpoint: a dict with "channel" (address),
+        "kind", "len" (None if not known at this point) and optionally
+        "capacity", "receiver" (broadcast receivers lag separately) and
+        "semaphore" (the lock senders wait on). None if it can't be read.
+        `args` holds the first `arg_count` function arguments.
+        """
+        return None
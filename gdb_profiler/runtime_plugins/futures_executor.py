@@ -0,0 +1,97 @@
+from .base import RuntimePlugin
+
+BLOCK_ON = "futures_executor::local_pool::block_on"
+POOL_RUNS = (
+    "futures_executor::local_pool::LocalPool::run",
+    "futures_executor::local_pool::LocalPool::run_until",
+    "futures_executor::local_pool::LocalPool::run_until_stalled",
+    "futures_executor::local_pool::LocalPool::try_run_one",
+)
+SPAWNS = (
+    "<futures_executor::local_pool::LocalSpawner as futures_task::spawn::LocalSpawn>::spawn_local_obj",
+    "<futures_executor::local_pool::LocalSpawner as futures_task::spawn::Spawn>::spawn_obj",
+)
+# ThreadNotify is the waker of both block_on and LocalPool
+WAKE = "<futures_executor::local_pool::ThreadNotify as futures_task::arc_wake::ArcWake>::wake_by_ref"
+
+# Rc's RcBox/RcInner is { strong, weak, value }
+DEFAULT_RC_VALUE = 16
+
+
+class FuturesExecutorPlugin(RuntimePlugin):
+    """futures::executor: block_on and the single-threaded LocalPool.
+
+    The backlog of a LocalPool is the tasks already in its FuturesUnordered
+    (`len_all` of the head task) plus the `incoming` Vec that spawns land in
+    until the pool picks them up.
+    """
+    name = "futures-executor"
+    crates = ("futures_executor",)
+    priority = 1
+    arg_count = 1
+
+    def __init__(self):
+        self.offsets = None
+
+    def attach(self, layouts):
+        if layouts is None:
+            print("[async-flame] futures-executor: no struct layouts, backlog counters disabled")
+            return
+        rc_value = layouts.offset(r"(RcBox|RcInner)<core::cell::RefCell<alloc::vec::Vec<futures_task::future_obj::LocalFutureObj.*>>", "value")
+        offsets = {
+            "pool": layouts.offset("LocalPool", "pool", ("incoming",)),
+            "incoming": layouts.offset("LocalPool", "incoming", ("pool",)),
+            "spawner_incoming": layouts.offset("LocalSpawner", "incoming"),
+            "head_all": layouts.offset(r"FuturesUnordered<.*>", "head_all", ("ready_to_run_queue",)),
+            "len_all": layouts.offset(r"Task<.*>", "len_all", ("next_all",)),
+            "rc_value": DEFAULT_RC_VALUE if rc_value is None else rc_value,
+            "refcell_value": layouts.offset(r"RefCell<alloc::vec::Vec<futures_task::future_obj::LocalFutureObj.*>>", "value", ("borrow",)),
+            "vec_len": layouts.offset(r"Vec<futures_task::future_obj::LocalFutureObj.*>", "len", ("buf",)),
+        }
+        missing = [k for k, v in offsets.items() if v is None]
+        if missing:
+            print(f"[async-flame] futures-executor: layouts lack {', '.join(missing)}; backlog counters disabled")
+            return
+        self.offsets = offsets
+
+    def extra_breakpoints(self):
+        return [BLOCK_ON, *POOL_RUNS, *SPAWNS, WAKE]
+
+    def on_breakpoint(self, bp_name: str, inferior):
+        return {"futures_evt": bp_name}
+
+    def _read(self, inferior, addr, size):
+        try:
+            return int.from_bytes(inferior.read_memory(addr, size).tobytes(), "little")
+        except Exception:
+            return None
+
+    def _incoming_len(self, inferior, rc_field_addr):
+        """Length of the `incoming` Vec behind an Rc / Weak stored at rc_field_addr."""
+        o = self.offsets
+        rc_box = self._read(inferior, rc_field_addr, 8)
+        # Weak::new() uses usize::MAX as a dangling sentinel
+        if not rc_box or rc_box == 0xFFFFFFFFFFFFFFFF:
+            return None
+        return self._read(inferior, rc_box + o["rc_value"] + o["refcell_value"] + o["vec_len"], 8)
+
+    def trace_events(self, bp_name: str, inferior, args, tid: int):
+        events = []
+        if bp_name == BLOCK_ON:
+            events.append({"ph": "i", "name": "block_on", "cat": "futures_sched"})
+        elif bp_name == WAKE:
+            events.append({"ph": "i", "name": "wake", "cat": "futures_sched"})
+        if self.offsets is None or not args[0]:
+            return events
+        o = self.offsets
+        if bp_name in POOL_RUNS:
+            pool = args[0]
+            head = self._read(inferior, pool + o["pool"] + o["head_all"], 8)
+            in_pool = self._read(inferior, head + o["len_all"], 8) if head else 0
+            incoming = self._incoming_len(inferior, pool + o["incoming"])
+            events.append({"ph": "C", "name": f"LocalPool 0x{pool:x} backlog",
+                           "args": {"pool": in_pool or 0, "incoming": incoming or 0}})
+        elif bp_name in SPAWNS:
+            incoming = self._incoming_len(inferior, args[0] + o["spawner_incoming"])
+            events.append({"ph": "i", "name": "spawn", "cat": "futures_sched", "args": {"incoming": incoming}})
+        return events
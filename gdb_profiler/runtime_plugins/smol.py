@@ -0,0 +1,10 @@
+from .async_task import AsyncTaskPlugin
+
+class SmolPlugin(AsyncTaskPlugin):
+    name = "smol"
+    crates = ("async_executor",)
+    priority = 5
+    spawn_breakpoints = (
+        "async_executor::Executor::spawn",
+        "async_executor::LocalExecutor::spawn",
+    )
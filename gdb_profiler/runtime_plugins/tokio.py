@@ -1,14 +1,311 @@
 from .base import RuntimePlugin
 
+# Multi-thread scheduler internals (Tokio 1.x)
+RUN_TASK = "tokio::runtime::scheduler::multi_thread::worker::Context::run_task"
+PARK_TIMEOUT = "tokio::runtime::scheduler::multi_thread::worker::Context::park_timeout"
+STEAL_INTO = "tokio::runtime::scheduler::multi_thread::queue::Steal::steal_into"
+UNPARK = "tokio::runtime::scheduler::multi_thread::park::Unparker::unpark"
+
+# Mutex, RwLock and Semaphore all acquire through the batch semaphore
+ACQUIRE_POLL = "'<tokio::sync::batch_semaphore::Acquire as core::future::future::Future>::poll'"
+ACQUIRE_DROP = "'<tokio::sync::batch_semaphore::Acquire as core::ops::drop::Drop>::drop'"
+SEMAPHORE_RELEASE = "tokio::sync::batch_semaphore::Semaphore::release"
+
+# Channel endpoints. Bounded and unbounded mpsc share chan::Rx::recv, so a
+# receiver's channel kind is learnt from its senders.
+MPSC_SEND = "'tokio::sync::mpsc::bounded::Permit<T>::send'"
+MPSC_UNBOUNDED_SEND = "'tokio::sync::mpsc::unbounded::UnboundedSender<T>::send'"
+MPSC_RECV = "'tokio::sync::mpsc::chan::Rx<T,S>::recv'"
+ONESHOT_SEND = "'tokio::sync::oneshot::Sender<T>::send'"
+ONESHOT_RECV = "'<tokio::sync::oneshot::Receiver<T> as core::future::future::Future>::poll'"
+BROADCAST_SEND = "'tokio::sync::broadcast::Sender<T>::send'"
+BROADCAST_RECV = "'tokio::sync::broadcast::Receiver<T>::recv_ref'"
+CHANNELS = {
+    "mpsc": {MPSC_SEND: "send", MPSC_UNBOUNDED_SEND: "send", MPSC_RECV: "recv"},
+    "oneshot": {ONESHOT_SEND: "send", ONESHOT_RECV: "recv"},
+    "broadcast": {BROADCAST_SEND: "send", BROADCAST_RECV: "recv"},
+}
+# Semaphore permits are stored shifted left by one; bit 0 is the closed flag
+PERMIT_SHIFT = 1
+ONESHOT_VALUE_SENT = 0b10
+
+# ArcInner<T> is { strong, weak, data }; used when the layout file has no entry
+DEFAULT_ARC_DATA = 16
+
+
 class TokioPlugin(RuntimePlugin):
     name = "tokio"
+    crates = ("tokio",)
+    priority = 10
+    # run_task(&self, task, core: Box<Core>) is the widest signature we read
+    arg_count = 3
+
+    def __init__(self):
+        self.offsets = None
+        self.worker_of_tid = {}
+        self.acquire_semaphore = None
+        self.channel_offsets = {}   # channel family -> offsets, for the families the layouts cover
+        self.mpsc_kind = {}         # Chan address -> "mpsc" / "mpsc_unbounded", seen at a send
+
+    def attach(self, layouts):
+        """Resolve the field offsets needed to read scheduler state from memory."""
+        if layouts is None:
+            print("[async-flame] tokio: no struct layouts, scheduler counters and lock waits disabled")
+            return
+        # Acquire<'a> { node: Waiter, semaphore: &'a Semaphore, num_permits, queued }
+        self.acquire_semaphore = layouts.offset("Acquire", "semaphore", ("node", "num_permits"))
+        if self.acquire_semaphore is None:
+            print("[async-flame] tokio: layouts lack Acquire.semaphore; lock waits disabled")
+        def arc_data(pattern):
+            off = layouts.offset(rf"ArcInner<{pattern}>", "data")
+            return DEFAULT_ARC_DATA if off is None else off
+        self._attach_channels(layouts, arc_data)
+        offsets = {
+            "ctx_worker": layouts.offset("Context", "worker", ("core",)),
+            "worker_index": layouts.offset("Worker", "index", ("handle", "core")),
+            "worker_handle": layouts.offset("Worker", "handle", ("index", "core")),
+            "handle_shared": layouts.offset("Handle", "shared", ("driver", "blocking_spawner")),
+            "shared_inject": layouts.offset("Shared", "inject", ("remotes", "owned")),
+            # Bare `Shared<..>` / `Inject<..>` with a `len` is far too common a shape
+            "inject_len": layouts.offset(r"tokio::runtime::scheduler::inject::(shared::Shared|Inject)<.*>", "len",
+                                         qualified=True),
+            "core_run_queue": layouts.offset("Core", "run_queue", ("lifo_slot",)),
+            "local_inner": layouts.offset(r"Local<.*>", "inner"),
+            "queue_head": layouts.offset(r"Inner<.*>", "head", ("tail", "buffer")),
+            "queue_tail": layouts.offset(r"Inner<.*>", "tail", ("head", "buffer")),
+            "arc_worker": arc_data(r".*multi_thread::worker::Worker"),
+            "arc_handle": arc_data(r".*multi_thread::handle::Handle"),
+            "arc_queue": arc_data(r".*multi_thread::queue::Inner<.*>"),
+        }
+        missing = [k for k, v in offsets.items() if v is None]
+        if missing:
+            print(f"[async-flame] tokio: layouts lack {', '.join(missing)}; scheduler counters disabled")
+            return
+        self.offsets = offsets
 
     def extra_breakpoints(self):
         # names taken from Tokio 1.x default scheduler internals
         return [
             "tokio::runtime::task::raw::poll",
             "tokio::runtime::task::raw::schedule",
+            # Waker vtable entries: Waker::wake / wake_by_ref dispatch here
+            "tokio::runtime::task::waker::wake_by_val",
+            "tokio::runtime::task::waker::wake_by_ref",
+            RUN_TASK,
+            PARK_TIMEOUT,
+            STEAL_INTO,
+            UNPARK,
         ]
 
     def on_breakpoint(self, bp_name: str, inferior):
-        return {"tokio_evt": bp_name} 
\ No newline at end of file
+        return {"tokio_evt": bp_name}
+
+    def wake_breakpoints(self):
+        return [
+            "tokio::runtime::task::waker::wake_by_val",
+            "tokio::runtime::task::waker::wake_by_ref",
+            "tokio::runtime::task::raw::schedule",
+        ]
+
+    def task_poll_breakpoints(self):
+        return ["tokio::runtime::task::raw::poll"]
+
+    # All of the above take the task's `NonNull<Header>` / `*const ()` header
+    # pointer as their first argument, so the default task_key applies.
+
+    # ---- lock contention ----
+
+    def lock_breakpoints(self):
+        if self.acquire_semaphore is None:
+            return {}
+        return {ACQUIRE_POLL: "acquire", ACQUIRE_DROP: "cancel", SEMAPHORE_RELEASE: "release"}
+
+    def lock_key(self, acquire, inferior):
+        return self._read(inferior, acquire + self.acquire_semaphore, 8) or None
+
+    # ---- channels ----
+
+    def _attach_channels(self, layouts, arc_data):
+        families = {
+            "mpsc": {
+                # Tx / Rx { inner: Arc<Chan<T, S>> }, UnboundedSender { chan: Tx }
+                "tx_inner": layouts.offset(r"Tx<.*>", "inner"),
+                "rx_inner": layouts.offset(r"Rx<.*>", "inner"),
+                "unbounded_chan": layouts.offset(r"UnboundedSender<.*>", "chan"),
+                "arc_chan": arc_data(r".*mpsc::chan::Chan<.*>"),
+                "bounded_sem": layouts.offset(r"Chan<.*, tokio::sync::mpsc::bounded::Semaphore>", "semaphore"),
+                "unbounded_sem": layouts.offset(r"Chan<.*, core::sync::atomic::AtomicUsize>", "semaphore"),
+                # bounded::Semaphore { semaphore: batch_semaphore::Semaphore, bound }
+                "sem_inner": layouts.offset("Semaphore", "semaphore", ("bound",)),
+                "sem_bound": layouts.offset("Semaphore", "bound", ("semaphore",)),
+                "sem_permits": layouts.offset("Semaphore", "permits", ("waiters",)),
+            },
+            "oneshot": {
+                "rx_inner": layouts.offset(r"Receiver<.*>", "inner"),
+                "arc_inner": arc_data(r".*oneshot::Inner<.*>"),
+                "state": layouts.offset(r"Inner<.*>", "state", ("value", "tx_task", "rx_task")),
+            },
+            "broadcast": {
+                "tx_shared": layouts.offset(r"Sender<.*>", "shared"),
+                "rx_shared": layouts.offset(r"Receiver<.*>", "shared", ("next",)),
+                "rx_next": layouts.offset(r"Receiver<.*>", "next", ("shared",)),
+                "arc_shared": arc_data(r".*broadcast::Shared<.*>"),
+                "mask": layouts.offset(r"Shared<.*>", "mask", ("tail", "buffer")),
+                "tail": layouts.offset(r"Shared<.*>", "tail", ("mask", "buffer")),
+                # tokio's Mutex wraps std's at offset 0; the Tail sits in its `data`
+                "tail_data": layouts.offset(r"Mutex<tokio::sync::broadcast::Tail>", "data"),
+                "tail_pos": layouts.offset("Tail", "pos", ("rx_cnt",)),
+            },
+        }
+        for family, offsets in families.items():
+            missing = [k for k, v in offsets.items() if v is None]
+            if missing:
+                print(f"[async-flame] tokio: layouts lack {', '.join(missing)}; {family} channels not traced")
+            else:
+                self.channel_offsets[family] = offsets
+
+    def channel_breakpoints(self):
+        return {sym: role for family, syms in CHANNELS.items() if family in self.channel_offsets
+                for sym, role in syms.items()}
+
+    def _arc(self, inferior, field_addr, data_offset):
+        """Address of the value behind the Arc stored at `field_addr`."""
+        arc_inner = self._read(inferior, field_addr, 8)
+        return arc_inner + data_offset if arc_inner else None
+
+    def channel_state(self, bp_name, inferior, args):
+        arg0 = args[0] if args else None
+        if not arg0:
+            return None
+        if bp_name in CHANNELS["mpsc"]:
+            return self._mpsc_state(bp_name, inferior, arg0)
+        if bp_name in CHANNELS["oneshot"]:
+            o = self.channel_offsets["oneshot"]
+            if bp_name == ONESHOT_SEND:
+                # send(self, value): the Sender is a lone Arc pointer, passed by value
+                return {"channel": arg0 + o["arc_inner"], "kind": "oneshot", "len": 1, "capacity": 1}
+            inner = self._arc(inferior, arg0 + o["rx_inner"], o["arc_inner"])
+            state = self._read(inferior, inner + o["state"], 8) if inner else None
+            if state is None:
+                return None
+            return {"channel": inner, "kind": "oneshot", "len": 1 if state & ONESHOT_VALUE_SENT else 0,
+                    "capacity": 1}
+        o = self.channel_offsets["broadcast"]
+        shared = self._arc(inferior, arg0 + (o["tx_shared"] if bp_name == BROADCAST_SEND else o["rx_shared"]),
+                           o["arc_shared"])
+        mask = self._read(inferior, shared + o["mask"], 8) if shared else None
+        if mask is None:
+            return None
+        if bp_name == BROADCAST_SEND:
+            # Receivers lag independently; depth is sampled at each receiver
+            return {"channel": shared, "kind": "broadcast", "len": None, "capacity": mask + 1}
+        pos = self._read(inferior, shared + o["tail"] + o["tail_data"] + o["tail_pos"], 8)
+        next_pos = self._read(inferior, arg0 + o["rx_next"], 8)
+        if pos is None or next_pos is None:
+            return None
+        return {"channel": shared, "receiver": arg0, "kind": "broadcast",
+                "len": max(0, pos - next_pos), "capacity": mask + 1}
+
+    def _mpsc_state(self, bp_name, inferior, arg0):
+        o = self.channel_offsets["mpsc"]
+        if bp_name == MPSC_SEND:
+            # Permit<T> { chan: &Tx } is passed by value: arg0 is the &Tx
+            chan = self._arc(inferior, arg0 + o["tx_inner"], o["arc_chan"])
+            kind = "mpsc"
+        elif bp_name == MPSC_UNBOUNDED_SEND:
+            chan = self._arc(inferior, arg0 + o["unbounded_chan"] + o["tx_inner"], o["arc_chan"])
+            kind = "mpsc_unbounded"
+        else:
+            chan = self._arc(inferior, arg0 + o["rx_inner"], o["arc_chan"])
+            kind = self.mpsc_kind.get(chan)
+        if chan is None or kind is None:
+            return None
+        self.mpsc_kind[chan] = kind
+        if kind == "mpsc_unbounded":
+            # The unbounded "semaphore" counts queued messages
+            count = self._read(inferior, chan + o["unbounded_sem"], 8)
+            if count is None:
+                return None
+            return {"channel": chan, "kind": kind, "len": count >> PERMIT_SHIFT}
+        sem = chan + o["bounded_sem"]
+        bound = self._read(inferior, sem + o["sem_bound"], 8)
+        permits = self._read(inferior, sem + o["sem_inner"] + o["sem_permits"], 8)
+        if bound is None or permits is None:
+            return None
+        # Reserved permits count as queued: a sender waiting for one sees the channel full
+        return {"channel": chan, "kind": kind, "len": max(0, bound - (permits >> PERMIT_SHIFT)),
+                "capacity": bound, "semaphore": sem + o["sem_inner"]}
+
+    # ---- scheduler metrics ----
+
+    def _read(self, inferior, addr, size):
+        try:
+            return int.from_bytes(inferior.read_memory(addr, size).tobytes(), "little")
+        except Exception:
+            return None
+
+    def _worker_index(self, inferior, ctx):
+        o = self.offsets
+        arc_inner = self._read(inferior, ctx + o["ctx_worker"], 8)
+        if not arc_inner:
+            return None, None
+        worker = arc_inner + o["arc_worker"]
+        return self._read(inferior, worker + o["worker_index"], 8), worker
+
+    def _queue_len(self, inferior, arc_field_addr):
+        """Length of a run queue given the address of its Arc<queue::Inner>."""
+        o = self.offsets
+        arc_inner = self._read(inferior, arc_field_addr, 8)
+        if not arc_inner:
+            return None
+        inner = arc_inner + o["arc_queue"]
+        head = self._read(inferior, inner + o["queue_head"], 8)
+        tail = self._read(inferior, inner + o["queue_tail"], 4)
+        if head is None or tail is None:
+            return None
+        # head packs (steal, real) u32 halves; real is the low half
+        return (tail - (head & 0xFFFFFFFF)) & 0xFFFFFFFF
+
+    def _inject_len(self, inferior, worker):
+        o = self.offsets
+        arc_inner = self._read(inferior, worker + o["worker_handle"], 8)
+        if not arc_inner:
+            return None
+        handle = arc_inner + o["arc_handle"]
+        return self._read(inferior, handle + o["handle_shared"] + o["shared_inject"] + o["inject_len"], 8)
+
+    def trace_events(self, bp_name: str, inferior, args, tid: int):
+        if self.offsets is None:
+            return []
+        events = []
+        if bp_name in (RUN_TASK, PARK_TIMEOUT):
+            ctx = args[0] if args else None
+            core = args[2] if bp_name == RUN_TASK else args[1]
+            if not ctx:
+                return events
+            index, worker = self._worker_index(inferior, ctx)
+            if index is None:
+                return events
+            self.worker_of_tid[tid] = index
+            events.append({"ph": "C", "name": f"tokio worker {index}",
+                           "args": {"busy": 1 if bp_name == RUN_TASK else 0}})
+            if core:
+                local = self._queue_len(inferior, core + self.offsets["core_run_queue"] + self.offsets["local_inner"])
+                if local is not None:
+                    events.append({"ph": "C", "name": f"tokio worker {index} run queue", "args": {"local": local}})
+            inject = self._inject_len(inferior, worker)
+            if inject is not None:
+                events.append({"ph": "C", "name": "tokio inject queue", "args": {"len": inject}})
+        elif bp_name == STEAL_INTO:
+            victim, dst = (args + [None, None])[:2]
+            if victim:
+                # Steal(Arc<Inner>) and Local { inner: Arc<Inner> }
+                events.append({"ph": "i", "name": "steal", "cat": "tokio_sched", "args": {
+                    "worker": self.worker_of_tid.get(tid),
+                    "victim_len": self._queue_len(inferior, victim),
+                    "dst_len": self._queue_len(inferior, dst + self.offsets["local_inner"]) if dst else None,
+                }})
+        elif bp_name == UNPARK:
+            events.append({"ph": "i", "name": "unpark", "cat": "tokio_sched",
+                           "args": {"by_worker": self.worker_of_tid.get(tid)}})
+        return events
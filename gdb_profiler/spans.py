@@ -0,0 +1,155 @@
+"""Per-future-instance poll bookkeeping for async_flame_gdb.
+
+A future instance is identified by its `self` pointer *and* its type name:
+an inner future stored at offset 0 of its parent shares the parent's
+address, so the pointer alone is not enough.
+"""
+import json
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _variant_path(text):
+    """`Type<..>::Variant` head of a printed enum value, up to its payload.
+
+    Generic arguments may themselves contain `(`, `{` and `::Variant`-like
+    paths (`Poll<Result<(), E>>`), so only brackets at depth 0 end the head.
+    """
+    depth = 0
+    for i, c in enumerate(text):
+        if c == "<":
+            depth += 1
+        elif c == ">" and text[i - 1:i] != "-":   # `fn() -> T` inside the generics
+            depth -= 1
+        elif depth == 0 and (c in "({" or c.isspace()):
+            return text[:i]
+    return text
+
+
+def decode_poll_outcome(value):
+    """'Ready' / 'Pending' / None from a `core::task::Poll<T>` gdb.Value.
+
+    Poll<T> is `enum { Ready(T), Pending }`; GDB prints the variant path
+    (`core::task::poll::Poll<T>::Ready(..)`), and for `Poll<()>` (a single
+    discriminant byte) the raw byte is 0 for Ready and 1 for Pending, which
+    is what the original example script relied on.
+    """
+    if value is None:
+        return None
+    try:
+        head = _variant_path(str(value))
+        if head.endswith("::Pending") or head == "Pending":
+            return "Pending"
+        if head.endswith("::Ready") or head == "Ready":
+            return "Ready"
+    except Exception:
+        pass
+    try:
+        raw = bytes(value.bytes) if hasattr(value, "bytes") else None
+    except Exception:
+        raw = None
+    if raw == b"\x00":
+        return "Ready"
+    if raw == b"\x01":
+        return "Pending"
+    return None
+
+
+class InstanceStats:
+    __slots__ = ("name", "addr", "polls", "busy_ns", "first_ts", "last_ts")
+
+    def __init__(self, name, addr, ts):
+        self.name = name
+        self.addr = addr
+        self.polls = 0
+        self.busy_ns = 0
+        self.first_ts = ts
+        self.last_ts = ts
+
+
+class FutureSummary:
+    """Completed-instance metrics of one future type."""
+    __slots__ = ("polls", "busy_ns", "wall_ns")
+
+    def __init__(self):
+        self.polls = []
+        self.busy_ns = []
+        self.wall_ns = []
+
+
+class InstanceTracker:
+    def __init__(self):
+        self.live = {}        # (addr, name) -> InstanceStats
+        self.summaries = {}   # name -> FutureSummary
+
+    def poll_start(self, addr, name, ts):
+        """Returns True on the first poll of this instance."""
+        key = (addr, name)
+        inst = self.live.get(key)
+        first = inst is None
+        if first:
+            inst = self.live[key] = InstanceStats(name, addr, ts)
+        inst.polls += 1
+        inst.last_ts = ts
+        return first
+
+    def poll_end(self, addr, name, entry_ts, ts, outcome):
+        """Accounts one finished poll; returns the InstanceStats once it is Ready."""
+        key = (addr, name)
+        inst = self.live.get(key)
+        if inst is None:
+            return None
+        inst.busy_ns += max(0, ts - entry_ts)
+        inst.last_ts = ts
+        if outcome != "Ready":
+            return None
+        del self.live[key]
+        summary = self.summaries.get(name)
+        if summary is None:
+            summary = self.summaries[name] = FutureSummary()
+        summary.polls.append(inst.polls)
+        summary.busy_ns.append(inst.busy_ns)
+        summary.wall_ns.append(ts - inst.first_ts)
+        return inst
+
+    def rows(self):
+        """One summary dict per future type, most polls-per-instance first."""
+        pending = {}
+        for inst in self.live.values():
+            pending[inst.name] = pending.get(inst.name, 0) + 1
+        rows = []
+        for name in set(self.summaries) | set(pending):
+            s = self.summaries.get(name) or FutureSummary()
+            polls, busy, wall = sorted(s.polls), sorted(s.busy_ns), sorted(s.wall_ns)
+            n = len(polls)
+            rows.append({
+                "name": name,
+                "completed": n,
+                "unfinished": pending.get(name, 0),
+                "polls_mean": sum(polls) / n if n else 0,
+                "polls_max": polls[-1] if n else 0,
+                "busy_us_mean": sum(busy) / n / 1e3 if n else 0,
+                "wall_us_p50": percentile(wall, 50) / 1e3,
+                "wall_us_p99": percentile(wall, 99) / 1e3,
+                "wall_us_max": (wall[-1] if n else 0) / 1e3,
+            })
+        rows.sort(key=lambda r: r["polls_mean"], reverse=True)
+        return rows
+
+    def report(self, top=20):
+        rows = self.rows()
+        lines = [f"{'done':>7} {'open':>6} {'polls/avg':>9} {'max':>6} {'busy us':>10} "
+                 f"{'wall p50':>10} {'wall p99':>10}  future"]
+        for r in rows[:top]:
+            lines.append(f"{r['completed']:>7} {r['unfinished']:>6} {r['polls_mean']:>9.1f} {r['polls_max']:>6} "
+                         f"{r['busy_us_mean']:>10.1f} {r['wall_us_p50']:>10.1f} {r['wall_us_p99']:>10.1f}  {r['name']}")
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as fp:
+            json.dump({"futures": self.rows()}, fp, indent=2)
@@ -0,0 +1,157 @@
+"""Runtime trace filtering and sampling for async_flame_gdb.
+
+async_flame_gdb.py owns the breakpoints; this module only answers "should
+this future / thread / poll be traced?" from name, crate and thread rules.
+"""
+import re
+import time
+
+KINDS = ("name", "crate", "thread")
+
+
+def crate_of(symbol: str) -> str:
+    """Best-effort crate name for a (mangled or demangled) Rust symbol.
+
+    Handles legacy `_ZN...E` mangling, including `<T as Trait>` impls whose
+    first path component is `$LT$crate..path..`, and plain demangled paths
+    such as `tokio::runtime::task::raw::poll`.
+    """
+    if not symbol:
+        return ""
+    if symbol.startswith("_ZN"):
+        m = re.match(r"_ZN(\d+)", symbol)
+        if not m:
+            return ""
+        start = m.end()
+        first = symbol[start:start + int(m.group(1))]
+        # `$LT$tokio..runtime..Foo$u20$as$u20$...$GT$` -> `tokio..runtime..Foo...`
+        first = re.sub(r"^_?(\$LT\$|\$RF\$|\$BP\$)+", "", first)
+        return first.split("..")[0].split("$")[0]
+    if symbol.startswith("_R"):
+        # v0 mangling: `_RNv...C<len><crate>` - the crate root is the first `C` tag
+        m = re.search(r"C(?:s[0-9a-zA-Z]*_)?(\d+)", symbol)
+        if m:
+            start = m.end()
+            return symbol[start:start + int(m.group(1))]
+        return ""
+    return symbol.lstrip("<&").split("::")[0].split("<")[0]
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `burst` stored."""
+
+    __slots__ = ("rate", "burst", "tokens", "last")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class TraceFilter:
+    """Ordered enable/disable rules plus per-future 1-in-N sampling and rate limiting.
+
+    Rules are evaluated in insertion order and the *last* matching rule wins;
+    a future or thread that matches no rule is traced.
+      * name   - regex searched in the future's display name
+      * crate  - regex fully matched against the crate of the poll symbol
+      * thread - comma separated LWP ids, or `*` for every thread
+    """
+
+    def __init__(self):
+        self.rules = []         # [(enable, kind, raw_pattern, compiled)]
+        self.sample_every = 1   # trace 1 in N polls per future
+        self.rate = 0.0         # events/s per future, 0 = unlimited
+        self.burst = 0.0
+        self._hits = {}         # key -> polls seen
+        self._buckets = {}      # key -> TokenBucket
+        self._has_thread_rules = False
+
+    # ---- rule management ----
+
+    def add_rule(self, enable: bool, kind: str, pattern: str):
+        if kind not in KINDS:
+            raise ValueError(f"unknown filter kind '{kind}', expected one of {', '.join(KINDS)}")
+        if kind == "thread":
+            compiled = None if pattern == "*" else {int(t) for t in pattern.split(",") if t.strip()}
+            self._has_thread_rules = True
+        else:
+            compiled = re.compile(pattern)
+        self.rules.append((enable, kind, pattern, compiled))
+
+    def reset(self):
+        self.__init__()
+
+    def set_sampling(self, every: int):
+        if every < 1:
+            raise ValueError("sample interval must be >= 1")
+        self.sample_every = every
+        self._hits.clear()
+
+    def set_rate_limit(self, rate: float, burst: float = 0.0):
+        if rate < 0:
+            raise ValueError("rate must be >= 0")
+        self.rate = rate
+        self.burst = burst if burst > 0 else max(rate, 1.0)
+        self._buckets.clear()
+
+    # ---- decisions ----
+
+    def future_enabled(self, name: str, symbol: str) -> bool:
+        enabled = True
+        crate = None
+        for enable, kind, _, compiled in self.rules:
+            if kind == "name":
+                if compiled.search(name):
+                    enabled = enable
+            elif kind == "crate":
+                if crate is None:
+                    crate = crate_of(symbol)
+                if compiled.fullmatch(crate):
+                    enabled = enable
+        return enabled
+
+    def thread_enabled(self, tid: int) -> bool:
+        if not self._has_thread_rules:
+            return True
+        enabled = True
+        for enable, kind, _, compiled in self.rules:
+            if kind == "thread" and (compiled is None or tid in compiled):
+                enabled = enable
+        return enabled
+
+    def should_sample(self, key) -> bool:
+        """Called once per poll entry; False means skip this poll entirely."""
+        if self.sample_every > 1:
+            n = self._hits.get(key, 0)
+            self._hits[key] = n + 1
+            if n % self.sample_every:
+                return False
+        if self.rate > 0:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return bucket.take()
+        return True
+
+    def describe(self):
+        lines = [f"sampling: 1 in {self.sample_every} polls per future"]
+        if self.rate > 0:
+            lines.append(f"rate limit: {self.rate:g} events/s per future (burst {self.burst:g})")
+        else:
+            lines.append("rate limit: off")
+        if not self.rules:
+            lines.append("rules: none (everything traced)")
+        for i, (enable, kind, pattern, _) in enumerate(self.rules, 1):
+            lines.append(f"  {i}. {'enable ' if enable else 'disable'} {kind} {pattern}")
+        return lines
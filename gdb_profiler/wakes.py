@@ -0,0 +1,87 @@
+"""Waker -> wakee attribution for async_flame_gdb.
+
+A wake is recorded against the task it targets (the runtime's task key,
+e.g. a Tokio task header pointer) together with the future that was being
+polled when the wake happened. The next time the runtime starts polling that
+task the wake is resolved into a wake-to-poll delay. The sample is parked
+until the first future poll inside that task run names the task.
+"""
+import json
+
+from spans import percentile
+
+OUTSIDE_POLL = "(outside poll)"
+
+
+class WakeTracker:
+    def __init__(self):
+        self.pending = {}      # task -> (flow_id, waker, wake_ts)
+        self.task_names = {}   # task -> root future name
+        self.unresolved = {}   # task -> [(waker, delay_ns)]
+        self.pairs = {}        # (waker, wakee) -> [delay_ns]
+        self.redundant = 0     # wakes of a task that already had one pending
+        self._next_id = 0
+
+    def on_wake(self, task, waker, ts):
+        """Returns a flow id for a new wake, None if the task was already woken."""
+        if task in self.pending:
+            self.redundant += 1
+            return None
+        self._next_id += 1
+        flow_id = f"wake{self._next_id}"
+        self.pending[task] = (flow_id, waker, ts)
+        return flow_id
+
+    def on_task_poll(self, task, ts):
+        """Returns (flow_id, waker, delay_ns) if this poll resolves a pending wake."""
+        wake = self.pending.pop(task, None)
+        if wake is None:
+            return None
+        flow_id, waker, wake_ts = wake
+        delay = max(0, ts - wake_ts)
+        # Parked until the task's root future poll names it (see name_task)
+        self.unresolved.setdefault(task, []).append((waker, delay))
+        return flow_id, waker, delay
+
+    def name_task(self, task, name):
+        # Always overwrite: task keys are heap addresses and get reused once a
+        # task is freed, so the latest root future seen is the right name.
+        self.task_names[task] = name
+        for waker, delay in self.unresolved.pop(task, ()):
+            self.pairs.setdefault((waker, name), []).append(delay)
+
+    def rows(self):
+        pairs = {k: list(v) for k, v in self.pairs.items()}
+        for task, samples in self.unresolved.items():
+            # Root future never traced (filtered, sampled out, ...): fall back to the task key
+            name = self.task_names.get(task, f"task 0x{task:x}")
+            for waker, delay in samples:
+                pairs.setdefault((waker, name), []).append(delay)
+        rows = []
+        for (waker, wakee), delays in pairs.items():
+            d = sorted(delays)
+            rows.append({
+                "waker": waker,
+                "wakee": wakee,
+                "wakes": len(d),
+                "delay_us_p50": percentile(d, 50) / 1e3,
+                "delay_us_p90": percentile(d, 90) / 1e3,
+                "delay_us_p99": percentile(d, 99) / 1e3,
+                "delay_us_max": d[-1] / 1e3,
+            })
+        rows.sort(key=lambda r: r["delay_us_p99"], reverse=True)
+        return rows
+
+    def report(self, top=20):
+        rows = self.rows()
+        lines = [f"{sum(r['wakes'] for r in rows)} resolved wakes, {len(self.pending)} still pending, "
+                 f"{self.redundant} redundant",
+                 f"{'wakes':>7} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>9}  waker -> wakee"]
+        for r in rows[:top]:
+            lines.append(f"{r['wakes']:>7} {r['delay_us_p50']:>9.1f} {r['delay_us_p90']:>9.1f} "
+                         f"{r['delay_us_p99']:>9.1f} {r['delay_us_max']:>9.1f}  {r['waker']} -> {r['wakee']}")
+        return lines
+
+    def dump(self, path):
+        with open(path, "w") as fp:
+            json.dump({"pairs": self.rows(), "redundant_wakes": self.redundant}, fp, indent=2)
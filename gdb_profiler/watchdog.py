@@ -0,0 +1,176 @@
+"""Blocking-in-async watchdog for async_flame_gdb.
+
+In-flight polls are tracked per thread with host timestamps. A host thread
+checks them every few milliseconds; when a thread's outermost poll has run
+longer than the threshold, it sends that thread a real-time signal near
+SIGRTMAX with tgkill while the poll is still running. Time the thread spent stopped by the debugger is
+not running time: every breakpoint handler reports how long it held the
+inferior (all threads in all-stop mode, its own thread in non-stop mode),
+and stops shown to the user are paused and resumed from GDB's stop and
+continue events. Only GDB's own work around a hit (stopping threads,
+stepping over the breakpoint) still counts. async_flame_gdb catches the signal with a
+catchpoint whose condition captures the thread's backtrace and then lets it
+continue, discarding the signal. Each poll is reported once. The signal is
+one programs leave alone, since GDB drops every instance of it while the
+watchdog is armed; its previous `handle` setting is put back afterwards.
+"""
+import ctypes
+import platform
+import signal
+import threading
+import time
+
+SIGNAL = signal.SIGRTMAX - 1
+# GDB names real-time signals by number
+GDB_SIGNAL_NAME = f"SIG{int(SIGNAL)}"
+# tgkill(2) for libcs that don't export a wrapper
+_SYS_TGKILL = {"x86_64": 234, "aarch64": 131, "riscv64": 131}
+
+
+def handle_settings(info, name=GDB_SIGNAL_NAME):
+    """`handle` arguments ("stop print pass", ...) matching GDB's `info signals NAME`
+    output, None if `name` is not in it."""
+    for line in info.splitlines():
+        fields = line.split()
+        if len(fields) >= 4 and fields[0] == name:
+            flags = [value == "Yes" for value in fields[1:4]]
+            return " ".join(word if on else f"no{word}" for word, on in zip(("stop", "print", "pass"), flags))
+    return None
+
+
+class InflightPoll:
+    __slots__ = ("name", "host_ns", "paused_ns", "entry_ts", "reported")
+
+    def __init__(self, name, host_ns, paused_ns, entry_ts):
+        self.name = name
+        self.host_ns = host_ns      # host clock at entry
+        self.paused_ns = paused_ns  # Watchdog.paused() of its thread at entry
+        self.entry_ts = entry_ts    # trace timestamp (ns)
+        self.reported = False
+
+
+class Watchdog:
+    def __init__(self, clock=time.monotonic_ns):
+        self.clock = clock
+        self.threshold_ns = 0       # 0: off
+        self.pid = None
+        self.inflight = {}          # tid -> [InflightPoll], innermost last
+        self.requests = {}          # tid -> InflightPoll signalled, until the catchpoint takes it
+        self.signals = 0
+        # Time held stopped by the debugger; key None: every thread, a tid: that thread only
+        self.paused_ns = {}
+        self._paused_since = {}
+        self._thread = None
+        self._stop = threading.Event()
+        libc = ctypes.CDLL(None, use_errno=True)
+        self._tgkill = getattr(libc, "tgkill", None)
+        self._syscall = libc.syscall
+        self._sys_tgkill = _SYS_TGKILL.get(platform.machine())
+
+    @property
+    def enabled(self):
+        return self.threshold_ns > 0
+
+    def push(self, tid, name, entry_ts):
+        now = self.clock()
+        self.inflight.setdefault(tid, []).append(InflightPoll(name, now, self.paused(tid, now), entry_ts))
+
+    def pop(self, tid):
+        stack = self.inflight.get(tid)
+        if stack:
+            stack.pop()
+
+    def reset(self):
+        """The inferior exited: forget its threads."""
+        self.pid = None
+        self.inflight.clear()
+        self.requests.clear()
+        self.paused_ns.clear()
+        self._paused_since.clear()
+
+    def paused(self, tid, now):
+        """Total time `tid` has been held stopped, up to `now`."""
+        total = 0
+        for key in (None, tid):
+            total += self.paused_ns.get(key, 0)
+            since = self._paused_since.get(key)
+            if since is not None:
+                total += max(0, now - since)
+        return total
+
+    def running_ns(self, tid, poll, now=None):
+        """How long `poll` has been running on `tid`, stops excluded."""
+        if now is None:
+            now = self.clock()
+        return now - poll.host_ns - (self.paused(tid, now) - poll.paused_ns)
+
+    def add_pause(self, ns, tid=None):
+        """A breakpoint handler held every thread (tid None) or `tid` stopped for `ns`."""
+        self.paused_ns[tid] = self.paused_ns.get(tid, 0) + ns
+
+    def pause(self, tid=None):
+        """A stop that lasts until resume(): the user's, or an interrupt."""
+        self._paused_since.setdefault(tid, self.clock())
+
+    def resume(self, tid=None):
+        """End the pause of `tid`; None ends every pause."""
+        now = self.clock()
+        for key in [tid] if tid is not None else list(self._paused_since):
+            since = self._paused_since.pop(key, None)
+            if since is not None:
+                self.add_pause(max(0, now - since), key)
+
+    def start(self, threshold_ms):
+        self.threshold_ns = int(threshold_ms * 1e6)
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="async-flame-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.threshold_ns = 0
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def take_request(self, tid):
+        """The poll the signal on `tid` was sent for, if it is still running."""
+        poll = self.requests.pop(tid, None)
+        stack = self.inflight.get(tid)
+        if poll is None or not stack or stack[0] is not poll:
+            return None
+        return poll
+
+    def _signal(self, tid):
+        if self._tgkill is not None:
+            return self._tgkill(self.pid, tid, SIGNAL) == 0
+        if self._sys_tgkill is not None:
+            return self._syscall(self._sys_tgkill, self.pid, tid, SIGNAL) == 0
+        return False
+
+    def check(self):
+        """Signal every thread whose outermost poll has run past the threshold."""
+        threshold = self.threshold_ns
+        if not threshold or not self.pid:
+            return
+        now = self.clock()
+        # Runs beside GDB's thread: work on snapshots and tolerate concurrent pops
+        for tid, stack in list(self.inflight.items()):
+            try:
+                outer = stack[0]
+            except IndexError:
+                continue
+            if outer.reported or tid in self.requests or self.running_ns(tid, outer, now) < threshold:
+                continue
+            outer.reported = True
+            self.requests[tid] = outer
+            if self._signal(tid):
+                self.signals += 1
+            else:
+                self.requests.pop(tid, None)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._stop.wait(min(self.threshold_ns / 4e9, 0.01) or 0.01)
+            self.check()
@@ -0,0 +1,10 @@
+import pathlib
+import sys
+
+# The tracer modules import their siblings as top-level modules (GDB loads
+# gdb_profiler/async_flame_gdb.py as a script), so both the workspace root and
+# gdb_profiler itself go on sys.path, as async_flame_gdb does.
+WORKSPACE_ROOT = pathlib.Path(__file__).resolve().parents[2]
+for path in (WORKSPACE_ROOT / "gdb_profiler", WORKSPACE_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,48 @@
+import math
+
+from allocs import SHIM_ROLES, AllocTracker, shim_spellings
+from wakes import OUTSIDE_POLL
+
+
+def test_every_allocation_without_sampling():
+    tracker = AllocTracker()
+    assert tracker.sample(1, 48) == (1.0, 48.0)
+    tracker.on_alloc(0xa0, ["app::main", "app::handler"], (1.0, 48.0))
+    tracker.on_alloc(0xb0, [], (1.0, 16.0))
+    assert tracker.on_free(0xa0) and not tracker.on_free(0xa0)
+    rows = {r["future"]: r for r in tracker.rows()}
+    assert rows["app::handler"]["bytes"] == 48 and rows["app::handler"]["live_bytes"] == 0
+    assert rows[OUTSIDE_POLL]["live_bytes"] == 16
+    assert tracker.stacks == {("app::main", "app::handler"): 48.0, (OUTSIDE_POLL,): 16.0}
+
+
+def test_sampled_allocations_are_weighted_by_their_probability():
+    tracker = AllocTracker(sample_bytes=1024, seed=1)
+    size = 4096
+    weights = [w for w in (tracker.sample(1, size) for _ in range(100)) if w is not None]
+    p = -math.expm1(-size / 1024)
+    # Allocations four times the interval are nearly always sampled
+    assert len(weights) > 90
+    assert weights[0] == (1 / p, size / p)
+
+
+def test_sampling_estimates_the_bytes_allocated():
+    tracker = AllocTracker(sample_bytes=4096, seed=7)
+    estimate = 0.0
+    for _ in range(20000):
+        weight = tracker.sample(1, 64)
+        if weight is not None:
+            estimate += weight[1]
+    assert abs(estimate - 20000 * 64) / (20000 * 64) < 0.15
+
+
+def test_set_interval_restarts_the_countdown():
+    tracker = AllocTracker(sample_bytes=1 << 20, seed=3)
+    assert tracker.sample(1, 8) is None
+    tracker.set_interval(0)
+    assert tracker.sample(1, 8) == (1.0, 8.0)
+
+
+def test_shims_have_plain_and_rustc_spellings():
+    assert set(SHIM_ROLES.values()) == {"alloc", "realloc", "dealloc"}
+    assert shim_spellings("__rust_alloc") == ("__rust_alloc", "__rustc::__rust_alloc")
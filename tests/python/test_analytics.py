@@ -0,0 +1,90 @@
+import json
+import random
+
+import numpy as np
+
+from gdb_profiler.analytics import PH_B, PH_E, Columns, pair, read_columns
+
+
+def columns(events):
+    """Columns from (ph, ts, tid, name) tuples; E names are not kept, as in read_columns."""
+    names, tids = {}, {}
+    ph = [PH_B if e[0] == "B" else PH_E for e in events]
+    name = [names.setdefault(e[3], len(names)) if e[0] == "B" else -1 for e in events]
+    tid = [tids.setdefault(e[2], len(tids)) for e in events]
+    return Columns(np.array(ph, dtype=np.uint8), np.array([e[1] for e in events], dtype=np.float64),
+                   np.array(tid, dtype=np.int32), np.array(name, dtype=np.int32), list(names), list(tids))
+
+
+def stack_pairs(events):
+    """Reference pairing with a per-thread stack: (tid, name, start, end, level, parent start).
+    Spans whose parent is never closed have no parent."""
+    stacks, spans, closed = {}, [], set()
+    for ph, ts, tid, name in events:
+        stack = stacks.setdefault(tid, [])
+        if ph == "B":
+            stack.append((name, ts))
+        elif stack:
+            b_name, start = stack.pop()
+            closed.add(start)
+            spans.append((tid, b_name, start, ts, len(stack), stack[-1][1] if stack else None))
+    return sorted(span[:5] + (span[5] if span[5] in closed else None,) for span in spans)
+
+
+def spans_of(cols):
+    spans = pair(cols)
+    return sorted((cols.tids[spans.tid[i]], cols.names[spans.name[i]], spans.start[i], spans.end[i],
+                   int(spans.level[i]), spans.start[spans.parent[i]] if spans.parent[i] >= 0 else None)
+                  for i in range(len(spans.start)))
+
+
+def test_nested_polls_on_interleaved_threads():
+    events = [("B", 0, "1", "a"), ("B", 1, "1", "b"), ("B", 2, "2", "c"), ("E", 3, "1", ""),
+              ("E", 5, "2", ""), ("E", 10, "1", ""), ("B", 12, "1", "a"), ("E", 14, "1", "")]
+    cols = columns(events)
+    assert spans_of(cols) == stack_pairs(events)
+    spans = pair(cols)
+    a = int(np.nonzero(spans.start == 0)[0][0])
+    assert (spans.dur[a], spans.self_time[a]) == (10, 8)
+
+
+def test_unbalanced_end_is_dropped():
+    # The trace starts inside a poll on thread 1
+    events = [("B", 0, "2", "c"), ("E", 1, "1", ""), ("B", 2, "1", "a"), ("B", 3, "1", "b"),
+              ("E", 4, "1", ""), ("E", 5, "1", ""), ("E", 6, "2", "")]
+    assert spans_of(columns(events)) == stack_pairs(events)
+    assert len(pair(columns(events)).start) == 3
+
+
+def test_children_of_an_unclosed_poll_have_no_parent():
+    events = [("B", 0, "1", "a"), ("E", 1, "1", ""), ("B", 2, "1", "a"), ("B", 3, "1", "b"), ("E", 4, "1", "")]
+    assert spans_of(columns(events)) == [("1", "a", 0, 1, 0, None), ("1", "b", 3, 4, 1, None)]
+
+
+def test_matches_a_stack_walk_on_random_traces():
+    rng = random.Random(5)
+    events, depth = [], {}
+    for ts in range(2000):
+        tid = rng.choice("123")
+        # Some threads start mid-poll: unmatched Es at depth 0
+        if (depth.get(tid, 0) or rng.random() < 0.05) and rng.random() < 0.5:
+            events.append(("E", ts, tid, ""))
+            depth[tid] -= 1
+        else:
+            events.append(("B", ts, tid, rng.choice("abcd")))
+            depth[tid] = depth.get(tid, 0) + 1
+    assert spans_of(columns(events)) == stack_pairs(events)
+
+
+def test_read_columns_caches_the_trace(tmp_path):
+    trace = tmp_path / "trace.json"
+    trace.write_text(json.dumps({"traceEvents": [
+        {"ph": "M", "name": "thread_name", "tid": 1},
+        {"ph": "B", "name": "a", "ts": 1.0, "tid": 1},
+        {"ph": "E", "name": "a (unwound)", "ts": 4.0, "tid": 1},
+    ]}))
+    cols = read_columns(str(trace))
+    assert (cols.names, cols.tids, cols.ph.tolist()) == (["a"], ["1"], [PH_B, PH_E])
+    assert (tmp_path / "trace.json.npz").exists()
+    cached = read_columns(str(trace))
+    assert cached.ts.tolist() == [1.0, 4.0] and cached.names == ["a"]
@@ -0,0 +1,130 @@
+from arming import PollArming, PollSite, is_pie
+
+MAIN = "app"
+LIB = "libplugin.so"
+BIAS = 0x555555554000
+LIB_BIAS = 0x7ffff7000000
+
+
+class Target:
+    """Objfiles and symbols as GDB would report them before and after `run`."""
+
+    def __init__(self, pie=True):
+        self.pie = pie
+        self.live = False
+        self.loaded = {MAIN: f"/bin/{MAIN}"}
+        self.lookups = []
+
+    def run(self, lib=False):
+        self.live = True
+        if lib:
+            self.loaded[LIB] = f"/lib/{LIB}"
+
+    def exit(self):
+        self.live = False
+        self.loaded.pop(LIB, None)
+
+    def symbol_address(self, sym):
+        self.lookups.append(sym)
+        site = SITES[sym]
+        if site.objfile == LIB:
+            return site.link_addr + LIB_BIAS if LIB in self.loaded else None
+        if self.pie:
+            return site.link_addr + BIAS if self.live else site.link_addr
+        return site.link_addr
+
+    def arming(self):
+        return PollArming(SITES, self.loaded.get, self.symbol_address, lambda: self.live,
+                          lambda: MAIN, lambda path: self.pie or path.endswith(".so"))
+
+
+SITES = {
+    "main_poll": PollSite("main_poll", "app::main", None, 0x1000),
+    "handler_poll": PollSite("handler_poll", "app::handler", None, 0x2000),
+    "plugin_poll": PollSite("plugin_poll", "plugin::run", LIB, 0x300),
+}
+
+
+def arm_all(arming, armed):
+    arming.new_pass()
+    for sym in SITES:
+        if sym not in armed:
+            arming.arm(sym, lambda spec, sym=sym: armed.setdefault(sym, spec) is not None)
+
+
+def test_pie_waits_for_the_process_and_rebiases_after_exit():
+    target = Target(pie=True)
+    arming = target.arming()
+    armed = {}
+    arm_all(arming, armed)
+    assert armed == {} and arming.pending == set(SITES)
+    assert target.lookups == []     # the main objfile was not ready: no symbol lookups
+
+    target.run(lib=True)
+    arm_all(arming, armed)
+    assert armed == {"main_poll": f"*{0x1000 + BIAS:#x}", "handler_poll": f"*{0x2000 + BIAS:#x}",
+                     "plugin_poll": f"*{0x300 + LIB_BIAS:#x}"}
+    assert arming.pending == set()
+    assert target.lookups.count("main_poll") == 1 and "handler_poll" not in target.lookups
+
+    target.exit()
+    stale = arming.on_exited(list(armed))
+    assert sorted(stale) == sorted(SITES)
+    assert arming.pending == set(SITES) and arming.bias == {}
+
+
+def test_non_pie_arms_before_run_and_keeps_its_bias():
+    target = Target(pie=False)
+    arming = target.arming()
+    armed = {}
+    arm_all(arming, armed)
+    assert armed == {"main_poll": "*0x1000", "handler_poll": "*0x2000"}
+    assert arming.pending == {"plugin_poll"}
+    assert arming.bias == {MAIN: 0} and arming.live_biased == set()
+
+    target.exit()
+    assert arming.on_exited(list(armed)) == []
+    assert arming.bias == {MAIN: 0}
+
+
+def test_shared_object_stays_pending_until_loaded():
+    target = Target(pie=False)
+    arming = target.arming()
+    armed = {}
+    target.run()
+    arm_all(arming, armed)
+    assert "plugin_poll" in arming.pending
+    assert arming.objfile_bias(LIB) is None and LIB not in arming.bias
+    assert "plugin_poll" not in target.lookups
+
+    target.run(lib=True)
+    arm_all(arming, armed)
+    assert armed["plugin_poll"] == f"*{0x300 + LIB_BIAS:#x}"
+    assert arming.live_biased == {MAIN, LIB}
+
+    target.exit()
+    assert sorted(arming.on_exited(list(armed))) == sorted(SITES)
+
+
+def test_failed_creation_keeps_the_symbol_pending():
+    arming = Target(pie=False).arming()
+    assert not arming.arm("main_poll", lambda spec: False)
+    assert arming.pending == {"main_poll"}
+    assert arming.arm("main_poll", lambda spec: True)
+    assert arming.pending == set()
+
+
+def test_maps_without_addresses_arm_by_symbol():
+    sites = {"poll": PollSite("poll", "app::main", None, None)}
+    arming = PollArming(sites, lambda name: "/bin/app", lambda sym: None, lambda: True, lambda: "app")
+    assert arming.location("poll") == "poll"
+
+
+def test_elf_type(tmp_path):
+    def elf(name, e_type):
+        path = tmp_path / name
+        path.write_bytes(b"\x7fELF" + bytes(12) + e_type.to_bytes(2, "little"))
+        return str(path)
+    assert is_pie(elf("pie", 3)) and is_pie(elf("lib.so", 3))
+    assert not is_pie(elf("static", 2))
+    assert is_pie(str(tmp_path / "missing"))
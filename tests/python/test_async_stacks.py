@@ -0,0 +1,50 @@
+import json
+
+from gdb_profiler.analytics import pair
+from gdb_profiler.async_stacks import GapFiller, fold, load_dependency_tree, write_folded
+from test_analytics import columns
+
+EVENTS = [
+    # Thread 1: root -> A -> C, self times 3, 4, 3
+    ("B", 0, "1", "root"), ("B", 1, "1", "A"), ("B", 2, "1", "C"), ("E", 5, "1", ""), ("E", 8, "1", ""),
+    ("E", 10, "1", ""),
+    # Thread 2: root alone, self time 4
+    ("B", 20, "2", "root"), ("E", 24, "2", ""),
+    # Thread 3: Y inside an X that never returns
+    ("B", 30, "3", "X"), ("B", 31, "3", "Y[u8; 4]"), ("E", 33, "3", ""),
+]
+
+
+def folded(gaps=None, per_thread=False):
+    cols = columns(EVENTS)
+    return fold(pair(cols), cols.names, cols.tids, gaps, per_thread)
+
+
+def test_stacks_are_weighted_by_self_time():
+    assert folded() == {"root": 7.0, "root;A": 4.0, "root;A;C": 3.0, "Y[u8, 4]": 2.0}
+
+
+def test_per_thread_roots():
+    assert folded(per_thread=True) == {"thread 1;root": 3.0, "thread 1;root;A": 4.0, "thread 1;root;A;C": 3.0,
+                                       "thread 2;root": 4.0, "thread 3;Y[u8, 4]": 2.0}
+
+
+def test_gap_frames_from_the_dependency_tree(tmp_path):
+    deps = tmp_path / "deps.json"
+    deps.write_text(json.dumps({"dependency_tree": {"A": ["B", "B2", "C"], "B": ["B2", "C"], "B2": ["C"]}}))
+    gaps = GapFiller(load_dependency_tree(deps))
+    assert gaps.between("A", "C") == ["B", "B2"]
+    assert gaps.between("root", "A") == []
+    assert folded(gaps)["root;A;B_[i];B2_[i];C"] == 3.0
+
+
+def test_ambiguous_gaps_are_left_open():
+    # B and D both contain C, but neither contains the other
+    gaps = GapFiller({"A": {"B", "D", "C"}, "B": {"C"}, "D": {"C"}})
+    assert gaps.between("A", "C") == []
+
+
+def test_write_folded_skips_zero_weights(tmp_path):
+    out = tmp_path / "out.folded"
+    write_folded({"root;A": 4.4, "root": 0.2, "root;B": 2.6}, out)
+    assert out.read_text() == "root;A 4\nroot;B 3\n"
@@ -0,0 +1,27 @@
+from gdb_profiler.runtime_plugins.async_task import LAP, SHIFT, unbounded_len
+
+
+def index(position, flag=0):
+    """concurrent_queue index of a queue position, with the low flag bit."""
+    return position << SHIFT | flag
+
+
+def test_empty_and_within_first_block():
+    assert unbounded_len(index(0), index(0)) == 0
+    assert unbounded_len(index(0), index(3)) == 3
+    # Flag bits (HAS_NEXT on the head, MARK_BIT on the tail) are not part of the position
+    assert unbounded_len(index(2, 1), index(5, 1)) == 3
+
+
+def test_block_boundary_slot_is_skipped():
+    # A block holds LAP - 1 values; the last position of each lap is never used
+    assert unbounded_len(index(0), index(LAP)) == LAP - 1
+    assert unbounded_len(index(0), index(LAP + 9)) == LAP - 1 + 9
+    # The tail sitting on the boundary slot is counted as the next block's start
+    assert unbounded_len(index(0), index(LAP - 1)) == LAP - 1
+
+
+def test_head_in_a_later_lap():
+    # 40 pushed, 34 popped: the head has crossed one boundary, the tail too
+    assert unbounded_len(index(LAP + 3), index(LAP + 9)) == 6
+    assert unbounded_len(index(5 * LAP + 1), index(7 * LAP + 2)) == 2 * (LAP - 1) + 1
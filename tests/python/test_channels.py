@@ -0,0 +1,33 @@
+from channels import ChannelTracker
+
+BOUNDED = {"channel": 0x100, "kind": "mpsc bounded", "capacity": 2, "semaphore": 0x180}
+
+
+def test_full_and_empty_time_follow_the_last_length():
+    tracker = ChannelTracker()
+    tracker.sample("recv", dict(BOUNDED, len=0), 0)
+    tracker.sample("send", dict(BOUNDED, len=1), 100)
+    tracker.sample("send", dict(BOUNDED, len=2), 150)
+    tracker.sample("recv", dict(BOUNDED, len=1), 450)
+    [row] = tracker.rows()
+    assert (row["sends"], row["recvs"], row["recvs_empty"], row["max_len"]) == (2, 2, 1, 2)
+    assert (row["observed_us"], row["empty_us"], row["full_us"]) == (0.45, 0.1, 0.3)
+    assert row["semaphore"] == "0x180"
+
+
+def test_unknown_length_only_counts_the_operation():
+    tracker = ChannelTracker()
+    state = {"channel": 0x200, "kind": "mpsc unbounded"}
+    tracker.sample("send", state, 0)
+    tracker.sample("recv", state, 10)
+    [row] = tracker.rows()
+    assert (row["sends"], row["recvs"], row["recvs_empty"], row["observed_us"]) == (1, 1, 0, 0)
+    assert row["capacity"] is None and row["semaphore"] is None
+
+
+def test_broadcast_receivers_are_separate_channels():
+    tracker = ChannelTracker()
+    for receiver, length in ((0x10, 0), (0x20, 3)):
+        tracker.sample("recv", {"channel": 0x300, "receiver": receiver, "kind": "broadcast",
+                                "capacity": 4, "len": length}, 0)
+    assert sorted(r["channel"] for r in tracker.rows()) == ["0x300 rx 0x10", "0x300 rx 0x20"]
@@ -0,0 +1,59 @@
+import json
+import math
+
+import numpy as np
+
+from gdb_profiler.compare import Run, canonical, compare, mann_whitney
+
+
+def test_mann_whitney_separated_samples():
+    p, p_slower = mann_whitney(np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0, 6.0]))
+    # U = 9 of 9, z = 4.5 / sqrt(5.25)
+    assert p_slower == 1.0
+    assert math.isclose(p, 0.5 * math.erfc(4.5 / math.sqrt(5.25) / math.sqrt(2)))
+    p, p_slower = mann_whitney(np.array([4.0, 5.0, 6.0]), np.array([1.0, 2.0, 3.0]))
+    assert p_slower == 0.0 and p > 0.95
+
+
+def test_mann_whitney_ties():
+    # Average ranks: 1 -> 1.5, 2 -> 3.5, 3 -> 5.5; U = 3.5 + 5.5 + 5.5 - 6 = 8.5
+    p, p_slower = mann_whitney(np.array([1.0, 1.0, 2.0]), np.array([2.0, 3.0, 3.0]))
+    assert p_slower == 8.5 / 9
+    var = 9 / 12 * (7 - 18 / 30)
+    assert math.isclose(p, 0.5 * math.erfc((8.5 - 4.5) / math.sqrt(var) / math.sqrt(2)))
+    # All equal: no evidence either way
+    assert mann_whitney(np.array([1.0, 1.0]), np.array([1.0, 1.0])) == (1.0, 0.5)
+
+
+def write_trace(path, durations):
+    events, ts = [], 0.0
+    for name, values in durations.items():
+        for d in values:
+            events += [{"ph": "B", "name": name, "ts": ts, "tid": 1}, {"ph": "E", "ts": ts + d, "tid": 1}]
+            ts += d + 1
+    path.write_text(json.dumps({"traceEvents": events}))
+    return str(path)
+
+
+def test_compare_flags_slower_futures(tmp_path):
+    rng = np.random.default_rng(0)
+    before = write_trace(tmp_path / "before.json", {
+        "app::slow<0x1a>": rng.uniform(10, 12, 40), "app::same<0x1b>": rng.uniform(10, 12, 40),
+        "app::gone": [5.0] * 40})
+    after = write_trace(tmp_path / "after.json", {
+        "app::slow<0x2a>": rng.uniform(14, 16, 40), "app::same<0x2b>": rng.uniform(10, 12, 40),
+        "app::new": [5.0] * 40})
+    result = compare(Run(before, cache=False), Run(after, cache=False))
+    rows = {r["name"]: r for r in result["futures"]}
+    assert set(rows) == {"app::slow", "app::same"}
+    assert rows["app::slow"]["regressed"] and not rows["app::same"]["regressed"]
+    assert result["futures"][0]["name"] == "app::slow"
+    assert (result["only_before"], result["only_after"]) == (["app::gone"], ["app::new"])
+
+
+def test_too_few_polls_are_not_tested(tmp_path):
+    before = write_trace(tmp_path / "before.json", {"app::f": [10.0] * 5})
+    after = write_trace(tmp_path / "after.json", {"app::f": [50.0] * 5})
+    [row] = compare(Run(before, cache=False), Run(after, cache=False))["futures"]
+    assert row["p_value"] is None and row["regressed"] == []
+    assert canonical("app::f<0xdeadbeef>::{{closure}}") == "app::f::{{closure}}"
@@ -0,0 +1,105 @@
+import struct
+
+import pytest
+
+from gdb_debugger.core_dump import NT_FILE, PT_LOAD, PT_NOTE, CoreMemory, ElfImage, load_bias, main, scan_pointers
+
+PAGE = 0x1000
+PF_R, PF_W = 4, 2
+
+
+def note(note_type, desc):
+    name = b"CORE\0"
+    pad = lambda b: b + b"\0" * (-len(b) % 4)
+    return struct.pack("<III", len(name), len(desc), note_type) + pad(name) + pad(desc)
+
+
+def nt_file(mappings):
+    """NT_FILE descriptor for [(start, end, page offset, path)]."""
+    desc = struct.pack("<QQ", len(mappings), PAGE)
+    desc += b"".join(struct.pack("<QQQ", start, end, page) for start, end, page, _ in mappings)
+    return note(NT_FILE, desc + b"".join(path.encode() + b"\0" for *_, path in mappings))
+
+
+def write_elf(path, segments, notes=b""):
+    """ELF64 LE file with one PT_LOAD per (vaddr, flags, data), each at file offset (i + 1) * PAGE."""
+    phnum = len(segments) + bool(notes)
+    note_offset = 64 + 56 * phnum
+    phdrs = b""
+    if notes:
+        phdrs += struct.pack("<IIQQQQQQ", PT_NOTE, 0, note_offset, 0, 0, len(notes), 0, 4)
+    for i, (vaddr, flags, data) in enumerate(segments):
+        phdrs += struct.pack("<IIQQQQQQ", PT_LOAD, flags, (i + 1) * PAGE, vaddr, vaddr, len(data), len(data), PAGE)
+    header = b"\x7fELF" + bytes([2, 1, 1]) + bytes(9)
+    header += struct.pack("<HHIQQQIHHHHHH", 4, 62, 1, 0, 64, 0, 0, 64, 56, phnum, 0, 0, 0)
+    image = bytearray(header + phdrs + notes)
+    for i, (_, _, data) in enumerate(segments):
+        image += bytes((i + 1) * PAGE - len(image)) + data
+    path.write_bytes(bytes(image))
+    return str(path)
+
+
+@pytest.fixture
+def images(tmp_path):
+    opened = []
+
+    def open_image(name, segments, notes=b""):
+        image = ElfImage(write_elf(tmp_path / name, segments, notes))
+        opened.append(image)
+        return image
+    yield open_image
+    for image in opened:
+        image.close()
+
+
+def test_reads_within_and_across_segments(images):
+    core = images("core", [(0x10000, PF_R | PF_W, bytes(range(16))), (0x10010, PF_R, bytes(range(16, 32)))])
+    assert bytes(core.read_memory(0x10004, 4)) == bytes([4, 5, 6, 7])
+    # Adjacent segments read as one range
+    assert bytes(core.read_memory(0x1000c, 8)) == bytes(range(12, 20))
+    assert core.read_memory(0x10018, 16) is None
+    assert core.read_memory(0xfff0, 4) is None
+
+
+def test_rejects_other_files(tmp_path):
+    (tmp_path / "big").write_bytes(b"\x7fELF" + bytes([2, 2]) + bytes(58))
+    with pytest.raises(ValueError):
+        ElfImage(str(tmp_path / "big"))
+
+
+def test_binary_fills_in_undumped_pages(images, tmp_path):
+    base = 0x555555554000
+    core = images("core", [(0x7ff000, PF_R | PF_W, struct.pack("<Q", 0xabc))],
+                  nt_file([(0x7f0000, 0x7f1000, 0, "/usr/lib/libc.so.6"),
+                           (base + PAGE, base + 2 * PAGE, 1, "/opt/app/app")]))
+    binary = images("app", [(PAGE, PF_R, struct.pack("<QQ", 0x1111, 0x2222))])
+    assert core.file_mappings()[1] == (base + PAGE, base + 2 * PAGE, PAGE, "/opt/app/app")
+    assert binary.link_base == 0
+    binary.bias = load_bias(core, binary)
+    assert binary.bias == base
+    memory = CoreMemory(core, binary)
+    assert memory.read_int(base + PAGE + 8, 8) == 0x2222
+    assert memory.read_int(0x7ff000, 8) == 0xabc
+    assert memory.read_int(0x10, 8) is None
+
+
+def test_scan_pointers_finds_aligned_targets(images):
+    targets = {0x555555556010, 0x555555556020}
+    data = bytearray(64)
+    struct.pack_into("<Q", data, 8, 0x555555556010)
+    struct.pack_into("<Q", data, 17, 0x555555556020)    # unaligned
+    struct.pack_into("<Q", data, 32, 0x555555556030)    # same high bytes, not a target
+    struct.pack_into("<Q", data, 48, 0x555555556020)
+    core = images("core", [(0x20000, PF_R | PF_W, bytes(data)), (0x30000, PF_R, struct.pack("<Q", 0x555555556010))])
+    assert list(scan_pointers(core, targets)) == [0x20008, 0x20030]
+    assert list(scan_pointers(core, targets, writable_only=False)) == [0x20008, 0x20030, 0x30000]
+    assert list(scan_pointers(core, set())) == []
+
+
+def test_main_requires_exported_layouts(tmp_path, capsys):
+    assert main(["core_dump", "core", "app"]) == 1
+    assert "vtables" in capsys.readouterr().out
+    missing = tmp_path / "app.layouts.json"
+    assert main(["core_dump", "core", "app", str(missing)]) == 1
+    assert f"python -m dwarf_analyzer.layouts app {missing}" in capsys.readouterr().out
+    assert not missing.exists()
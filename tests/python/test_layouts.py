@@ -0,0 +1,32 @@
+from dwarf_analyzer.layouts import StructLayouts
+
+INJECT = "tokio::runtime::scheduler::inject::shared::Shared<alloc::sync::Arc<Handle>>"
+
+
+def layouts():
+    return StructLayouts({"structs": [
+        # A user struct with the same shape, listed first
+        {"name": "Shared<app::Config>", "qualified_name": "app::state::Shared<app::Config>",
+         "type_id": "1", "size": 16, "members": {"len": 8, "data": 0}},
+        {"name": "Shared<alloc::sync::Arc<Handle>>", "qualified_name": INJECT,
+         "type_id": "2", "size": 8, "members": {"len": 0, "_p": 8}},
+        {"name": "Worker", "qualified_name": "tokio::runtime::scheduler::multi_thread::worker::Worker",
+         "type_id": "3", "size": 32, "members": {"handle": 0, "index": 8, "core": 16}},
+    ]})
+
+
+def test_bare_name_lookup_takes_the_first_match():
+    assert layouts().offset(r"Shared<.*>", "len") == 8
+    assert layouts().offset("Worker", "index", ("handle", "core")) == 8
+    assert layouts().offset("Worker", "index", ("missing",)) is None
+
+
+def test_qualified_lookup_is_anchored():
+    pattern = r"tokio::runtime::scheduler::inject::(shared::Shared|Inject)<.*>"
+    assert layouts().offset(pattern, "len", qualified=True) == 0
+    assert layouts().offset(r"Shared<.*>", "len", qualified=True) is None
+
+
+def test_layouts_without_qualified_names_find_nothing_qualified():
+    old = StructLayouts({"structs": [{"name": "Inject<T>", "type_id": "1", "size": 8, "members": {"len": 0}}]})
+    assert old.offset(r"tokio::runtime::scheduler::inject::(shared::Shared|Inject)<.*>", "len", qualified=True) is None
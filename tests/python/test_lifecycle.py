@@ -0,0 +1,32 @@
+from gdb_debugger.lifecycle import build_lifecycles, spawn_site_stats
+
+SYMBOLS = {"new": "spawn", "poll": "poll", "shutdown": "shutdown", "dealloc": "dealloc"}
+
+
+def call(ts, lwp, entry=None, exit_=None):
+    return {"timestamp": ts, "thread_id": (1, lwp, 0), "entry_tracers": entry or {}, "exit_tracers": exit_ or {}}
+
+
+def test_lifecycles_join_on_task_pointer_and_handle_reuse():
+    data = {
+        "spawn": [call(0, 10, {"id": 1, "stack": "main"}, {"ptr": 0xa0}),
+                  call(50, 10, {"id": 2, "stack": "main"}, {"ptr": 0xa0}),
+                  call(60, 10, {"id": 3, "stack": "worker"}, {"ptr": "Error: unreadable"})],
+        "poll": [call(5, 11, {"ptr": 0xa0}), call(7, 12, {"ptr": 0xa0}), call(55, 11, {"ptr": 0xa0}),
+                 call(8, 11, {"ptr": 0xff})],
+        "shutdown": [call(9, 11, {"ptr": 0xa0})],
+        # The first task is freed before its pointer is reused by the second
+        "dealloc": [call(10, 11, {"ptr": 0xa0})],
+    }
+    tasks, orphans = build_lifecycles(data, SYMBOLS, "id", "ptr", "stack", "ptr")
+    first, second, third = tasks
+    assert [ts for ts, _ in first.polls] == [5, 7] and first.polls[1][1] == 12
+    assert (first.shutdown_ts, first.lifetime_ns) == (9, 10)
+    assert [ts for ts, _ in second.polls] == [55] and second.lifetime_ns is None
+    assert third.ptr is None
+    assert orphans == 1
+
+    rows = {r["site"]: r for r in spawn_site_stats(tasks, lambda stack: stack)}
+    assert rows["main"]["tasks"] == 2 and rows["main"]["not_deallocated"] == 1
+    assert rows["main"]["lifetime_us_p50"] == 10 / 1e3
+    assert rows["worker"]["never_polled"] == 1
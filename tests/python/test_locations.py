@@ -0,0 +1,24 @@
+from gdb_debugger.tracers.locations import SIMPLE_EXPR, parse_location
+
+
+def test_simple_expressions():
+    for expr in ("self", "id.__0", "self.ptr.pointer"):
+        assert SIMPLE_EXPR.fullmatch(expr)
+    for expr in ("(*self.incoming.ptr.pointer).value", "a[0]", "*self", "self->x", "a.b + 1", "0x10"):
+        assert not SIMPLE_EXPR.fullmatch(expr)
+
+
+def test_info_address_descriptions():
+    assert parse_location('Symbol "self" is a variable in $rdi.') == ("rdi", 0, True)
+    assert parse_location('Symbol "self" is a variable at frame base reg $rbp offset 16+-40.') == ("rbp", -24, False)
+    assert parse_location('Symbol "cx" is a variable at offset 8 from base reg $rsp.') == ("rsp", 8, False)
+    assert parse_location('Symbol "x" is a variable at offset -16 from base reg $x29.') == ("x29", -16, False)
+    assert parse_location('Symbol "COUNTER" is static storage at address 0x4c6f0.') == (None, 0x4c6f0, False)
+
+
+def test_locations_without_a_plan():
+    for desc in ('Symbol "self" is multi-location:\n  Range 0x1000-0x1010: a variable in $rdi\n',
+                 'Symbol "self" is a variable with complex DWARF expression locating its address in memory.',
+                 'Symbol "self" is optimized out.',
+                 'Symbol "TLS" is a thread-local variable at offset 0x10 in the thread-local storage for `app`.'):
+        assert parse_location(desc) is None
@@ -0,0 +1,57 @@
+from locks import LockTracker
+from spans import decode_poll_outcome
+from test_spans import ACQUIRE_RESULT, FakeValue
+
+PENDING = FakeValue(f"core::task::poll::Poll<{ACQUIRE_RESULT}>::Pending")
+READY = FakeValue(f"core::task::poll::Poll<{ACQUIRE_RESULT}>::Ready({ACQUIRE_RESULT}::Ok(()))")
+LOCK = 0x1000
+
+
+def poll(tracker, acquire, waiter, ts, value):
+    """What LockFinishBP.stop does with the return value of Acquire::poll."""
+    return tracker.on_acquire_poll(acquire, LOCK, waiter, ts, decode_poll_outcome(value))
+
+
+def test_decoded_acquire_results_close_the_wait():
+    tracker = LockTracker()
+    assert poll(tracker, 0xa, "holder", 0, READY) == []
+    assert poll(tracker, 0xb, "waiter", 10, PENDING) == [("wait_begin", None)]
+    # Later Pending polls of the same acquisition don't restart the wait
+    assert poll(tracker, 0xb, "waiter", 20, PENDING) == []
+    flow = tracker.on_release(LOCK, "holder")
+    assert flow == "lock1"
+    assert poll(tracker, 0xb, "waiter", 110, READY) == [("wait_end", 100), ("handoff", ("lock1", "holder"))]
+    [row] = tracker.rows()
+    assert (row["acquires"], row["contended"], row["wait_us_total"]) == (2, 1, 0.1)
+    assert row["waiters"] == [{"future": "waiter", "waits": 1, "wait_us": 0.1}]
+    assert row["releasers"] == {"holder": 1}
+    assert tracker.waiting == {}
+
+
+def test_uncontended_release_starts_no_flow():
+    tracker = LockTracker()
+    poll(tracker, 0xa, "holder", 0, READY)
+    assert tracker.on_release(LOCK, "holder") is None
+    assert tracker.rows() == []
+
+
+def test_cancelled_waiter_drops_its_handoff():
+    tracker = LockTracker()
+    poll(tracker, 0xb, "b", 0, PENDING)
+    poll(tracker, 0xc, "c", 0, PENDING)
+    assert tracker.on_release(LOCK, "holder") == "lock1"
+    assert tracker.on_release(LOCK, "holder") == "lock2"
+    assert tracker.on_cancel(0xc)
+    assert not tracker.on_cancel(0xc)
+    # One waiter left: only the oldest handoff still has someone to go to
+    assert tracker.handoffs[LOCK] == [("lock1", "holder")]
+    assert poll(tracker, 0xb, "b", 50, READY)[-1] == ("handoff", ("lock1", "holder"))
+    [row] = tracker.rows()
+    assert (row["contended"], row["cancelled"]) == (1, 1)
+
+
+def test_reused_acquire_address_counts_as_cancelled():
+    tracker = LockTracker()
+    poll(tracker, 0xb, "b", 0, PENDING)
+    assert tracker.on_acquire_poll(0xb, 0x2000, "b", 5, "Pending") == [("wait_begin", None)]
+    assert tracker.locks[LOCK].cancelled == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from dwarf_analyzer import export_map, layouts
+from dwarf_analyzer.main import DwarfAnalyzer
+from gdb_profiler import orchestrate
+
+
+def test_failed_export_leaves_no_tmp_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(DwarfAnalyzer, "parse_dwarf", lambda self: None)
+
+    def broken(binary, out_json, analyzer=None):
+        raise RuntimeError("objdump output changed")
+
+    monkeypatch.setattr(layouts, "export", broken)
+    monkeypatch.setattr(export_map, "export", lambda binary, out_json, analyzer=None: open(out_json, "w").close())
+    out_dir = tmp_path / "cache" / "abc"
+    with pytest.raises(RuntimeError):
+        orchestrate.analyze("/bin/true", str(out_dir))
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_analysis_is_published_atomically(tmp_path, monkeypatch):
+    monkeypatch.setattr(DwarfAnalyzer, "parse_dwarf", lambda self: None)
+    for module in (export_map, layouts):
+        monkeypatch.setattr(module, "export", lambda binary, out_json, analyzer=None: open(out_json, "w").close())
+    out_dir = tmp_path / "abc"
+    orchestrate.analyze("/bin/true", str(out_dir))
+    # A second analysis of the same binary loses the race and cleans up after itself
+    orchestrate.analyze("/bin/true", str(out_dir))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["abc"]
+    assert sorted(p.name for p in out_dir.iterdir()) == ["future_map.json", "type_layouts.json"]
+
+
+def test_binary_key_follows_content(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    a.write_bytes(b"\x7fELF one")
+    b.write_bytes(b"\x7fELF one")
+    assert orchestrate.binary_key(a) == orchestrate.binary_key(b)
+    b.write_bytes(b"\x7fELF two")
+    assert orchestrate.binary_key(a) != orchestrate.binary_key(b)
+
+
+def test_cargo_package(tmp_path):
+    (tmp_path / "Cargo.toml").write_text('[package]\nname = "demo"\nversion = "0.1.0"\n\n[dependencies]\nname = "x"\n')
+    assert orchestrate.cargo_package(tmp_path) == "demo"
@@ -0,0 +1,35 @@
+from overhead import OverheadTracker
+
+
+def test_finish_time_is_charged_to_the_poll_site():
+    tracker = OverheadTracker()
+    tracker.record("sym", "poll", "app::handler", 3000)
+    tracker.record("sym", "poll", "app::handler", 1000, finish=True)
+    site = tracker.sites["sym"]
+    assert (site.hits, site.ns, site.finish_hits, site.finish_ns, site.total_ns) == (1, 3000, 1, 1000, 4000)
+    assert tracker.total_ns() == 4000
+
+
+def test_budget_disarms_a_site_once():
+    tracker = OverheadTracker()
+    tracker.budget_ns = 10_000
+    assert not tracker.record("a", "poll", "a", 6000)
+    # Crossing the budget on a finish hit counts too
+    assert tracker.record("a", "poll", "a", 6000, finish=True)
+    assert not tracker.record("a", "poll", "a", 6000)
+    assert not tracker.record(("alloc", "malloc"), "alloc", "malloc", 9000)
+    assert [key for key, s in tracker.sites.items() if s.disarmed] == ["a"]
+
+
+def test_report_groups_poll_sites_by_future():
+    tracker = OverheadTracker()
+    tracker.budget_ns = 5_000_000
+    tracker.record("sym1", "poll", "app::handler", 2_000_000)
+    tracker.record("sym2", "poll", "app::handler", 1_000_000)
+    tracker.record(("alloc", "malloc"), "alloc", "malloc", 500_000)
+    lines = tracker.report()
+    assert lines[0] == "total handler time 3.5 ms over 3 breakpoints"
+    assert lines[1] == "budget 5 ms per breakpoint, 0 disarmed"
+    assert lines[-1].split() == ["2", "polls", "3.00", "ms", "app::handler"]
+    tracker.reset()
+    assert tracker.total_ns() == 0
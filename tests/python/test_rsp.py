@@ -0,0 +1,184 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from gdb_profiler.rsp import RspClient, RspError, Stop, checksum, decode, thread_id
+from gdb_profiler.rsp_trace import ARCHES, PollSite, RspTracer, coroutine_outcome, load_poll_sites
+
+
+def frame(payload: bytes) -> bytes:
+    return b"$%s#%02x" % (payload, checksum(payload))
+
+
+def test_checksum_and_decode():
+    assert checksum(b"OK") == 0x9A
+    # '0* ' is '0' repeated 3 more times (' ' is 32 = 29 + 3)
+    assert decode(b"0* ") == b"0000"
+    assert decode(b"a}\x03b") == b"a#b"
+    assert decode(b"x}\x5d") == b"x}"
+
+
+def test_thread_id():
+    assert thread_id("p1a.1b") == (0x1a, 0x1b)
+    assert thread_id("p1a") == (0x1a, -1)
+    assert thread_id("2f") == (None, 0x2f)
+
+
+def test_stop_reply():
+    stop = Stop(b"T05thread:p10.11;07:0800000000000000;10:xxxxxxxxxxxxxxxx;swbreak:;")
+    assert (stop.kind, stop.signal, stop.pid, stop.tid) == ("T", 5, 0x10, 0x11)
+    assert stop.register(7) == 8
+    assert stop.register(16) is None
+    assert not stop.exited
+    exited = Stop(b"W2a;process:10")
+    assert exited.exited and exited.signal == 0x2a
+
+
+class FakeStub:
+    """Scripted stub on a local socket: replies to each request from `replies` in order."""
+
+    def __init__(self, replies, noise=b""):
+        self.server = socket.socket()
+        self.server.bind(("localhost", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.replies = list(replies)
+        self.noise = noise
+        self.requests = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        conn, _ = self.server.accept()
+        buf = b""
+        with conn:
+            while self.replies:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                buf += data
+                while True:
+                    buf = buf.lstrip(b"+-")
+                    start, end = buf.find(b"$"), buf.find(b"#")
+                    if start == -1 or end == -1 or len(buf) < end + 3:
+                        break
+                    self.requests.append(buf[start + 1:end])
+                    buf = buf[end + 3:]
+                    # An ack, an ignored notification, then the (run-length encoded) reply
+                    conn.sendall(b"+" + self.noise + frame(self.replies.pop(0)))
+
+
+def test_client_handshake_and_pipeline():
+    stub = FakeStub([b"PacketSize=1000;QStartNoAckMode+;multiprocess+;binary-upload-", b"OK",
+                     b"OK", b"0* ", b"E01"], noise=b"%Stop:T05#b8")
+    client = RspClient("localhost", stub.port, timeout=5)
+    try:
+        features = client.handshake()
+        assert features["PacketSize"] == "1000" and features["multiprocess"] and not features["binary-upload"]
+        assert not client.ack
+        assert client.thread_text(1, 2) == "p1.2"
+        assert client.pipeline(["Hgp1.2", "p10", "m1000,8"]) == [b"OK", b"0000", b"E01"]
+        assert client.round_trips == 3 and client.packets == 5
+        with pytest.raises(RspError):
+            client.check(b"E01")
+    finally:
+        client.close()
+    assert stub.requests[2:] == [b"Hgp1.2", b"p10", b"m1000,8"]
+
+
+def test_packet_builders():
+    assert RspClient.breakpoint_packet(0x401000) == "Z0,401000,1"
+    assert RspClient.breakpoint_packet(0x401000, insert=False) == "z0,401000,1"
+    assert RspClient.register_packet(16) == "p10"
+    assert RspClient.parse_register(b"0100000000000000") == 1
+    assert RspClient.parse_register(b"xxxxxxxx") is None
+
+
+def test_coroutine_outcome():
+    assert coroutine_outcome(1) == "Ready"
+    assert coroutine_outcome(3) == "Pending"
+    assert coroutine_outcome(7) == "Pending"
+    assert coroutine_outcome(0) is None     # Unresumed after a poll: not a coroutine state
+    assert coroutine_outcome(2) is None     # Panicked
+    assert coroutine_outcome(None) is None
+
+
+def test_load_poll_sites(tmp_path):
+    future_map = {
+        "0x10": {"name": "app::run::{async_fn_env#0}", "poll_symbol": "_ZN3app3run", "poll_addr": "0x1000",
+                 "objfile": "app", "discr_offset": 24},
+        "0x20": {"name": "Timeout<F>", "poll_symbol": "_ZN7Timeout4poll", "poll_addr": "0x2000", "objfile": "app"},
+        "0x30": {"name": "lib::Fut", "poll_symbol": "_ZN3lib", "poll_addr": "0x3000", "objfile": "libother.so"},
+        "0x40": {"name": "NoPoll", "poll_symbol": ""},
+    }
+    path = tmp_path / "future_map.json"
+    path.write_text(json.dumps(future_map))
+    sites = load_poll_sites(path, "/some/dir/app")
+    assert sorted(sites) == [0x1000, 0x2000]
+    assert (sites[0x1000].name, sites[0x1000].discr_offset) == ("app::run::{async_fn_env#0}", 24)
+    assert sites[0x2000].discr_offset is None
+
+
+class ScriptedClient(RspClient):
+    """RspClient without a socket: replies to reads from an in-memory target."""
+
+    def __init__(self, registers, memory):
+        self.ack = False
+        self.features = {"multiprocess": True}
+        self.packets = self.round_trips = 0
+        self.registers = registers
+        self.memory = memory
+        self.sent = []
+
+    def pipeline(self, payloads):
+        self.sent.extend(payloads)
+        replies = []
+        for p in payloads:
+            if p.startswith("p"):
+                replies.append(self.registers[int(p[1:], 16)].to_bytes(8, "little").hex().encode())
+            else:
+                replies.append(b"OK")
+        return replies
+
+    def read_memory(self, address, length):
+        self.sent.append(f"m{address:x},{length:x}")
+        return bytes(self.memory.get(address + i, 0) for i in range(length))
+
+
+def test_tracer_reads_outcome_from_coroutine_state():
+    arch = ARCHES[183]   # aarch64: self in x0, return address in x30
+    polls = {0x1000: PollSite("run", 24), 0x2000: PollSite("Timeout", None)}
+    client = ScriptedClient({0: 0x7000, 30: 0x5555}, {0x7000 + 24: 3})
+    tracer = RspTracer(client, arch, polls)
+    entry = Stop(b"T05thread:p1.2;")
+    assert tracer.on_poll(entry, 0x1000, 0x9000, 100) == ["Z0,5555,1"]
+    # Returned Pending: the coroutine is suspended
+    assert tracer.on_return(entry, 0x5555, 0x9000, 150) == ["z0,5555,1"]
+    client.memory[0x7000 + 24] = 1
+    tracer.on_poll(entry, 0x1000, 0x9000, 200)
+    tracer.on_return(entry, 0x5555, 0x9000, 260)
+    # A future that is not an async fn: no state to read, outcome unknown
+    tracer.on_poll(entry, 0x2000, 0x9000, 300)
+    tracer.on_return(entry, 0x5555, 0x9000, 310)
+    outcomes = [ev["args"]["outcome"] for ev in tracer.trace_events if ev["ph"] == "e" and ev["name"] == "poll"]
+    assert outcomes == ["Pending", "Ready", "unknown"]
+    [row] = [r for r in tracer.instances.rows() if r["name"] == "run"]
+    assert (row["completed"], row["polls_max"]) == (1, 2)
+    assert tracer.returns == {} and tracer.stacks[2] == []
+
+
+def test_tracer_unwinds_frames_left_by_a_panic():
+    arch = ARCHES[183]
+    client = ScriptedClient({0: 0x7000, 30: 0x5555}, {})
+    tracer = RspTracer(client, arch, {0x1000: PollSite("outer", None), 0x2000: PollSite("inner", None)})
+    stop = Stop(b"T05thread:p1.2;")
+    tracer.on_poll(stop, 0x1000, 0x9000, 0)
+    client.registers[30] = 0x6666
+    tracer.on_poll(stop, 0x2000, 0x8000, 10)
+    # `outer` returns without `inner` having returned: inner was unwound
+    packets = tracer.on_return(stop, 0x5555, 0x9000, 20)
+    assert sorted(packets) == ["z0,5555,1", "z0,6666,1"]
+    ends = [(ev["name"], ev["cat"]) for ev in tracer.trace_events if ev["ph"] == "E"]
+    assert ends == [("inner", "future_poll_unwind"), ("outer", "future_poll")]
@@ -0,0 +1,106 @@
+import importlib
+import sys
+import types
+
+import pytest
+
+PAGE = 4096
+
+
+class MemoryError(Exception):
+    pass
+
+
+class FakeInferior:
+    """Flat memory where every page reads as its own index byte; pages in
+    `unmapped` raise like gdb.Inferior.read_memory does."""
+
+    def __init__(self, unmapped=()):
+        self.unmapped = set(unmapped)
+        self.reads = []
+
+    def read_memory(self, address, length):
+        self.reads.append((address, length))
+        first = address // PAGE
+        last = (address + length - 1) // PAGE
+        if any(page in self.unmapped for page in range(first, last + 1)):
+            raise MemoryError(f"Cannot access memory at address 0x{address:x}")
+        return memoryview(bytes((address + i) // PAGE % 256 for i in range(length)))
+
+
+class FakeThread:
+    def __init__(self, ptid, inferior):
+        self.ptid = ptid
+        self.inferior = inferior
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    gdb = types.ModuleType("gdb")
+    gdb.MemoryError = MemoryError
+    gdb.Thread = gdb.Frame = gdb.Value = object
+    gdb.events = types.SimpleNamespace(cont=types.SimpleNamespace(connect=lambda handler: None))
+    monkeypatch.setitem(sys.modules, "gdb", gdb)
+    monkeypatch.delitem(sys.modules, "gdb_common.snapshot", raising=False)
+    module = importlib.import_module("gdb_common.snapshot")
+    yield module
+    sys.modules.pop("gdb_common.snapshot", None)
+
+
+def test_missing_pages_are_fetched_in_one_read(snapshot):
+    inferior = FakeInferior()
+    snap = snapshot.StopSnapshot(FakeThread(1, inferior))
+    data = snap.read_memory(0x10000, 3 * PAGE)
+    assert inferior.reads == [(0x10000, 3 * PAGE)]
+    assert data.tobytes() == bytes([0x10] * PAGE + [0x11] * PAGE + [0x12] * PAGE)
+    # Only the gap between already cached pages is read
+    snap = snapshot.StopSnapshot(FakeThread(1, inferior))
+    snap.read_memory(0x20000, 1)
+    snap.read_memory(0x23000, 1)
+    inferior.reads.clear()
+    snap.read_memory(0x20000, 4 * PAGE)
+    assert inferior.reads == [(0x21000, 2 * PAGE)]
+    assert snap.target_reads == 3
+
+
+def test_reads_crossing_a_page_boundary(snapshot):
+    inferior = FakeInferior()
+    snap = snapshot.StopSnapshot(FakeThread(1, inferior))
+    assert snap.read_memory(0x10ffe, 4).tobytes() == b"\x10\x10\x11\x11"
+    assert snap.read_int(0x10ffc, 8) == int.from_bytes(b"\x10" * 4 + b"\x11" * 4, "little")
+    assert inferior.reads == [(0x10000, 2 * PAGE)]
+
+
+def test_partly_unmapped_range_falls_back_to_single_pages(snapshot):
+    inferior = FakeInferior(unmapped={0x11})
+    snap = snapshot.StopSnapshot(FakeThread(1, inferior))
+    with pytest.raises(MemoryError):
+        snap.read_memory(0x10000, 3 * PAGE)
+    assert inferior.reads == [(0x10000, 3 * PAGE), (0x10000, PAGE), (0x11000, PAGE), (0x12000, PAGE)]
+    # The readable pages around the hole stay cached and usable
+    inferior.reads.clear()
+    assert snap.read_memory(0x10010, 4).tobytes() == b"\x10" * 4
+    assert snap.read_memory(0x12010, 4).tobytes() == b"\x12" * 4
+    assert snap.read_int(0x11000, 8) is None
+    assert inferior.reads == []
+
+
+def test_invalidate_keeps_other_threads_but_drops_their_pages(snapshot):
+    inferior = FakeInferior()
+    first, second = FakeThread(1, inferior), FakeThread(2, inferior)
+    a, b = snapshot.current(first), snapshot.current(second)
+    a.read_memory(0x10000, 8)
+    b.read_memory(0x10000, 8)
+    b._registers["rip"] = 0x1234
+
+    snapshot.invalidate(types.SimpleNamespace(inferior_thread=first))
+    assert not a.valid
+    assert snapshot.current(first) is not a
+    assert snapshot.current(second) is b and b.valid
+    assert b._registers == {"rip": 0x1234}
+    assert b._pages == {}
+
+    # All-stop resume: every snapshot goes
+    snapshot.invalidate(types.SimpleNamespace(inferior_thread=None))
+    assert not b.valid
+    assert snapshot._current == {}
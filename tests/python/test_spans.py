@@ -0,0 +1,68 @@
+import pytest
+
+from spans import InstanceTracker, decode_poll_outcome, percentile
+
+
+class FakeValue:
+    """Stands in for a gdb.Value: its printed form and raw bytes."""
+
+    def __init__(self, text, raw=b""):
+        self.text = text
+        self.bytes = raw
+
+    def __str__(self):
+        return self.text
+
+
+ACQUIRE_RESULT = "core::result::Result<(), tokio::sync::batch_semaphore::AcquireError>"
+
+
+@pytest.mark.parametrize("text, outcome", [
+    ("core::task::poll::Poll<()>::Ready(())", "Ready"),
+    ("core::task::poll::Poll<()>::Pending", "Pending"),
+    ("core::task::poll::Poll<u32>::Ready(42)", "Ready"),
+    ("core::task::poll::Poll<u32>::Pending", "Pending"),
+    (f"core::task::poll::Poll<{ACQUIRE_RESULT}>::Ready({ACQUIRE_RESULT}::Ok(()))", "Ready"),
+    (f"core::task::poll::Poll<{ACQUIRE_RESULT}>::Ready({ACQUIRE_RESULT}::Err("
+     f"tokio::sync::batch_semaphore::AcquireError (()))", "Ready"),
+    (f"core::task::poll::Poll<{ACQUIRE_RESULT}>::Pending", "Pending"),
+    # A payload that itself holds a Poll must not decide the outer variant
+    ("core::task::poll::Poll<core::option::Option<core::task::poll::Poll<u8>>>::Ready("
+     "core::option::Option<core::task::poll::Poll<u8>>::Some(core::task::poll::Poll<u8>::Pending))", "Ready"),
+    ("core::task::poll::Poll<fn() -> u8>::Pending", "Pending"),
+    ("core::task::poll::Poll<alloc::string::String>::Ready(\"Pending\")", "Ready"),
+])
+def test_decode_poll_outcome_variants(text, outcome):
+    assert decode_poll_outcome(FakeValue(text)) == outcome
+
+
+def test_decode_poll_outcome_raw_byte_fallback():
+    assert decode_poll_outcome(FakeValue("0 '\\000'", b"\x00")) == "Ready"
+    assert decode_poll_outcome(FakeValue("1 '\\001'", b"\x01")) == "Pending"
+    assert decode_poll_outcome(FakeValue("<optimized out>", b"\x02\x00")) is None
+    assert decode_poll_outcome(None) is None
+
+
+def test_percentile():
+    assert percentile([], 50) == 0
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2, 3, 4, 5], 99) == 5
+
+
+def test_instance_closes_on_ready():
+    tracker = InstanceTracker()
+    assert tracker.poll_start(0x10, "fut", 0)
+    assert tracker.poll_end(0x10, "fut", 0, 5, "Pending") is None
+    assert not tracker.poll_start(0x10, "fut", 20)
+    done = tracker.poll_end(0x10, "fut", 20, 30, "Ready")
+    assert (done.polls, done.busy_ns) == (2, 15)
+    assert tracker.live == {}
+    [row] = tracker.rows()
+    assert row["completed"] == 1 and row["wall_us_max"] == 30 / 1e3
+
+
+def test_undecoded_outcome_keeps_instance_open():
+    tracker = InstanceTracker()
+    tracker.poll_start(0x10, "fut", 0)
+    assert tracker.poll_end(0x10, "fut", 0, 5, None) is None
+    assert (0x10, "fut") in tracker.live
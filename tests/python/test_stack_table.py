@@ -0,0 +1,68 @@
+from gdb_debugger.tracers.stack_table import StackTable, collect_pcs
+
+SYMBOLS = {0x100: "inner", 0x1ff: "caller", 0x2ff: "main"}
+
+
+class Lookup:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, pc):
+        self.calls.append(pc)
+        return SYMBOLS.get(pc)
+
+
+class Frame:
+    def __init__(self, pcs):
+        self.pcs = pcs
+
+    def pc(self):
+        return self.pcs[0]
+
+    def older(self):
+        return Frame(self.pcs[1:]) if len(self.pcs) > 1 else None
+
+
+def test_identical_stacks_share_an_id():
+    table = StackTable(Lookup())
+    seen = []
+    table.on_new_stack = lambda stack_id, pcs: seen.append((stack_id, pcs))
+    a = table.intern((0x100, 0x200))
+    b = table.intern((0x100, 0x300))
+    assert table.intern((0x100, 0x200)) == a != b
+    table.intern((0x100, 0x200))
+    assert table.counts == [3, 1]
+    assert seen == [(a, (0x100, 0x200)), (b, (0x100, 0x300))]
+    assert table.most_common() == [(a, 3), (b, 1)]
+    assert table.most_common(1) == [(a, 3)]
+
+
+def test_caller_frames_are_looked_up_at_the_call_and_cached():
+    lookup = Lookup()
+    table = StackTable(lookup)
+    stack_id = table.intern((0x100, 0x200, 0x300))
+    assert table.resolve(stack_id) == [
+        {"pc": 0x100, "name": "inner"}, {"pc": 0x200, "name": "caller"}, {"pc": 0x300, "name": "main"}]
+    table.resolve(stack_id)
+    table.intern((0x100, 0x200, 0x400))
+    assert table.symbolize_all() == {0x100: "inner", 0x1ff: "caller", 0x2ff: "main", 0x3ff: None}
+    assert lookup.calls == [0x100, 0x1ff, 0x2ff, 0x3ff]
+
+
+def test_restore_keeps_recorded_ids_and_symbols():
+    lookup = Lookup()
+    table = StackTable(lookup)
+    table.intern((0x999,))
+    table.restore({1: (0x100, 0x300), 0: (0x100, 0x200)}, {0x100: "inner", 0x1ff: "caller", 0x2ff: "main"})
+    assert table.stacks == [(0x100, 0x200), (0x100, 0x300)]
+    assert table.counts == [0, 0]
+    assert table.intern((0x100, 0x300)) == 1
+    assert [f["name"] for f in table.resolve(0)] == ["inner", "caller"]
+    assert lookup.calls == []
+
+
+def test_backtraces_are_truncated_to_max_depth():
+    frame = Frame([0x100, 0x200, 0x300, 0x400])
+    assert collect_pcs(frame, 16) == (0x100, 0x200, 0x300, 0x400)
+    assert collect_pcs(frame, 2) == (0x100, 0x200)
+    assert collect_pcs(None, 2) == ()
@@ -0,0 +1,54 @@
+from gdb_debugger.store import CHUNK_ROWS, TraceStore, load, plain
+
+TID = (100, 101, 0)
+
+
+def events_on_disk(path):
+    with open(path) as fp:
+        return sum('"t": "ev"' in line for line in fp)
+
+
+def test_round_trip_across_a_chunk_boundary(tmp_path):
+    path = tmp_path / "run" / "trace.ndjson"
+    store = TraceStore(str(path))
+    for i in range(CHUNK_ROWS - 1):
+        inv = store.new_invocation()
+        store.record("app::poll", inv, "entry", TID, i, {"VariableTracer(self)": i})
+    assert events_on_disk(path) == 0
+    inv = store.new_invocation()
+    store.record("app::poll", inv, "entry", TID, CHUNK_ROWS, {"VariableTracer(self)": -1})
+    # The 4096th row flushes the chunk
+    assert (store.rows, events_on_disk(path)) == (CHUNK_ROWS, CHUNK_ROWS)
+    # A symbol first seen after the boundary is defined in the next chunk, ahead of its events
+    store.record("app::drop", inv, "exit", TID, CHUNK_ROWS + 5, {"ReturnValueTracer": b"\x01\xff"})
+    wake = store.new_invocation()
+    store.record("app::wake", wake, "entry", TID, CHUNK_ROWS + 6, {"BacktraceTracer": 3, "err": "Error: gone"})
+    store.define("stack", id=3, pcs=[0x1010, 0x2020])
+    store.define("pc", pc=0x1010, name="app::wake")
+    store.close()
+
+    traced, stacks, pc_names = load(str(path))
+    assert len(traced["app::poll"]) == CHUNK_ROWS
+    first, last = traced["app::poll"][0], traced["app::poll"][-1]
+    assert first == {"thread_id": TID, "timestamp": 0, "entry_tracers": {"VariableTracer(self)": 0},
+                     "exit_tracers": {}}
+    # The exit row lands on its entry's invocation, even in another chunk
+    assert last["exit_tracers"] == {"ReturnValueTracer": {"bytes": "01ff"}}
+    assert last["exit_timestamp"] == CHUNK_ROWS + 5
+    assert "app::drop" not in traced
+    assert traced["app::wake"][0]["entry_tracers"] == {"BacktraceTracer": 3, "err": "Error: gone"}
+    assert stacks == {3: (0x1010, 0x2020)}
+    assert pc_names == {0x1010: "app::wake"}
+
+
+def test_plain_values():
+    class Value:
+        def __int__(self):
+            return 7
+
+    class Opaque:
+        def __str__(self):
+            return "<opaque>"
+
+    assert plain({1: [b"\x00", (True, 1.5)], "v": Value(), "o": Opaque(), "n": None}) == \
+        {"1": [{"bytes": "00"}, [True, 1.5]], "v": 7, "o": "<opaque>", "n": None}
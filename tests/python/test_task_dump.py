@@ -0,0 +1,121 @@
+from dwarf_analyzer.layouts import StructLayouts
+from gdb_debugger.task_dump import TaskDecoder, format_tasks
+
+BIAS = 0x400000
+POLL = 0x1000           # link address of raw::poll<Root, S>
+VTABLE = 0x5000
+TRAILER = 0x100         # Vtable.trailer_offset
+ID = 0x28               # Vtable.id_offset
+CELL = 0x40             # the future inside the task Cell
+
+LAYOUTS = {
+    "structs": [
+        {"name": "Header", "type_id": "h", "size": 48,
+         "members": {"state": 0, "queue_next": 8, "vtable": 16, "owner_id": 24}},
+        {"name": "Vtable", "type_id": "v", "size": 48,
+         "members": {"poll": 0, "schedule": 8, "dealloc": 16, "trailer_offset": 24, "id_offset": 40}},
+        {"name": "Trailer", "type_id": "t", "size": 32, "members": {"owned": 0, "waker": 16}},
+        {"name": "Pointers<tokio::runtime::task::core::Header>", "type_id": "p", "size": 16, "members": {"inner": 0}},
+        {"name": "PointersInner<tokio::runtime::task::core::Header>", "type_id": "pi", "size": 16,
+         "members": {"prev": 0, "next": 8}},
+    ],
+    "futures": {
+        "a1": {"name": "app::main::{async_block#0}", "discr_offset": 32, "states": {
+            "0": {"name": "Unresumed", "line": None, "awaitee": None, "awaitee_type": None},
+            "3": {"name": "Suspend0", "line": 12, "awaitee": 8, "awaitee_type": "b2"},
+        }},
+        "b2": {"name": "app::fetch::{async_fn_env#0}", "discr_offset": 0, "states": {
+            "4": {"name": "Suspend1", "line": 30, "awaitee": 8, "awaitee_type": "c3"},
+        }},
+    },
+    "cells": {"a1": CELL},
+    "task_polls": {f"0x{POLL:x}": {"type": "a1", "symbol": "tokio::runtime::task::raw::poll<Root, S>"}},
+    "type_names": {"c3": "tokio::time::sleep::Sleep"},
+}
+
+
+class Memory:
+    """Little-endian byte store with read_int(), None for bytes never written."""
+
+    def __init__(self):
+        self.bytes = {}
+
+    def write(self, address, value, size=8):
+        for i, b in enumerate(value.to_bytes(size, "little")):
+            self.bytes[address + i] = b
+
+    def read_int(self, address, size):
+        try:
+            return int.from_bytes(bytes(self.bytes[address + i] for i in range(size)), "little")
+        except KeyError:
+            return None
+
+
+H1, H2, H3 = 0x10000, 0x20000, 0x30000
+
+
+def task(memory, header, task_id, next_header, state):
+    memory.write(header + 16, VTABLE)
+    memory.write(header + ID, task_id)
+    memory.write(header + TRAILER + 8, next_header)
+    memory.write(header + CELL + 32, state, 1)
+
+
+def decoder():
+    memory = Memory()
+    memory.write(VTABLE, POLL + BIAS)
+    memory.write(VTABLE + 24, TRAILER)
+    memory.write(VTABLE + 40, ID)
+    # The owned list loops back to its head
+    task(memory, H1, 1, H2, 3)
+    task(memory, H2, 2, H3, 0)
+    task(memory, H3, 3, H1, 7)
+    # H1's root is suspended in fetch(), itself awaiting a Sleep
+    memory.write(H1 + CELL + 8, 4, 1)
+    return TaskDecoder(StructLayouts(LAYOUTS), memory, bias=BIAS)
+
+
+def test_layout_offsets():
+    d = decoder()
+    assert (d.header_vtable, d.vtable_poll, d.vtable_trailer, d.vtable_id, d.trailer_next) == (16, 0, 24, 40, 8)
+    assert d.missing() == []
+    assert TaskDecoder(StructLayouts({}), None).missing() == [
+        "Header.vtable", "Vtable.poll", "Vtable.trailer_offset", "Trailer.owned.next"]
+
+
+def test_walk_stops_on_a_repeated_link():
+    assert list(decoder().walk(H1)) == [H1, H2, H3]
+    assert list(decoder().walk(0)) == []
+
+
+def test_await_chain_down_to_the_leaf():
+    task = decoder().decode(H1)
+    assert (task["id"], task["future"]) == (1, "app::main::{async_block#0}")
+    assert task["chain"] == [
+        {"future": "app::main::{async_block#0}", "address": H1 + CELL, "state": "Suspend0", "line": 12},
+        {"future": "app::fetch::{async_fn_env#0}", "address": H1 + CELL + 8, "state": "Suspend1", "line": 30},
+        {"future": "tokio::time::sleep::Sleep", "address": H1 + CELL + 16, "state": None, "line": None},
+    ]
+
+
+def test_unresumed_and_unknown_states_end_the_chain():
+    d = decoder()
+    assert [f["state"] for f in d.decode(H2)["chain"]] == ["Unresumed"]
+    assert [f["state"] for f in d.decode(H3)["chain"]] == ["state 7"]
+
+
+def test_unknown_poll_fn_and_unreadable_header():
+    d = decoder()
+    assert d.decode(0x90000) == {"header": 0x90000, "id": None, "future": None, "chain": []}
+    d.bias = 0
+    task = d.decode(H1)
+    assert task["id"] == 1 and task["future"] is None
+
+
+def test_dump_and_format():
+    tasks = decoder().dump([H2, H1])
+    assert [t["header"] for t in tasks] == [H2, H3, H1]
+    lines = format_tasks(tasks)
+    assert lines[0] == "task 2 (header 0x20000): app::main::{async_block#0}"
+    assert lines[1] == "  app::main::{async_block#0} [Unresumed] @0x20040"
+    assert lines[-1] == "      tokio::time::sleep::Sleep [leaf] @0x10050"
@@ -0,0 +1,62 @@
+import pytest
+
+from trace_filter import TraceFilter, crate_of
+
+
+def legacy(*parts):
+    """A legacy `_ZN...E` mangled path."""
+    return "_ZN" + "".join(f"{len(p)}{p}" for p in parts) + "17h0123456789abcdefE"
+
+
+def test_crate_of():
+    assert crate_of(legacy("tokio", "runtime", "task", "raw", "poll")) == "tokio"
+    assert crate_of(legacy("_$LT$hyper..proto..h1..Conn$u20$as$u20$core..future..Future$GT$", "poll")) == "hyper"
+    assert crate_of("_RNvCs1a2b_7mycrate4main") == "mycrate"
+    assert crate_of("<tokio::sync::Mutex<T> as core::fmt::Debug>::fmt") == "tokio"
+    assert crate_of("app::handler::{async_fn_env#0}") == "app"
+    assert crate_of("") == ""
+
+
+def test_last_matching_rule_wins():
+    f = TraceFilter()
+    assert f.future_enabled("app::handler", "app::handler")
+    f.add_rule(False, "crate", "app")
+    f.add_rule(True, "name", "handler")
+    assert f.future_enabled("app::handler::{async_fn_env#0}", "app::handler")
+    assert not f.future_enabled("app::other", "app::other")
+    # The crate rule is a full match, not a prefix
+    assert f.future_enabled("app2::other", "app2::other")
+
+
+def test_thread_rules():
+    f = TraceFilter()
+    f.add_rule(False, "thread", "*")
+    f.add_rule(True, "thread", "101, 102")
+    assert f.thread_enabled(101) and f.thread_enabled(102)
+    assert not f.thread_enabled(103)
+
+
+def test_bad_rules_and_settings():
+    f = TraceFilter()
+    with pytest.raises(ValueError):
+        f.add_rule(True, "symbol", ".*")
+    with pytest.raises(ValueError):
+        f.set_sampling(0)
+    with pytest.raises(ValueError):
+        f.set_rate_limit(-1)
+
+
+def test_sampling_is_per_future():
+    f = TraceFilter()
+    f.set_sampling(3)
+    assert [f.should_sample("a") for _ in range(6)] == [True, False, False, True, False, False]
+    assert f.should_sample("b")
+
+
+def test_rate_limit_allows_the_burst():
+    f = TraceFilter()
+    f.set_rate_limit(0.001, burst=2)
+    assert [f.should_sample("a") for _ in range(3)] == [True, True, False]
+    assert f.should_sample("b")
+    f.reset()
+    assert f.should_sample("a") and f.rules == []
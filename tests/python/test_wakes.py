@@ -0,0 +1,37 @@
+from wakes import OUTSIDE_POLL, WakeTracker
+
+TASK = 0x7f00
+
+
+def test_wake_resolves_at_the_named_task_poll():
+    tracker = WakeTracker()
+    assert tracker.on_wake(TASK, "app::producer", 1000) == "wake1"
+    # A second wake before the task runs is redundant
+    assert tracker.on_wake(TASK, OUTSIDE_POLL, 1500) is None
+    assert tracker.on_task_poll(TASK, 4000) == ("wake1", "app::producer", 3000)
+    assert tracker.on_task_poll(TASK, 5000) is None
+    tracker.name_task(TASK, "app::consumer")
+    [row] = tracker.rows()
+    assert (row["waker"], row["wakee"], row["wakes"], row["delay_us_max"]) == ("app::producer", "app::consumer", 1, 3.0)
+    assert tracker.redundant == 1
+
+
+def test_unnamed_tasks_fall_back_to_the_task_key():
+    tracker = WakeTracker()
+    tracker.on_wake(TASK, "app::producer", 0)
+    tracker.on_task_poll(TASK, 2000)
+    [row] = tracker.rows()
+    assert row["wakee"] == "task 0x7f00"
+    # Rows don't consume the parked samples
+    tracker.name_task(TASK, "app::consumer")
+    assert [r["wakee"] for r in tracker.rows()] == ["app::consumer"]
+
+
+def test_reused_task_address_takes_the_latest_name():
+    tracker = WakeTracker()
+    tracker.name_task(TASK, "app::old")
+    tracker.name_task(TASK, "app::new")
+    tracker.on_wake(TASK, "w", 0)
+    tracker.on_task_poll(TASK, 10)
+    # Still parked: the fallback is the last name seen at that address
+    assert tracker.rows()[0]["wakee"] == "app::new"
@@ -0,0 +1,154 @@
+import threading
+
+from watchdog import GDB_SIGNAL_NAME, Watchdog, handle_settings
+
+MS = 1_000_000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def make_watchdog(threshold_ms=100):
+    clock = FakeClock()
+    dog = Watchdog(clock=clock)
+    dog.pid = 1234
+    dog.threshold_ns = threshold_ms * MS
+    dog.sent = []
+    dog._signal = lambda tid: dog.sent.append(tid) or True
+    return dog, clock
+
+
+def test_long_poll_is_signalled_once():
+    dog, clock = make_watchdog()
+    dog.push(7, "outer", entry_ts=0)
+    dog.push(7, "inner", entry_ts=10)
+    clock.now = 99 * MS
+    dog.check()
+    assert dog.sent == []
+    clock.now = 100 * MS
+    dog.check()
+    assert dog.sent == [7] and dog.signals == 1
+    clock.now = 500 * MS
+    dog.check()
+    assert dog.sent == [7]      # pending request, then reported: never twice
+    poll = dog.take_request(7)
+    assert poll.name == "outer"
+    dog.check()
+    assert dog.sent == [7]
+
+
+def test_handler_time_is_not_polling_time():
+    dog, clock = make_watchdog()
+    dog.push(7, "fut", entry_ts=0)
+    # 150 ms of wall time, 80 ms of it spent in breakpoint handlers (all threads stopped)
+    for _ in range(8):
+        clock.now += 10 * MS
+        dog.add_pause(10 * MS)
+        clock.now += 70 * MS // 8
+    assert dog.running_ns(7, dog.inflight[7][0]) == 70 * MS
+    dog.check()
+    assert dog.sent == []
+    clock.now += 30 * MS
+    dog.check()
+    assert dog.sent == [7]
+
+
+def test_pauses_before_the_poll_do_not_count():
+    dog, clock = make_watchdog()
+    dog.add_pause(500 * MS)
+    clock.now = 600 * MS
+    dog.push(7, "fut", entry_ts=0)
+    clock.now += 100 * MS
+    dog.check()
+    assert dog.sent == [7]
+
+
+def test_user_stop_pauses_every_thread():
+    dog, clock = make_watchdog()
+    dog.push(7, "a", entry_ts=0)
+    dog.push(8, "b", entry_ts=0)
+    clock.now = 50 * MS
+    dog.pause()                 # all-stop: stop event without a thread
+    clock.now = 10_000 * MS
+    dog.check()
+    assert dog.sent == []
+    dog.resume()
+    clock.now += 49 * MS
+    dog.check()
+    assert dog.sent == []
+    clock.now += 1 * MS
+    dog.check()
+    assert sorted(dog.sent) == [7, 8]
+
+
+def test_non_stop_pause_only_holds_its_thread():
+    dog, clock = make_watchdog()
+    dog.push(7, "a", entry_ts=0)
+    dog.push(8, "b", entry_ts=0)
+    dog.add_pause(60 * MS, tid=7)
+    dog.pause(8)
+    clock.now = 120 * MS
+    dog.check()
+    assert dog.sent == []       # 7 ran 60 ms, 8 has been stopped throughout
+    clock.now = 160 * MS
+    dog.check()
+    assert dog.sent == [7]
+    dog.resume(None)            # resuming every thread ends 8's pause too
+    clock.now = 260 * MS
+    dog.check()
+    assert dog.sent == [7, 8]
+
+
+def test_finished_poll_is_not_signalled():
+    dog, clock = make_watchdog()
+    dog.push(7, "fut", entry_ts=0)
+    dog.pop(7)
+    clock.now = 1000 * MS
+    dog.check()
+    assert dog.sent == []
+    dog.push(7, "again", entry_ts=0)
+    dog.requests[7] = object()
+    assert dog.take_request(7) is None   # the signalled poll is gone
+
+
+def test_failed_signal_is_retried_by_nobody():
+    dog, clock = make_watchdog()
+    dog._signal = lambda tid: False
+    dog.push(7, "fut", entry_ts=0)
+    clock.now = 100 * MS
+    dog.check()
+    assert dog.signals == 0 and dog.requests == {}
+
+
+def test_thread_loop_signals_with_fake_clock():
+    dog, clock = make_watchdog()
+    fired = threading.Event()
+    dog._signal = lambda tid: fired.set() or True
+    dog.push(7, "fut", entry_ts=0)
+    dog.start(threshold_ms=100)
+    try:
+        clock.now = 50 * MS
+        assert not fired.wait(0.1)
+        clock.now = 150 * MS
+        assert fired.wait(2)
+    finally:
+        dog.stop()
+    assert dog._thread is None and dog.signals == 1
+    # Restarting after a stop gets a new thread
+    dog.start(threshold_ms=100)
+    assert dog._thread is not None and dog._thread.is_alive()
+    dog.stop()
+
+
+def test_handle_settings_round_trip_info_signals():
+    info = ("Signal        Stop\tPrint\tPass to program\tDescription\n"
+            f"{GDB_SIGNAL_NAME}         Yes\tYes\tYes\t\tReal-time event 63\n")
+    assert handle_settings(info) == "stop print pass"
+    info = "Signal        Stop\tPrint\tPass to program\tDescription\nSIGURG        No\tNo\tYes\t\tUrgent I/O condition\n"
+    assert handle_settings(info, "SIGURG") == "nostop noprint pass"
+    assert handle_settings(info) is None
@@ -0,0 +1,50 @@
+// Multi-threaded poll-heavy workload for comparing all-stop and non-stop
+// tracing (gdb_profiler/bench_nonstop.py). Every task yields on each step,
+// so each step is one more poll of `worker` and `step` on some worker thread.
+//
+// Usage: tokio_nonstop_bench [seconds] [tasks]
+// Worker threads: TOKIO_WORKER_THREADS (default: one per core).
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::Arc;
+use std::time::{Duration, Instant};
+
+async fn step(n: u64) -> u64 {
+    tokio::task::yield_now().await;
+    (0..64).fold(n, |acc, i| acc.wrapping_mul(31).wrapping_add(i))
+}
+
+async fn worker(steps: Arc<AtomicU64>, deadline: Instant) -> u64 {
+    let mut acc = 0;
+    while Instant::now() < deadline {
+        acc = step(acc).await;
+        steps.fetch_add(1, Ordering::Relaxed);
+    }
+    acc
+}
+
+#[tokio::main]
+async fn main() {
+    let mut args = std::env::args().skip(1);
+    let seconds: u64 = args.next().and_then(|a| a.parse().ok()).unwrap_or(5);
+    let tasks: usize = args.next().and_then(|a| a.parse().ok()).unwrap_or(64);
+
+    let steps = Arc::new(AtomicU64::new(0));
+    let start = Instant::now();
+    let deadline = start + Duration::from_secs(seconds);
+    let handles: Vec<_> = (0..tasks)
+        .map(|_| tokio::spawn(worker(steps.clone(), deadline)))
+        .collect();
+    let mut checksum = 0u64;
+    for handle in handles {
+        checksum ^= handle.await.unwrap();
+    }
+    let elapsed = start.elapsed().as_secs_f64();
+    let total = steps.load(Ordering::Relaxed);
+    println!(
+        "steps={} elapsed={:.2}s steps_per_s={:.1} checksum={:x}",
+        total,
+        elapsed,
+        total as f64 / elapsed,
+        checksum
+    );
+}